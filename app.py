@@ -1,14 +1,18 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Blueprint, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 import sys
 import os
 import json
+import uuid
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from datetime import datetime
 from dataclasses import asdict
 
 # Adicionar o diretório pai ao path para importar o sistema de busca semântica
 sys.path.append('/home/ubuntu')
-from semantic_search_system import SemanticSearchSystem
+from lazy_subsystems import subsystems
+subsystems.mark("imports_started")
+from semantic_search_system import search_system
 from product_manager import product_manager
 from supabase_client import supabase_manager
 from evolution_api_client import evolution_client
@@ -21,28 +25,43 @@ from reviewer_agent import reviewer_agent
 from pdf_upload_processor import pdf_processor
 from knowledge_editor import knowledge_editor
 from version_manager import version_manager
-
-app = Flask(__name__)
-CORS(app)  # Permitir requisições do frontend React
-
-# Inicializar sistemas
-print("Inicializando sistemas...")
-search_system = SemanticSearchSystem('/home/ubuntu/structured_knowledge_refined.json')
-prompt_manager.load_prompts_cache()  # Carregar prompts do Supabase
-print(f"✅ Sistema de busca semântica (Tintas) inicializado com {len(search_system.knowledge_base)} itens")
-print(f"✅ Sistema de busca semântica (Pisos) inicializado com {len(pisos_search_system.knowledge_base)} itens")
-print(f"✅ Agente de Pisos inicializado - Especialidades: {len(pisos_agent.expertise_areas)}")
-print(f"✅ Agente Orquestrador inicializado - OpenAI: {'Disponível' if orchestrator_agent._is_openai_available() else 'Indisponível'}")
-print(f"✅ Agente Revisor inicializado - OpenAI: {'Disponível' if reviewer_agent._is_openai_available() else 'Indisponível'}")
-print(f"✅ Gerenciador de produtos inicializado com {len(product_manager.get_all_products())} produtos")
-print(f"✅ Gerenciador de prompts inicializado com {len(prompt_manager.get_all_prompts())} prompts")
-print(f"✅ Supabase: {'Conectado' if supabase_manager.is_connected() else 'Modo local'}")
-print(f"✅ Evolution API: {'Configurada' if evolution_client.is_configured() else 'Não configurada'}")
-print(f"✅ WhatsApp Service: Inicializado")
+from knowledge_deduplicator import knowledge_deduplicator
+from session_context import session_context_store, contextual_search, search_flight
+from speculative_retrieval import speculative_retriever
+from deadline import Deadline
+from llm_gateway import llm_gateway
+from keyword_matcher import KeywordMatcher
+
+subsystems.mark("imports_finished")
+
+api = Blueprint('api', __name__)
+
+# Subsistemas pesados: inicializados sob demanda ou no aquecimento em segundo plano
+# (modelos de embeddings, spaCy, Supabase e WhatsApp registram-se nos próprios módulos)
+def _load_prompts():
+    prompt_manager.load_prompts_cache()  # Carregar prompts do Supabase
+    print(f"✅ Gerenciador de prompts inicializado com {len(prompt_manager.get_all_prompts())} prompts")
+    return prompt_manager
+
+def _wire_agents():
+    """Conecta os modelos e catálogos das buscas aos agentes (após carregar as buscas)"""
+    print(f"✅ Agente de Pisos inicializado - Especialidades: {len(pisos_agent.expertise_areas)}")
+    orchestrator_agent.set_encoder(pisos_search_system.model.encode)  # Modelo multilíngue para o roteador local
+    print(f"✅ Agente Orquestrador inicializado - OpenAI: {'Disponível' if orchestrator_agent._is_openai_available() else 'Indisponível'}")
+    # Avaliador local do revisor: encoders e catálogos de cada agente
+    reviewer_agent.local_scorer.set_encoder('tintas', search_system.model.encode)
+    reviewer_agent.local_scorer.set_encoder('pisos', pisos_search_system.model.encode)
+    reviewer_agent.local_scorer.register_knowledge_base('tintas', search_system.knowledge_base)
+    reviewer_agent.local_scorer.register_knowledge_base('pisos', pisos_search_system.knowledge_base)
+    print(f"✅ Agente Revisor inicializado - OpenAI: {'Disponível' if reviewer_agent._is_openai_available() else 'Indisponível'}")
+    return orchestrator_agent
+
+subsystems.register("prompts", _load_prompts)
+subsystems.register("agents", _wire_agents)
 
 # ==================== ENDPOINTS EXISTENTES ====================
 
-@app.route('/api/search', methods=['POST'])
+@api.route('/api/search', methods=['POST'])
 def semantic_search():
     """Endpoint para busca semântica"""
     try:
@@ -67,13 +86,14 @@ def semantic_search():
         return jsonify({
             'query': query,
             'results': results,
-            'total_results': len(results)
+            'total_results': len(results),
+            'facets': search_system.facets_for_results(results)
         })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/recommendations', methods=['POST'])
+@api.route('/api/recommendations', methods=['POST'])
 def get_recommendations():
     """Endpoint para recomendações de produtos"""
     try:
@@ -102,7 +122,70 @@ def get_recommendations():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/chat', methods=['POST'])
+def _sse_event(event, data):
+    """Formata um evento Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+def _sse_response(stages):
+    """Transmite os estágios (evento, dados) de um pipeline como SSE"""
+    def generate():
+        try:
+            for event, payload in stages:
+                yield _sse_event(event, payload)
+        except Exception as e:
+            yield _sse_event('error', {'error': str(e)})
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def chat_pipeline(message, session_id):
+    """
+    Pipeline do chat com o agente de tintas em estágios: busca, resposta e persistência
+    
+    Gera tuplas (evento, dados); o último evento ('done') traz a resposta completa.
+    """
+    # Buscar ou criar conversa
+    conversation = supabase_manager.get_conversation_by_session(session_id)
+    if not conversation:
+        conversation_id = supabase_manager.create_conversation(
+            session_id=session_id,
+            platform='web'
+        )
+        conversation = {'id': conversation_id, 'session_id': session_id}
+    
+    # Salvar mensagem do usuário
+    supabase_manager.save_message(
+        conversation['id'],
+        'user',
+        message,
+        {'platform': 'web'}
+    )
+    
+    # Buscar informações relevantes na base de conhecimento
+    search_results = contextual_search(search_system, "tintas", message, session_id,
+                                       top_k=3, similarity_threshold=0.2)
+    yield 'search', {'search_results': search_results}
+    
+    # Gerar resposta baseada nos resultados da busca
+    response = generate_agent_response(message, search_results)
+    yield 'response', {'agent_response': response}
+    
+    # Salvar resposta do agente
+    supabase_manager.save_message(
+        conversation['id'],
+        'agent',
+        response,
+        {'search_results': search_results, 'platform': 'web'}
+    )
+    
+    yield 'done', {
+        'user_message': message,
+        'agent_response': response,
+        'search_results': search_results,
+        'session_id': session_id
+    }
+
+@api.route('/api/chat', methods=['POST'])
 def chat_with_agent():
     """Endpoint para chat com o agente especialista"""
     try:
@@ -113,50 +196,39 @@ def chat_with_agent():
         if not message:
             return jsonify({'error': 'Mensagem é obrigatória'}), 400
         
-        # Buscar ou criar conversa
-        conversation = supabase_manager.get_conversation_by_session(session_id)
-        if not conversation:
-            conversation_id = supabase_manager.create_conversation(
-                session_id=session_id,
-                platform='web'
-            )
-            conversation = {'id': conversation_id, 'session_id': session_id}
-        
-        # Salvar mensagem do usuário
-        supabase_manager.save_message(
-            conversation['id'],
-            'user',
-            message,
-            {'platform': 'web'}
-        )
-        
-        # Buscar informações relevantes na base de conhecimento
-        search_results = search_system.search(message, top_k=3, similarity_threshold=0.2)
-        
-        # Gerar resposta baseada nos resultados da busca
-        response = generate_agent_response(message, search_results)
+        for event, payload in chat_pipeline(message, session_id):
+            if event == 'done':
+                return jsonify(payload)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/chat/stream', methods=['POST'])
+def chat_with_agent_stream():
+    """Chat com o agente especialista via Server-Sent Events (search, response, done)"""
+    try:
+        data = request.get_json()
+        message = data.get('message', '')
+        session_id = data.get('session_id', f"web_{datetime.now().timestamp()}")
         
-        # Salvar resposta do agente
-        supabase_manager.save_message(
-            conversation['id'],
-            'agent',
-            response,
-            {'search_results': search_results, 'platform': 'web'}
-        )
+        if not message:
+            return jsonify({'error': 'Mensagem é obrigatória'}), 400
         
-        return jsonify({
-            'user_message': message,
-            'agent_response': response,
-            'search_results': search_results,
-            'session_id': session_id
-        })
+        return _sse_response(chat_pipeline(message, session_id))
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Orientações adicionais por palavras-chave da mensagem (compiladas uma vez)
+response_hint_matcher = KeywordMatcher({
+    'budget_request': ['orçamento', 'preço', 'custo'],
+    'paint_problem_diagnosis': ['descasca', 'problema'],
+    'calculation_help': ['calcul', 'quantidade']
+})
+
 def generate_agent_response(user_message, search_results):
     """Gera resposta do agente baseada nos resultados da busca semântica"""
-    message_lower = user_message.lower()
+    hints = response_hint_matcher.labels(user_message)
     
     # Usar prompt do gerenciador de prompts
     greeting = prompt_manager.get_prompt('tintas', 'initial_greeting')
@@ -188,15 +260,15 @@ def generate_agent_response(user_message, search_results):
             response += f"- Relevância: {score:.1%}\n\n"
     
     # Adicionar orientações específicas baseadas na consulta
-    if 'orçamento' in message_lower or 'preço' in message_lower or 'custo' in message_lower:
+    if 'budget_request' in hints:
         budget_prompt = prompt_manager.get_prompt('tintas', 'budget_request')
         response += "\n" + budget_prompt
     
-    elif 'descasca' in message_lower or 'problema' in message_lower:
+    elif 'paint_problem_diagnosis' in hints:
         diagnosis_prompt = prompt_manager.get_prompt('tintas', 'paint_problem_diagnosis')
         response += "\n" + diagnosis_prompt
     
-    elif 'calcul' in message_lower or 'quantidade' in message_lower:
+    elif 'calculation_help' in hints:
         calculation_prompt = prompt_manager.get_prompt('tintas', 'calculation_help')
         response += "\n" + calculation_prompt
     
@@ -206,7 +278,7 @@ def generate_agent_response(user_message, search_results):
     
     return response
 
-@app.route('/api/calculate-paint', methods=['POST'])
+@api.route('/api/calculate-paint', methods=['POST'])
 def calculate_paint():
     """Endpoint para cálculo de quantidade de tinta"""
     try:
@@ -271,7 +343,7 @@ def calculate_paint():
 
 # ==================== ENDPOINTS DE PRODUTOS ====================
 
-@app.route('/api/products', methods=['GET'])
+@api.route('/api/products', methods=['GET'])
 def get_all_products():
     """Endpoint para listar todos os produtos do catálogo comercial"""
     try:
@@ -288,7 +360,7 @@ def get_all_products():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/products/<product_id>', methods=['GET'])
+@api.route('/api/products/<product_id>', methods=['GET'])
 def get_product(product_id):
     """Endpoint para obter produto específico"""
     try:
@@ -304,7 +376,37 @@ def get_product(product_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/products', methods=['POST'])
+@api.route('/api/products/<product_id>/similar', methods=['GET'])
+def get_similar_products(product_id):
+    """Endpoint para produtos parecidos (grafo kNN pré-calculado)"""
+    try:
+        agent_type = request.args.get('agent_type')
+        top_k = int(request.args.get('top_k', 5))
+
+        # Procurar o produto nas bases de tintas e pisos
+        systems = {'tintas': search_system, 'pisos': pisos_search_system}
+        if agent_type:
+            if agent_type not in systems:
+                return jsonify({'error': f'agent_type inválido: {agent_type}'}), 400
+            systems = {agent_type: systems[agent_type]}
+
+        for system_type, system in systems.items():
+            similar = system.get_similar_products(product_id, top_k)
+            if similar is not None:
+                return jsonify({
+                    'product_id': product_id,
+                    'agent_type': system_type,
+                    'similar_products': similar,
+                    'count': len(similar)
+                })
+
+        return jsonify({'error': 'Produto não encontrado'}), 404
+    except ValueError:
+        return jsonify({'error': 'top_k deve ser numérico'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/products', methods=['POST'])
 def add_product():
     """Endpoint para adicionar novo produto"""
     try:
@@ -319,7 +421,7 @@ def add_product():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/products/<product_id>', methods=['PUT'])
+@api.route('/api/products/<product_id>', methods=['PUT'])
 def update_product(product_id):
     """Endpoint para atualizar produto"""
     try:
@@ -337,7 +439,7 @@ def update_product(product_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/products/<product_id>', methods=['DELETE'])
+@api.route('/api/products/<product_id>', methods=['DELETE'])
 def delete_product(product_id):
     """Endpoint para remover produto"""
     try:
@@ -353,7 +455,7 @@ def delete_product(product_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/quote', methods=['POST'])
+@api.route('/api/quote', methods=['POST'])
 def generate_quote():
     """Endpoint para gerar orçamento"""
     try:
@@ -467,7 +569,7 @@ def calculate_quote_from_product(area, product, coats, labor_included):
 
 # ==================== ENDPOINTS DO WHATSAPP ====================
 
-@app.route('/webhook/evolution', methods=['POST'])
+@api.route('/webhook/evolution', methods=['POST'])
 def evolution_webhook():
     """Webhook para receber eventos da Evolution API"""
     try:
@@ -481,7 +583,7 @@ def evolution_webhook():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/whatsapp/send', methods=['POST'])
+@api.route('/api/whatsapp/send', methods=['POST'])
 def send_whatsapp_message():
     """Endpoint para enviar mensagem via WhatsApp"""
     try:
@@ -499,7 +601,7 @@ def send_whatsapp_message():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/whatsapp/instance/status', methods=['GET'])
+@api.route('/api/whatsapp/instance/status', methods=['GET'])
 def get_whatsapp_status():
     """Endpoint para verificar status da instância WhatsApp"""
     try:
@@ -508,7 +610,7 @@ def get_whatsapp_status():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/whatsapp/instance/create', methods=['POST'])
+@api.route('/api/whatsapp/instance/create', methods=['POST'])
 def create_whatsapp_instance():
     """Endpoint para criar instância WhatsApp"""
     try:
@@ -523,7 +625,7 @@ def create_whatsapp_instance():
 
 # ==================== ENDPOINTS DE ESTATÍSTICAS ====================
 
-@app.route('/api/stats', methods=['GET'])
+@api.route('/api/stats', methods=['GET'])
 def get_stats():
     """Endpoint para obter estatísticas do sistema"""
     try:
@@ -546,7 +648,7 @@ def get_stats():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/conversations', methods=['GET'])
+@api.route('/api/conversations', methods=['GET'])
 def get_conversations():
     """Endpoint para listar conversas"""
     try:
@@ -558,7 +660,7 @@ def get_conversations():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/conversations/<conversation_id>/messages', methods=['GET'])
+@api.route('/api/conversations/<conversation_id>/messages', methods=['GET'])
 def get_conversation_messages(conversation_id):
     """Endpoint para obter mensagens de uma conversa"""
     try:
@@ -572,7 +674,7 @@ def get_conversation_messages(conversation_id):
 
 # ==================== ENDPOINTS DE CONFIGURAÇÃO ====================
 
-@app.route('/api/config', methods=['GET'])
+@api.route('/api/config', methods=['GET'])
 def get_config():
     """Endpoint para obter configurações do sistema"""
     try:
@@ -595,7 +697,7 @@ def get_config():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/config', methods=['POST'])
+@api.route('/api/config', methods=['POST'])
 def update_config():
     """Endpoint para atualizar configurações do sistema"""
     try:
@@ -612,7 +714,7 @@ def update_config():
 
 # ==================== ENDPOINTS LEGADOS ====================
 
-@app.route('/api/catalog/export', methods=['GET'])
+@api.route('/api/catalog/export', methods=['GET'])
 def export_catalog():
     """Endpoint para exportar catálogo completo"""
     try:
@@ -626,12 +728,34 @@ def export_catalog():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/catalog/import', methods=['POST'])
+@api.route('/api/catalog/import', methods=['POST'])
 def import_catalog():
     """Endpoint para importar catálogo"""
     try:
         data = request.get_json()
         
+        # Remover produtos duplicados (no lote e em relação ao catálogo atual)
+        if supabase_manager.is_connected():
+            existing_products = supabase_manager.get_products(active_only=False)
+            
+            def save_merge(product, changes):
+                # merged_from é só do relatório: não é coluna da tabela
+                updates = {field: value for field, value in changes.items() if field != 'merged_from'}
+                if updates:
+                    supabase_manager.update_product(product['product_id'], updates)
+        else:
+            existing_products = product_manager.get_all_products(active_only=False)
+            
+            def save_merge(product, changes):
+                product.update(changes)
+                product_manager.save_products()
+        
+        unique_products, dedup_report = knowledge_deduplicator.deduplicate_against(
+            existing_products, data.get('products', []), encode_fn=search_system.model.encode,
+            source='catalog_import', update_fn=save_merge
+        )
+        data['products'] = unique_products
+        
         if supabase_manager.is_connected():
             # Importar para Supabase
             products = data.get('products', [])
@@ -647,12 +771,13 @@ def import_catalog():
             return jsonify({
                 'message': f'Catálogo importado com sucesso',
                 'imported_products': success_count,
-                'total_products': len(products)
+                'total_products': len(products),
+                'dedup_report': dedup_report
             })
         else:
             success = product_manager.import_catalog(data)
             if success:
-                return jsonify({'message': 'Catálogo importado com sucesso'})
+                return jsonify({'message': 'Catálogo importado com sucesso', 'dedup_report': dedup_report})
             else:
                 return jsonify({'error': 'Formato de catálogo inválido'}), 400
     except Exception as e:
@@ -660,7 +785,7 @@ def import_catalog():
 
 # ==================== ENDPOINTS PARA GERENCIAMENTO DE PROMPTS ====================
 
-@app.route('/api/prompts', methods=['GET'])
+@api.route('/api/prompts', methods=['GET'])
 def get_prompts():
     """Obtém todos os prompts de todos os agentes"""
     try:
@@ -670,7 +795,7 @@ def get_prompts():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/prompts/<agent_type>/<prompt_type>', methods=['GET'])
+@api.route('/api/prompts/<agent_type>/<prompt_type>', methods=['GET'])
 def get_specific_prompt(agent_type, prompt_type):
     """Obtém um prompt específico"""
     try:
@@ -679,7 +804,7 @@ def get_specific_prompt(agent_type, prompt_type):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/prompts', methods=['POST'])
+@api.route('/api/prompts', methods=['POST'])
 def create_prompt():
     """Cria um novo prompt"""
     try:
@@ -694,6 +819,9 @@ def create_prompt():
         
         success = prompt_manager.create_prompt(agent_type, prompt_type, prompt_text, description)
         
+        if success and agent_type == 'revisor':
+            reviewer_agent.invalidate_review_cache()
+        
         if success:
             return jsonify({'message': 'Prompt criado com sucesso'})
         else:
@@ -702,7 +830,7 @@ def create_prompt():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/prompts', methods=['PUT'])
+@api.route('/api/prompts', methods=['PUT'])
 def update_prompt():
     """Atualiza um prompt existente"""
     try:
@@ -717,6 +845,9 @@ def update_prompt():
         
         success = prompt_manager.update_prompt(agent_type, prompt_type, prompt_text, description)
         
+        if success and agent_type == 'revisor':
+            reviewer_agent.invalidate_review_cache()
+        
         if success:
             return jsonify({'message': 'Prompt atualizado com sucesso'})
         else:
@@ -725,12 +856,15 @@ def update_prompt():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/prompts/<agent_type>/<prompt_type>', methods=['DELETE'])
+@api.route('/api/prompts/<agent_type>/<prompt_type>', methods=['DELETE'])
 def delete_prompt(agent_type, prompt_type):
     """Remove um prompt"""
     try:
         success = prompt_manager.delete_prompt(agent_type, prompt_type)
         
+        if success and agent_type == 'revisor':
+            reviewer_agent.invalidate_review_cache()
+        
         if success:
             return jsonify({'message': 'Prompt removido com sucesso'})
         else:
@@ -739,18 +873,19 @@ def delete_prompt(agent_type, prompt_type):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/prompts/reload', methods=['POST'])
+@api.route('/api/prompts/reload', methods=['POST'])
 def reload_prompts():
     """Recarrega o cache de prompts do Supabase"""
     try:
         prompt_manager.reload_cache()
+        reviewer_agent.invalidate_review_cache()
         return jsonify({'message': 'Cache de prompts recarregado com sucesso'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # ==================== ENDPOINTS PARA AGENTE DE PISOS ====================
 
-@app.route('/api/pisos/search', methods=['POST'])
+@api.route('/api/pisos/search', methods=['POST'])
 def search_pisos():
     """Busca semântica específica para pisos e revestimentos"""
     try:
@@ -758,12 +893,13 @@ def search_pisos():
         query = data.get('query', '')
         top_k = data.get('top_k', 5)
         threshold = data.get('threshold', 0.3)
+        filters = data.get('filters')  # Ex.: {"pei_class": {"min": 4}, "price": {"max": 60}}
         
         if not query:
             return jsonify({'error': 'Query é obrigatória'}), 400
         
         # Buscar na base de conhecimento de pisos
-        search_results = pisos_search_system.search(query, top_k, threshold)
+        search_results = pisos_search_system.search(query, top_k, threshold, filters=filters)
         
         # Gerar resposta do agente de pisos
         agent_response = pisos_agent.generate_response(query, search_results)
@@ -772,13 +908,17 @@ def search_pisos():
             'query': query,
             'agent_response': agent_response,
             'search_results': search_results,
+            'facets': pisos_search_system.facets_for_results(search_results),
+            'filters': filters,
             'agent_type': 'pisos'
         })
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/pisos/types', methods=['GET'])
+@api.route('/api/pisos/types', methods=['GET'])
 def get_floor_types():
     """Retorna tipos de pisos disponíveis"""
     try:
@@ -801,7 +941,7 @@ def get_floor_types():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/pisos/environments', methods=['GET'])
+@api.route('/api/pisos/environments', methods=['GET'])
 def get_floor_by_environment():
     """Retorna pisos adequados para um ambiente específico"""
     try:
@@ -822,7 +962,7 @@ def get_floor_by_environment():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/pisos/calculate', methods=['POST'])
+@api.route('/api/pisos/calculate', methods=['POST'])
 def calculate_floor_materials():
     """Calcula quantidade de materiais para piso"""
     try:
@@ -848,7 +988,7 @@ def calculate_floor_materials():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/pisos/diagnose', methods=['POST'])
+@api.route('/api/pisos/diagnose', methods=['POST'])
 def diagnose_floor_problem():
     """Diagnostica problemas em pisos"""
     try:
@@ -868,27 +1008,32 @@ def diagnose_floor_problem():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/pisos/brands', methods=['GET'])
+@api.route('/api/pisos/brands', methods=['GET'])
 def get_floor_brands():
     """Retorna marcas principais por tipo de piso"""
     try:
         floor_type = request.args.get('type')
         
+        # Contagem de produtos por marca na base de conhecimento (mantida incrementalmente)
+        brand_counts = pisos_search_system.facets.counts('brand')
+        
         if floor_type:
             brands = pisos_agent.get_brand_info(floor_type)
             return jsonify({
                 'floor_type': floor_type,
-                'brands': brands
+                'brands': brands,
+                'brand_counts': {brand: brand_counts.get(brand, 0) for brand in brands}
             })
         else:
             return jsonify({
-                'all_brands': pisos_agent.major_brands
+                'all_brands': pisos_agent.major_brands,
+                'brand_counts': brand_counts
             })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/pisos/agent-info', methods=['GET'])
+@api.route('/api/pisos/agent-info', methods=['GET'])
 def get_pisos_agent_info():
     """Retorna informações do agente de pisos"""
     try:
@@ -898,7 +1043,7 @@ def get_pisos_agent_info():
 
 # ==================== ENDPOINTS PARA ORQUESTRADOR E REVISOR ====================
 
-@app.route('/api/orchestrator/route', methods=['POST'])
+@api.route('/api/orchestrator/route', methods=['POST'])
 def orchestrate_query():
     """Roteia consulta através do orquestrador inteligente"""
     try:
@@ -917,7 +1062,36 @@ def orchestrate_query():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/orchestrator/capabilities', methods=['GET'])
+@api.route('/api/llm/stats', methods=['GET'])
+def get_llm_stats():
+    """Métricas do gateway de LLM por chamador (latência, tokens, erros, circuito)"""
+    try:
+        return jsonify(llm_gateway.get_statistics())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/orchestrator/examples', methods=['POST'])
+def add_orchestrator_example():
+    """Adiciona uma consulta rotulada ao roteador local"""
+    try:
+        data = request.get_json()
+        user_query = data.get('query', '')
+        agent_id = data.get('agent', '')
+        
+        if not user_query or not agent_id:
+            return jsonify({'error': 'query e agent são obrigatórios'}), 400
+        
+        if not orchestrator_agent.add_routing_example(user_query, agent_id):
+            return jsonify({'error': f'Agente desconhecido: {agent_id}'}), 400
+        
+        return jsonify({
+            'message': 'Exemplo adicionado com sucesso',
+            'local_router': orchestrator_agent.local_router.get_statistics()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/orchestrator/capabilities', methods=['GET'])
 def get_orchestrator_capabilities():
     """Retorna capacidades do orquestrador e agentes disponíveis"""
     try:
@@ -925,15 +1099,22 @@ def get_orchestrator_capabilities():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/orchestrator/stats', methods=['GET'])
+@api.route('/api/orchestrator/stats', methods=['GET'])
 def get_orchestrator_stats():
     """Retorna estatísticas de conversas do orquestrador"""
     try:
-        return jsonify(orchestrator_agent.get_conversation_stats())
+        stats = orchestrator_agent.get_conversation_stats()
+        stats["speculative_retrieval"] = speculative_retriever.get_statistics()
+        stats["single_flight"] = {
+            "encode_tintas": search_system.encode_flight.get_statistics(),
+            "encode_pisos": pisos_search_system.encode_flight.get_statistics(),
+            "search": search_flight.get_statistics()
+        }
+        return jsonify(stats)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/orchestrator/clear-history', methods=['POST'])
+@api.route('/api/orchestrator/clear-history', methods=['POST'])
 def clear_orchestrator_history():
     """Limpa histórico de conversas do orquestrador"""
     try:
@@ -941,13 +1122,14 @@ def clear_orchestrator_history():
         session_id = data.get('session_id') if data else None
         
         orchestrator_agent.clear_conversation_history(session_id)
+        session_context_store.clear(session_id)
         
         message = f"Histórico {'da sessão ' + session_id if session_id else 'completo'} limpo com sucesso"
         return jsonify({'message': message})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/reviewer/review', methods=['POST'])
+@api.route('/api/reviewer/review', methods=['POST'])
 def review_response():
     """Revisa uma resposta de agente especialista"""
     try:
@@ -970,25 +1152,44 @@ def review_response():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/reviewer/batch-review', methods=['POST'])
+@api.route('/api/reviewer/batch-review', methods=['POST'])
 def batch_review_responses():
     """Revisa múltiplas respostas em lote"""
     try:
         data = request.get_json()
         responses = data.get('responses', [])
+        concurrency = data.get('concurrency')
         
         if not responses:
             return jsonify({'error': 'Lista de responses é obrigatória'}), 400
         
+        # Streaming NDJSON: uma linha por item assim que concluído, resumo no final
+        if data.get('stream'):
+            def generate():
+                reviews = []
+                failed = 0
+                for item in reviewer_agent.iter_batch_review(responses, concurrency):
+                    if 'review' in item:
+                        reviews.append(item['review'])
+                    else:
+                        failed += 1
+                    yield json.dumps(item, ensure_ascii=False) + "\n"
+                
+                summary = reviewer_agent.summarize_reviews(reviews)
+                summary['failed_count'] = failed
+                yield json.dumps({'summary': summary, 'batch_size': len(responses)}, ensure_ascii=False) + "\n"
+            
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
         # Revisar em lote
-        batch_result = reviewer_agent.batch_review(responses)
+        batch_result = reviewer_agent.batch_review(responses, concurrency)
         
         return jsonify(batch_result)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/reviewer/quality-report', methods=['GET'])
+@api.route('/api/reviewer/quality-report', methods=['GET'])
 def get_quality_report():
     """Retorna relatório de qualidade geral"""
     try:
@@ -996,7 +1197,7 @@ def get_quality_report():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/reviewer/improvement-suggestions', methods=['GET'])
+@api.route('/api/reviewer/improvement-suggestions', methods=['GET'])
 def get_improvement_suggestions():
     """Retorna sugestões de melhoria para um agente"""
     try:
@@ -1012,7 +1213,41 @@ def get_improvement_suggestions():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/reviewer/agent-info', methods=['GET'])
+@api.route('/api/reviewer/reviews/<review_id>', methods=['GET'])
+def get_async_review(review_id):
+    """Consulta o resultado de uma revisão assíncrona"""
+    try:
+        record = reviewer_agent.get_async_review(review_id)
+        if not record:
+            return jsonify({'error': 'Revisão não encontrada'}), 404
+        return jsonify(record)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/reviewer/reviews/<review_id>/stream', methods=['GET'])
+def stream_async_review(review_id):
+    """Entrega o resultado de uma revisão assíncrona via Server-Sent Events"""
+    if not reviewer_agent.get_async_review(review_id):
+        return jsonify({'error': 'Revisão não encontrada'}), 404
+    
+    timeout = request.args.get('timeout', 60, type=int)
+    
+    def generate():
+        waited = 0
+        while not reviewer_agent.wait_for_review(review_id, 5):
+            waited += 5
+            if waited >= timeout:
+                yield "event: timeout\ndata: {}\n\n"
+                return
+            yield ": aguardando revisão\n\n"  # keep-alive
+        
+        record = reviewer_agent.get_async_review(review_id)
+        yield f"event: review\ndata: {json.dumps(record, ensure_ascii=False)}\n\n"
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api.route('/api/reviewer/agent-info', methods=['GET'])
 def get_reviewer_agent_info():
     """Retorna informações do agente revisor"""
     try:
@@ -1022,64 +1257,253 @@ def get_reviewer_agent_info():
 
 # ==================== ENDPOINT INTEGRADO COM ORQUESTRAÇÃO E REVISÃO ====================
 
-@app.route('/api/smart-chat', methods=['POST'])
-def smart_chat():
+def tintas_agent_handler(user_query, session_id=None, search_results=None):
+    """Pipeline do agente de tintas: busca contextual (se não especulada) e resposta"""
+    if search_results is None:
+        search_results = contextual_search(search_system, "tintas", user_query, session_id, top_k=5)
+    # Aqui você poderia usar o agente de tintas para gerar resposta
+    return {
+        "response": f"Resposta do agente de tintas para: {user_query}",
+        "search_results": search_results
+    }
+
+def pisos_agent_handler(user_query, session_id=None, search_results=None):
+    """Pipeline do agente de pisos: busca contextual (se não especulada) e resposta"""
+    if search_results is None:
+        search_results = contextual_search(pisos_search_system, "pisos", user_query, session_id, top_k=5)
+    return {
+        "response": pisos_agent.generate_response(user_query, search_results),
+        "search_results": search_results
+    }
+
+orchestrator_agent.register_agent_handler("tintas", tintas_agent_handler)
+orchestrator_agent.register_agent_handler("pisos", pisos_agent_handler)
+
+# Buscas especulativas com os mesmos parâmetros dos handlers
+speculative_retriever.register("tintas", search_system, "tintas", top_k=5)
+speculative_retriever.register("pisos", pisos_search_system, "pisos", top_k=5)
+
+# Fração do orçamento de latência de cada estágio (a revisão fica com o restante)
+SMART_CHAT_STAGE_SHARES = {'routing': 0.35, 'retrieval': 0.35}
+SMART_CHAT_REVIEW_MIN_SECONDS = float(os.getenv('SMART_CHAT_REVIEW_MIN_MS', '500')) / 1000
+
+def smart_chat_retrieval(user_query, session_id, routing_result, speculation, retrieval_deadline):
     """
-    Endpoint inteligente que combina orquestração, busca especializada e revisão
+    Estágio de busca e resposta do(s) agente(s) escolhido(s) pelo roteamento
+    
+    Returns:
+        (search_results, agent_response, multi_agent)
     """
+    selected_agent = routing_result["routing_analysis"]["selected_agent"]
+    
+    if routing_result["routing_analysis"].get("requires_multiple_agents"):
+        # Consulta mista: pipelines em paralelo, latência do agente mais lento
+        agents = orchestrator_agent.select_agents(routing_result["routing_analysis"])
+        prefetched = {
+            agent: speculation.result_for(agent, retrieval_deadline.remaining()) for agent in agents
+        } if speculation else None
+        multi_agent = orchestrator_agent.fan_out(user_query, session_id, agents, prefetched,
+                                                 timeout=retrieval_deadline.remaining())
+        if multi_agent["timed_out"]:
+            retrieval_deadline.degrade("partial_results", f"Agentes fora do prazo: {', '.join(multi_agent['timed_out'])}")
+        return multi_agent["search_results"], multi_agent["response"], multi_agent
+    
+    if selected_agent in orchestrator_agent.agent_handlers:
+        prefetched = speculation.result_for(selected_agent, retrieval_deadline.remaining()) if speculation else None
+        future = orchestrator_agent.fanout_executor.submit(
+            orchestrator_agent.agent_handlers[selected_agent], user_query, session_id, prefetched
+        )
+        try:
+            agent_result = future.result(timeout=retrieval_deadline.remaining())
+        except FuturesTimeoutError:
+            future.cancel()
+            retrieval_deadline.degrade("no_results", "Busca do agente excedeu o prazo")
+            agent_result = {
+                "search_results": [],
+                "response": "Não foi possível obter resposta dos especialistas no momento."
+            }
+        return agent_result["search_results"], agent_result["response"], None
+    
+    return [], "Agente não identificado corretamente.", None
+
+def plan_smart_chat_review(review_mode, routing_result, agent_response, search_results, deadline):
+    """
+    Decide o modo efetivo da revisão (política de risco e prazo restante)
+    
+    Returns:
+        (review_mode, review_decision, sampling_weight, review_deadline)
+    """
+    selected_agent = routing_result["routing_analysis"]["selected_agent"]
+    review_decision = None
+    sampling_weight = 1.0
+    if review_mode == 'auto':
+        review_decision = reviewer_agent.decide_review(
+            selected_agent, agent_response,
+            routing_result["routing_analysis"].get("confidence"), search_results
+        )
+        review_mode = {'sync': 'sync', 'async': 'async', 'skip': 'off'}[review_decision["action"]]
+        sampling_weight = review_decision["sampling_weight"]
+    
+    # A revisão síncrona usa o que sobrou do prazo; sem tempo, vai para segundo plano
+    review_deadline = deadline.child('review')
+    if review_mode == 'sync' and review_deadline.near(SMART_CHAT_REVIEW_MIN_SECONDS):
+        review_deadline.degrade("async_review", "Prazo insuficiente para revisão síncrona")
+        review_mode = 'async'
+    
+    return review_mode, review_decision, sampling_weight, review_deadline
+
+def submit_smart_chat_review(user_query, agent_response, selected_agent, search_results,
+                             message_id, session_id, sampling_weight):
+    """Agenda a revisão em segundo plano e retorna a referência para consulta"""
+    review_id = reviewer_agent.submit_review(
+        user_query, agent_response, selected_agent, search_results,
+        message_id=message_id, session_id=session_id, sampling_weight=sampling_weight
+    )
+    return {
+        "review_id": review_id,
+        "status": "pending",
+        "poll_url": f"/api/reviewer/reviews/{review_id}",
+        "stream_url": f"/api/reviewer/reviews/{review_id}/stream"
+    }
+
+def smart_chat_pipeline(user_query, session_id, review_mode, message_id, speculative=False, budget_ms=2000):
+    """
+    Pipeline do smart-chat em estágios: orquestração, busca, resposta e revisão
+    
+    Gera tuplas (evento, dados) à medida que cada estágio termina; o último evento
+    ('done') traz a resposta integrada. Usado pelo endpoint JSON e pelo de streaming.
+    Com speculative=True as buscas de todos os agentes rodam em paralelo ao roteamento.
+    Cada estágio recebe um sub-prazo de budget_ms e degrada quando ele está no fim;
+    as degradações aplicadas são informadas em 'deadline'.
+    """
+    subsystems.get("agents")  # Sem aquecimento, conecta os modelos aos agentes na primeira conversa
+    deadline = Deadline.from_ms(budget_ms)
+    
+    # 0. Buscas especulativas (desativadas automaticamente sob carga)
+    speculation = speculative_retriever.start(user_query, session_id) if speculative else None
+    
     try:
-        data = request.get_json()
-        user_query = data.get('query', '')
-        session_id = data.get('session_id', f"session_{datetime.now().timestamp()}")
-        enable_review = data.get('enable_review', True)
-        
-        if not user_query:
-            return jsonify({'error': 'Query é obrigatória'}), 400
-        
         # 1. Orquestração - Identificar agente apropriado
-        routing_result = orchestrator_agent.route_query(user_query, session_id)
+        routing_deadline = deadline.child('routing', SMART_CHAT_STAGE_SHARES['routing'])
+        routing_result = orchestrator_agent.route_query(user_query, session_id, routing_deadline)
         selected_agent = routing_result["routing_analysis"]["selected_agent"]
+        yield 'routing', routing_result
         
-        # 2. Busca especializada no agente identificado
-        if selected_agent == "tintas":
-            search_results = search_system.search(user_query, top_k=5)
-            # Aqui você poderia usar o agente de tintas para gerar resposta
-            agent_response = f"Resposta do agente de tintas para: {user_query}"
-        elif selected_agent == "pisos":
-            search_results = pisos_search_system.search(user_query, top_k=5)
-            agent_response = pisos_agent.generate_response(user_query, search_results)
-        else:
-            search_results = []
-            agent_response = "Agente não identificado corretamente."
-        
-        # 3. Revisão da resposta (se habilitada)
-        review_result = None
-        if enable_review:
-            review_result = reviewer_agent.review_response(
-                user_query, agent_response, selected_agent, search_results
-            )
-            
-            # Usar resposta melhorada se disponível
-            if review_result.get("improved_response"):
-                agent_response = review_result["improved_response"]
+        # 2. Busca especializada no(s) agente(s) identificado(s)
+        retrieval_deadline = deadline.child('retrieval', SMART_CHAT_STAGE_SHARES['retrieval'])
+        search_results, agent_response, multi_agent = smart_chat_retrieval(
+            user_query, session_id, routing_result, speculation, retrieval_deadline
+        )
+    finally:
+        if speculation:
+            speculation.discard_unused()
+    yield 'search', {"search_results": search_results, "multi_agent": multi_agent, "speculative": speculation is not None}
+    yield 'response', {"agent_response": agent_response, "agent": selected_agent}
+    
+    # 3. Revisão da resposta (se habilitada)
+    review_result = None
+    review_mode, review_decision, sampling_weight, review_deadline = plan_smart_chat_review(
+        review_mode, routing_result, agent_response, search_results, deadline
+    )
+    
+    if review_mode == 'async':
+        review_result = submit_smart_chat_review(
+            user_query, agent_response, selected_agent, search_results,
+            message_id, session_id, sampling_weight
+        )
+    elif review_mode == 'sync':
+        review_result = reviewer_agent.review_response(
+            user_query, agent_response, selected_agent, search_results, sampling_weight,
+            timeout=review_deadline.remaining()
+        )
         
-        # 4. Resposta final integrada
-        return jsonify({
-            "user_query": user_query,
-            "session_id": session_id,
-            "routing": routing_result,
-            "agent_response": agent_response,
-            "search_results": search_results,
-            "review": review_result,
-            "timestamp": datetime.now().isoformat()
-        })
+        # Usar resposta melhorada se disponível
+        if review_result.get("improved_response"):
+            agent_response = review_result["improved_response"]
+    
+    if review_result is not None:
+        yield 'review', {"review": review_result, "review_mode": review_mode, "review_decision": review_decision}
+    
+    # 4. Resposta final integrada
+    yield 'done', {
+        "user_query": user_query,
+        "session_id": session_id,
+        "message_id": message_id,
+        "routing": routing_result,
+        "agent_response": agent_response,
+        "search_results": search_results,
+        "multi_agent": multi_agent,
+        "review": review_result,
+        "review_mode": review_mode,
+        "review_decision": review_decision,
+        "speculative": speculation is not None,
+        "deadline": deadline.to_dict(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+def _parse_smart_chat_request(data):
+    """Valida o corpo do smart-chat; retorna (parâmetros, erro)"""
+    user_query = data.get('query', '')
+    session_id = data.get('session_id', f"session_{datetime.now().timestamp()}")
+    enable_review = data.get('enable_review', True)
+    # sync: revisa antes de responder | async: responde já e revisa em segundo plano | off
+    # auto: a política de risco do revisor escolhe entre sync, async e dispensar
+    review_mode = data.get('review_mode', os.getenv('REVIEW_DEFAULT_MODE', 'auto') if enable_review else 'off')
+    # Orçamento de latência da requisição (ms)
+    budget_ms = data.get('latency_budget_ms', float(os.getenv('SMART_CHAT_BUDGET_MS', '2000')))
+    
+    if not user_query:
+        return None, 'Query é obrigatória'
+    if review_mode not in ('sync', 'async', 'auto', 'off'):
+        return None, 'review_mode deve ser sync, async, auto ou off'
+    if not isinstance(budget_ms, (int, float)) or budget_ms <= 0:
+        return None, 'latency_budget_ms deve ser um número positivo'
+    
+    return {
+        'user_query': user_query,
+        'session_id': session_id,
+        'review_mode': review_mode,
+        'message_id': str(uuid.uuid4()),
+        'speculative': bool(data.get('speculative', os.getenv('SPECULATIVE_RETRIEVAL', 'false').lower() == 'true')),
+        'budget_ms': budget_ms
+    }, None
+
+@api.route('/api/smart-chat', methods=['POST'])
+def smart_chat():
+    """
+    Endpoint inteligente que combina orquestração, busca especializada e revisão
+    """
+    try:
+        params, error = _parse_smart_chat_request(request.get_json())
+        if error:
+            return jsonify({'error': error}), 400
+        
+        for event, payload in smart_chat_pipeline(**params):
+            if event == 'done':
+                return jsonify(payload)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/smart-chat/stream', methods=['POST'])
+def smart_chat_stream():
+    """
+    Smart-chat via Server-Sent Events: emite routing, search, response, review e done
+    conforme cada estágio termina (o primeiro byte sai após o roteamento)
+    """
+    try:
+        params, error = _parse_smart_chat_request(request.get_json())
+        if error:
+            return jsonify({'error': error}), 400
+        
+        return _sse_response(smart_chat_pipeline(**params))
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # ==================== ENDPOINTS PARA UPLOAD E PROCESSAMENTO DE PDFs ====================
 
-@app.route('/api/upload/pdf', methods=['POST'])
+@api.route('/api/upload/pdf', methods=['POST'])
 def upload_pdf():
     """Upload de arquivo PDF para processamento"""
     try:
@@ -1103,7 +1527,7 @@ def upload_pdf():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/upload/process/<file_id>', methods=['POST'])
+@api.route('/api/upload/process/<file_id>', methods=['POST'])
 def process_pdf(file_id):
     """Processa PDF enviado e extrai informações"""
     try:
@@ -1142,7 +1566,7 @@ def process_pdf(file_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/upload/history', methods=['GET'])
+@api.route('/api/upload/history', methods=['GET'])
 def get_upload_history():
     """Retorna histórico de uploads e processamentos"""
     try:
@@ -1157,7 +1581,7 @@ def get_upload_history():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/upload/products/<file_id>', methods=['GET'])
+@api.route('/api/upload/products/<file_id>', methods=['GET'])
 def get_processed_products(file_id):
     """Retorna produtos extraídos de um arquivo específico"""
     try:
@@ -1172,7 +1596,7 @@ def get_processed_products(file_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/upload/stats', methods=['GET'])
+@api.route('/api/upload/stats', methods=['GET'])
 def get_upload_stats():
     """Retorna estatísticas de uploads"""
     try:
@@ -1181,7 +1605,7 @@ def get_upload_stats():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/upload/cleanup', methods=['POST'])
+@api.route('/api/upload/cleanup', methods=['POST'])
 def cleanup_temp_files():
     """Remove arquivos temporários antigos"""
     try:
@@ -1194,7 +1618,7 @@ def cleanup_temp_files():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/upload/integrate-products', methods=['POST'])
+@api.route('/api/upload/integrate-products', methods=['POST'])
 def integrate_processed_products():
     """Integra produtos processados à base de conhecimento"""
     try:
@@ -1213,30 +1637,34 @@ def integrate_processed_products():
         
         # Integrar à base de conhecimento apropriada
         integrated_count = 0
+        dedup_reports = {}
         
         if agent_type == "tintas":
-            # Adicionar à base de conhecimento de tintas
-            for product in products:
-                search_system.add_knowledge_item(product)
-                integrated_count += 1
-        
+            targets = {'tintas': search_system}
         elif agent_type == "pisos":
-            # Adicionar à base de conhecimento de pisos
-            for product in products:
-                pisos_search_system.add_knowledge_item(product)
-                integrated_count += 1
-        
+            targets = {'pisos': pisos_search_system}
         else:
             # Adicionar a ambas as bases (produtos genéricos)
-            for product in products:
-                search_system.add_knowledge_item(product)
-                pisos_search_system.add_knowledge_item(product)
-                integrated_count += 1
+            targets = {'tintas': search_system, 'pisos': pisos_search_system}
+        
+        for target_type, target_system in targets.items():
+            # Descartar produtos que já estão indexados
+            unique_products, dedup_reports[target_type] = knowledge_deduplicator.deduplicate_against(
+                target_system.knowledge_base,
+                [dict(product) for product in products],
+                encode_fn=target_system.model.encode,
+                source=f'pdf_upload:{file_id}',
+                update_fn=lambda item, changes, system=target_system: system.update_knowledge_item(item, {**item, **changes})
+            )
+            for product in unique_products:
+                target_system.add_knowledge_item(product)
+            integrated_count = max(integrated_count, len(unique_products))
         
         return jsonify({
             'message': f'{integrated_count} produtos integrados com sucesso à base de conhecimento',
             'integrated_count': integrated_count,
-            'agent_type': agent_type
+            'agent_type': agent_type,
+            'dedup_reports': dedup_reports
         })
     
     except Exception as e:
@@ -1244,7 +1672,7 @@ def integrate_processed_products():
 
 # ==================== ENDPOINTS PARA EDITOR DE BASE DE CONHECIMENTO ====================
 
-@app.route('/api/knowledge/items', methods=['GET'])
+@api.route('/api/knowledge/items', methods=['GET'])
 def get_knowledge_items():
     """Retorna itens de conhecimento com filtros opcionais"""
     try:
@@ -1285,7 +1713,7 @@ def get_knowledge_items():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/knowledge/items', methods=['POST'])
+@api.route('/api/knowledge/items', methods=['POST'])
 def create_knowledge_item():
     """Cria um novo item de conhecimento"""
     try:
@@ -1319,7 +1747,7 @@ def create_knowledge_item():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/knowledge/items/<item_id>', methods=['GET'])
+@api.route('/api/knowledge/items/<item_id>', methods=['GET'])
 def get_knowledge_item(item_id):
     """Retorna um item específico de conhecimento"""
     try:
@@ -1333,7 +1761,7 @@ def get_knowledge_item(item_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/knowledge/items/<item_id>', methods=['PUT'])
+@api.route('/api/knowledge/items/<item_id>', methods=['PUT'])
 def update_knowledge_item(item_id):
     """Atualiza um item de conhecimento"""
     try:
@@ -1370,7 +1798,7 @@ def update_knowledge_item(item_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/knowledge/items/<item_id>', methods=['DELETE'])
+@api.route('/api/knowledge/items/<item_id>', methods=['DELETE'])
 def delete_knowledge_item(item_id):
     """Remove um item de conhecimento"""
     try:
@@ -1384,7 +1812,7 @@ def delete_knowledge_item(item_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/knowledge/items/<item_id>/duplicate', methods=['POST'])
+@api.route('/api/knowledge/items/<item_id>/duplicate', methods=['POST'])
 def duplicate_knowledge_item(item_id):
     """Duplica um item de conhecimento"""
     try:
@@ -1404,7 +1832,7 @@ def duplicate_knowledge_item(item_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/knowledge/categories', methods=['GET'])
+@api.route('/api/knowledge/categories', methods=['GET'])
 def get_knowledge_categories():
     """Retorna categorias disponíveis"""
     try:
@@ -1413,13 +1841,28 @@ def get_knowledge_categories():
         
         return jsonify({
             'categories': categories,
-            'all_categories': knowledge_editor.categories
+            'all_categories': knowledge_editor.categories,
+            'counts': knowledge_editor.get_category_counts(agent_type)
         })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/knowledge/templates', methods=['GET'])
+@api.route('/api/knowledge/dedup-report', methods=['GET'])
+def get_dedup_reports():
+    """Retorna relatórios de deduplicação da base de conhecimento"""
+    try:
+        limit = int(request.args.get('limit', 10))
+        reports = knowledge_deduplicator.get_reports(limit)
+        
+        return jsonify({
+            'reports': reports,
+            'count': len(reports)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/knowledge/templates', methods=['GET'])
 def get_knowledge_templates():
     """Retorna templates disponíveis"""
     try:
@@ -1428,7 +1871,7 @@ def get_knowledge_templates():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/knowledge/stats', methods=['GET'])
+@api.route('/api/knowledge/stats', methods=['GET'])
 def get_knowledge_stats():
     """Retorna estatísticas da base de conhecimento"""
     try:
@@ -1437,7 +1880,7 @@ def get_knowledge_stats():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/knowledge/export', methods=['GET'])
+@api.route('/api/knowledge/export', methods=['GET'])
 def export_knowledge():
     """Exporta base de conhecimento"""
     try:
@@ -1456,7 +1899,7 @@ def export_knowledge():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/knowledge/import', methods=['POST'])
+@api.route('/api/knowledge/import', methods=['POST'])
 def import_knowledge():
     """Importa base de conhecimento"""
     try:
@@ -1465,10 +1908,13 @@ def import_knowledge():
         if not data or 'data' not in data or 'agent_type' not in data:
             return jsonify({'error': 'Dados e agent_type são obrigatórios'}), 400
         
+        # Embeddings da base do agente confirmam as duplicatas (demais agentes: só revisão)
+        agent_search = {'tintas': search_system, 'pisos': pisos_search_system}.get(data['agent_type'])
         result = knowledge_editor.import_knowledge(
             data=data['data'],
             agent_type=data['agent_type'],
-            merge=data.get('merge', True)
+            merge=data.get('merge', True),
+            encode_fn=agent_search.model.encode if agent_search else None
         )
         
         return jsonify(result)
@@ -1476,7 +1922,7 @@ def import_knowledge():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/knowledge/validate', methods=['POST'])
+@api.route('/api/knowledge/validate', methods=['POST'])
 def validate_knowledge_item():
     """Valida um item de conhecimento"""
     try:
@@ -1494,7 +1940,7 @@ def validate_knowledge_item():
 
 # ==================== ENDPOINTS PARA VERSIONAMENTO ====================
 
-@app.route('/api/versions/items/<item_id>', methods=['GET'])
+@api.route('/api/versions/items/<item_id>', methods=['GET'])
 def get_item_versions(item_id):
     """Retorna histórico de versões de um item"""
     try:
@@ -1510,7 +1956,7 @@ def get_item_versions(item_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/versions/items/<item_id>/current', methods=['GET'])
+@api.route('/api/versions/items/<item_id>/current', methods=['GET'])
 def get_current_item_version(item_id):
     """Retorna a versão atual de um item"""
     try:
@@ -1524,7 +1970,7 @@ def get_current_item_version(item_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/versions/<version_id>', methods=['GET'])
+@api.route('/api/versions/<version_id>', methods=['GET'])
 def get_version_by_id(version_id):
     """Retorna uma versão específica pelo ID"""
     try:
@@ -1538,7 +1984,7 @@ def get_version_by_id(version_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/versions', methods=['POST'])
+@api.route('/api/versions', methods=['POST'])
 def create_version():
     """Cria uma nova versão de um item"""
     try:
@@ -1567,7 +2013,7 @@ def create_version():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/versions/rollback', methods=['POST'])
+@api.route('/api/versions/rollback', methods=['POST'])
 def rollback_version():
     """Faz rollback para uma versão específica"""
     try:
@@ -1596,7 +2042,7 @@ def rollback_version():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/versions/compare', methods=['POST'])
+@api.route('/api/versions/compare', methods=['POST'])
 def compare_versions():
     """Compara duas versões"""
     try:
@@ -1617,7 +2063,7 @@ def compare_versions():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/versions/branches', methods=['POST'])
+@api.route('/api/versions/branches', methods=['POST'])
 def create_branch():
     """Cria uma branch a partir de uma versão"""
     try:
@@ -1645,7 +2091,7 @@ def create_branch():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/versions/merge', methods=['POST'])
+@api.route('/api/versions/merge', methods=['POST'])
 def merge_branch():
     """Faz merge de uma branch com o item principal"""
     try:
@@ -1674,7 +2120,7 @@ def merge_branch():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/versions/tags', methods=['POST'])
+@api.route('/api/versions/tags', methods=['POST'])
 def tag_version():
     """Adiciona tags a uma versão"""
     try:
@@ -1698,7 +2144,7 @@ def tag_version():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/versions/tags/<tag>', methods=['GET'])
+@api.route('/api/versions/tags/<tag>', methods=['GET'])
 def get_versions_by_tag(tag):
     """Retorna versões que possuem uma tag específica"""
     try:
@@ -1713,7 +2159,7 @@ def get_versions_by_tag(tag):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/versions/logs', methods=['GET'])
+@api.route('/api/versions/logs', methods=['GET'])
 def get_change_logs():
     """Retorna logs de mudanças com filtros opcionais"""
     try:
@@ -1743,7 +2189,7 @@ def get_change_logs():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/versions/stats', methods=['GET'])
+@api.route('/api/versions/stats', methods=['GET'])
 def get_version_stats():
     """Retorna estatísticas de versionamento"""
     try:
@@ -1752,7 +2198,7 @@ def get_version_stats():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/versions/export', methods=['GET'])
+@api.route('/api/versions/export', methods=['GET'])
 def export_versions():
     """Exporta versões em formato JSON"""
     try:
@@ -1768,7 +2214,7 @@ def export_versions():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/versions/import', methods=['POST'])
+@api.route('/api/versions/import', methods=['POST'])
 def import_versions():
     """Importa versões de formato JSON"""
     try:
@@ -1784,19 +2230,24 @@ def import_versions():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/health', methods=['GET'])
 def health_check():
-    """Endpoint para verificar se a API está funcionando"""
+    """
+    Endpoint para verificar se a API está funcionando
+    
+    Não espera o aquecimento: subsistemas ainda não inicializados aparecem como None
+    (o estado detalhado fica em /api/ready).
+    """
     return jsonify({
         'status': 'healthy',
         'message': 'API do Agente Especialista em Tintas está funcionando',
         'services': {
-            'tintas_knowledge_base_size': len(search_system.knowledge_base),
-            'pisos_knowledge_base_size': len(pisos_search_system.knowledge_base),
+            'tintas_knowledge_base_size': len(search_system.knowledge_base) if subsystems.is_ready('tintas_search') else None,
+            'pisos_knowledge_base_size': len(pisos_search_system.knowledge_base) if subsystems.is_ready('pisos_search') else None,
             'products_count': len(product_manager.get_all_products()),
-            'supabase_connected': supabase_manager.is_connected(),
+            'supabase_connected': supabase_manager.is_connected() if subsystems.is_ready('supabase') else None,
             'evolution_api_configured': evolution_client.is_configured(),
-            'prompts_loaded': len(prompt_manager.get_all_prompts()),
+            'prompts_loaded': len(prompt_manager.get_all_prompts()) if subsystems.is_ready('prompts') else None,
             'agents_available': ['tintas', 'pisos', 'orquestrador', 'revisor'],
             'orchestrator_openai': orchestrator_agent._is_openai_available(),
             'reviewer_openai': reviewer_agent._is_openai_available()
@@ -1804,12 +2255,50 @@ def health_check():
         'timestamp': datetime.now().isoformat()
     })
 
+@api.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """
+    Probe de prontidão: estado de cada subsistema e tempos de startup
+    
+    Retorna 503 enquanto algum subsistema não estiver pronto (aquecimento em andamento ou falha).
+    """
+    readiness = subsystems.readiness()
+    readiness['timestamp'] = datetime.now().isoformat()
+    return jsonify(readiness), 200 if readiness['ready'] else 503
+
+# Ordem do aquecimento: o caminho das conversas primeiro, PDFs por último
+WARM_UP_ORDER = ['supabase', 'prompts', 'tintas_search', 'pisos_search', 'agents', 'whatsapp_service', 'pdf_processor']
+
+def create_app(warm_up: bool = None) -> Flask:
+    """
+    Cria a aplicação Flask (app factory)
+    
+    Args:
+        warm_up: Inicializar os subsistemas pesados em segundo plano
+                 (padrão: WARM_UP_ON_START, ligado; desligado, cada um carrega no primeiro uso)
+    
+    Returns:
+        Aplicação com as rotas da API registradas
+    """
+    flask_app = Flask(__name__)
+    CORS(flask_app)  # Permitir requisições do frontend React
+    flask_app.register_blueprint(api)
+    subsystems.mark("app_created")
+    
+    if warm_up is None:
+        warm_up = os.getenv('WARM_UP_ON_START', 'true').lower() == 'true'
+    if warm_up:
+        subsystems.warm_up(WARM_UP_ORDER)
+    
+    return flask_app
+
+app = create_app()
+
 if __name__ == '__main__':
     print("🚀 Iniciando servidor Flask integrado...")
     print("📊 Sistemas disponíveis:")
-    print(f"   - Busca Semântica: {len(search_system.knowledge_base)} itens")
     print(f"   - Produtos: {len(product_manager.get_all_products())} itens")
-    print(f"   - Supabase: {'✅ Conectado' if supabase_manager.is_connected() else '❌ Não conectado'}")
+    print("   - Busca Semântica, Supabase, WhatsApp e PDFs: aquecendo em segundo plano (GET /api/ready)")
     print(f"   - Evolution API: {'✅ Configurada' if evolution_client.is_configured() else '❌ Não configurada'}")
     print("🌐 Servidor rodando em http://0.0.0.0:5000")
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,321 @@
+"""
+Servidor ASGI da API
+Serve as mesmas rotas do app Flask: os endpoints de conversa (chat, smart-chat e
+envio pelo WhatsApp) têm handlers assíncronos — Supabase, Evolution API e OpenAI
+via clientes assíncronos, codificação de embeddings no pool de threads — e todas
+as demais rotas continuam no Flask, montado via WSGI.
+
+Uso:
+    uvicorn asgi_app:asgi_app --host 0.0.0.0 --port 5000
+"""
+
+import os
+import json
+import asyncio
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route, Mount
+
+from app import (
+    app as flask_app,
+    search_system,
+    generate_agent_response,
+    smart_chat_retrieval,
+    plan_smart_chat_review,
+    submit_smart_chat_review,
+    _parse_smart_chat_request,
+    _sse_event,
+    SMART_CHAT_STAGE_SHARES
+)
+from supabase_client import async_supabase_manager
+from evolution_api_client import async_evolution_client
+from orchestrator_agent import orchestrator_agent
+from reviewer_agent import reviewer_agent
+from session_context import contextual_search
+from speculative_retrieval import speculative_retriever
+from deadline import Deadline
+from llm_gateway import llm_gateway
+from lazy_subsystems import subsystems
+
+# Threads para os estágios de CPU (codificação de embeddings, busca vetorial).
+# Threads e não processos: os modelos não são serializáveis e o torch libera o GIL.
+ASGI_CPU_WORKERS = int(os.getenv('ASGI_CPU_WORKERS', str(min(32, (os.cpu_count() or 1) + 4))))
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=ASGI_CPU_WORKERS, thread_name_prefix="asgi-cpu"))
+    print(f"✅ Servidor ASGI iniciado - {ASGI_CPU_WORKERS} threads para CPU")
+    yield
+    await llm_gateway.aclose()
+    await async_evolution_client.aclose()
+
+
+def _json_response(payload, status_code=200):
+    """JSON com a mesma serialização tolerante do jsonify (datas como texto)"""
+    return Response(json.dumps(payload, ensure_ascii=False, default=str),
+                    status_code=status_code, media_type='application/json')
+
+
+def _sse_stream(stages):
+    """Transmite os estágios (evento, dados) de um pipeline assíncrono como SSE"""
+    async def generate():
+        try:
+            async for event, payload in stages:
+                yield _sse_event(event, payload)
+        except Exception as e:
+            yield _sse_event('error', {'error': str(e)})
+
+    return StreamingResponse(generate(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+async def _request_json(request: Request):
+    try:
+        return await request.json()
+    except ValueError:
+        return {}
+
+# ==================== CHAT ====================
+
+async def chat_pipeline(message, session_id):
+    """Versão assíncrona de app.chat_pipeline (mesmos eventos)"""
+    # Buscar ou criar conversa
+    conversation = await async_supabase_manager.get_conversation_by_session(session_id)
+    if not conversation:
+        conversation_id = await async_supabase_manager.create_conversation(
+            session_id=session_id,
+            platform='web'
+        )
+        conversation = {'id': conversation_id, 'session_id': session_id}
+
+    # Salvar mensagem do usuário
+    await async_supabase_manager.save_message(
+        conversation['id'],
+        'user',
+        message,
+        {'platform': 'web'}
+    )
+
+    # Busca (codificação da consulta) no pool de threads
+    search_results = await asyncio.to_thread(
+        contextual_search, search_system, "tintas", message, session_id,
+        top_k=3, similarity_threshold=0.2
+    )
+    yield 'search', {'search_results': search_results}
+
+    response = generate_agent_response(message, search_results)
+    yield 'response', {'agent_response': response}
+
+    # Salvar resposta do agente
+    await async_supabase_manager.save_message(
+        conversation['id'],
+        'agent',
+        response,
+        {'search_results': search_results, 'platform': 'web'}
+    )
+
+    yield 'done', {
+        'user_message': message,
+        'agent_response': response,
+        'search_results': search_results,
+        'session_id': session_id
+    }
+
+
+def _parse_chat_request(data):
+    message = data.get('message', '')
+    session_id = data.get('session_id', f"web_{datetime.now().timestamp()}")
+    return message, session_id
+
+
+async def chat_with_agent(request: Request):
+    """Endpoint para chat com o agente especialista"""
+    try:
+        message, session_id = _parse_chat_request(await _request_json(request))
+        if not message:
+            return _json_response({'error': 'Mensagem é obrigatória'}, 400)
+
+        async for event, payload in chat_pipeline(message, session_id):
+            if event == 'done':
+                return _json_response(payload)
+
+    except Exception as e:
+        return _json_response({'error': str(e)}, 500)
+
+
+async def chat_with_agent_stream(request: Request):
+    """Chat com o agente especialista via Server-Sent Events (search, response, done)"""
+    try:
+        message, session_id = _parse_chat_request(await _request_json(request))
+        if not message:
+            return _json_response({'error': 'Mensagem é obrigatória'}, 400)
+
+        return _sse_stream(chat_pipeline(message, session_id))
+
+    except Exception as e:
+        return _json_response({'error': str(e)}, 500)
+
+# ==================== SMART-CHAT ====================
+
+async def smart_chat_pipeline(user_query, session_id, review_mode, message_id, speculative=False, budget_ms=2000):
+    """
+    Versão assíncrona de app.smart_chat_pipeline (mesmos eventos e prazos)
+
+    Roteamento e revisão aguardam a OpenAI sem ocupar threads; a busca dos agentes
+    roda no pool de threads.
+    """
+    await asyncio.to_thread(subsystems.get, "agents")
+    deadline = Deadline.from_ms(budget_ms)
+
+    # 0. Buscas especulativas (desativadas automaticamente sob carga)
+    speculation = speculative_retriever.start(user_query, session_id) if speculative else None
+
+    try:
+        # 1. Orquestração
+        routing_deadline = deadline.child('routing', SMART_CHAT_STAGE_SHARES['routing'])
+        routing_result = await orchestrator_agent.aroute_query(user_query, session_id, routing_deadline)
+        selected_agent = routing_result["routing_analysis"]["selected_agent"]
+        yield 'routing', routing_result
+
+        # 2. Busca especializada
+        retrieval_deadline = deadline.child('retrieval', SMART_CHAT_STAGE_SHARES['retrieval'])
+        search_results, agent_response, multi_agent = await asyncio.to_thread(
+            smart_chat_retrieval, user_query, session_id, routing_result, speculation, retrieval_deadline
+        )
+    finally:
+        if speculation:
+            speculation.discard_unused()
+    yield 'search', {"search_results": search_results, "multi_agent": multi_agent, "speculative": speculation is not None}
+    yield 'response', {"agent_response": agent_response, "agent": selected_agent}
+
+    # 3. Revisão da resposta (se habilitada)
+    review_result = None
+    review_mode, review_decision, sampling_weight, review_deadline = plan_smart_chat_review(
+        review_mode, routing_result, agent_response, search_results, deadline
+    )
+
+    if review_mode == 'async':
+        review_result = submit_smart_chat_review(
+            user_query, agent_response, selected_agent, search_results,
+            message_id, session_id, sampling_weight
+        )
+    elif review_mode == 'sync':
+        review_result = await reviewer_agent.areview_response(
+            user_query, agent_response, selected_agent, search_results, sampling_weight,
+            timeout=review_deadline.remaining()
+        )
+
+        if review_result.get("improved_response"):
+            agent_response = review_result["improved_response"]
+
+    if review_result is not None:
+        yield 'review', {"review": review_result, "review_mode": review_mode, "review_decision": review_decision}
+
+    # 4. Resposta final integrada
+    yield 'done', {
+        "user_query": user_query,
+        "session_id": session_id,
+        "message_id": message_id,
+        "routing": routing_result,
+        "agent_response": agent_response,
+        "search_results": search_results,
+        "multi_agent": multi_agent,
+        "review": review_result,
+        "review_mode": review_mode,
+        "review_decision": review_decision,
+        "speculative": speculation is not None,
+        "deadline": deadline.to_dict(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+async def smart_chat(request: Request):
+    """Endpoint inteligente que combina orquestração, busca especializada e revisão"""
+    try:
+        params, error = _parse_smart_chat_request(await _request_json(request))
+        if error:
+            return _json_response({'error': error}, 400)
+
+        async for event, payload in smart_chat_pipeline(**params):
+            if event == 'done':
+                return _json_response(payload)
+
+    except Exception as e:
+        return _json_response({'error': str(e)}, 500)
+
+
+async def smart_chat_stream(request: Request):
+    """Smart-chat via Server-Sent Events: routing, search, response, review e done"""
+    try:
+        params, error = _parse_smart_chat_request(await _request_json(request))
+        if error:
+            return _json_response({'error': error}, 400)
+
+        return _sse_stream(smart_chat_pipeline(**params))
+
+    except Exception as e:
+        return _json_response({'error': str(e)}, 500)
+
+# ==================== WHATSAPP ====================
+
+async def send_whatsapp_message(request: Request):
+    """Endpoint para enviar mensagem via WhatsApp"""
+    try:
+        data = await _request_json(request)
+        phone_number = data.get('phone_number', '')
+        message = data.get('message', '')
+
+        if not phone_number or not message:
+            return _json_response({'error': 'Número e mensagem são obrigatórios'}, 400)
+
+        result = await async_evolution_client.send_text_message(phone_number, message)
+
+        # Log da atividade
+        await async_supabase_manager.log_activity(
+            'whatsapp_message_sent',
+            'message',
+            None,
+            {
+                'phone_number': phone_number,
+                'message_length': len(message),
+                'success': not result.get('error'),
+                'timestamp': datetime.now().isoformat()
+            }
+        )
+
+        return _json_response(result)
+
+    except Exception as e:
+        return _json_response({'error': str(e)}, 500)
+
+
+asgi_app = Starlette(
+    routes=[
+        Route('/api/chat', chat_with_agent, methods=['POST']),
+        Route('/api/chat/stream', chat_with_agent_stream, methods=['POST']),
+        Route('/api/smart-chat', smart_chat, methods=['POST']),
+        Route('/api/smart-chat/stream', smart_chat_stream, methods=['POST']),
+        Route('/api/whatsapp/send', send_whatsapp_message, methods=['POST']),
+        # Demais rotas: app Flask original
+        Mount('/', app=WSGIMiddleware(flask_app))
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    print("🚀 Iniciando servidor ASGI...")
+    print("🌐 Servidor rodando em http://0.0.0.0:5000")
+    uvicorn.run(asgi_app, host='0.0.0.0', port=5000)
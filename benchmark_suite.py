@@ -0,0 +1,418 @@
+"""
+Suíte de Benchmarks
+Mede vazão e latência de cauda (p50/p95/p99) de ponta a ponta sem depender da
+OpenAI: sobe o servidor stub local, aponta o gateway de LLM para ele via
+OPENAI_BASE_URL e dispara requisições concorrentes contra os alvos escolhidos.
+Os resultados são gravados em bench_output.txt.
+
+Uso:
+    python benchmark_suite.py --targets gateway smart_chat --requests 200 --concurrency 16 --latency-ms 300
+
+Os alvos flask_server e asgi_server sobem o servidor real (werkzeug com threads e
+uvicorn, respectivamente) e medem o mesmo POST /api/smart-chat via HTTP, para
+comparar a vazão dos dois modos de servir a API.
+
+Os alvos de startup medem o processo web a frio: import_profile resume o
+`python -X importtime` da importação do app e health_startup mede quanto tempo
+/api/health leva para responder num processo novo (meta em HEALTH_STARTUP_TARGET_MS).
+"""
+
+import os
+import time
+import json
+import sys
+import socket
+import argparse
+import subprocess
+import threading
+import urllib.error
+import urllib.request
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Callable
+
+from openai_stub_server import OpenAIStubServer, StubConfig, LATENCY_DISTRIBUTIONS
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_FILE = os.path.join(PROJECT_DIR, "bench_output.txt")
+
+# Meta de startup: /api/health respondendo num processo novo (aquecimento em segundo plano)
+HEALTH_STARTUP_TARGET_MS = float(os.getenv('HEALTH_STARTUP_TARGET_MS', '3000'))
+
+# Consultas representativas (tintas, pisos, ambíguas e múltiplos agentes)
+BENCHMARK_QUERIES = [
+    "Qual tinta é melhor para parede de banheiro com umidade?",
+    "Preciso de um verniz para deck de madeira exposto ao sol",
+    "Qual o rendimento da tinta acrílica fosca por galão?",
+    "Porcelanato ou cerâmica para cozinha com muito tráfego?",
+    "Qual piso laminado é indicado para quarto?",
+    "Piso vinílico pode ser instalado sobre cerâmica antiga?",
+    "Quero reformar a sala: piso novo e pintar as paredes",
+    "Qual revestimento e qual tinta usar em área externa?",
+    "Vocês têm algo para o chão da varanda?",
+    "Preciso de um produto para proteger a parede da garagem"
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por interpolação linear (valores em qualquer ordem)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def run_load(request_fn: Callable[[int], bool], total_requests: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Executa requisições concorrentes e coleta latências
+
+    Args:
+        request_fn: Função que recebe o índice da requisição e retorna True se teve sucesso
+        total_requests: Total de requisições
+        concurrency: Requisições simultâneas
+
+    Returns:
+        Vazão, taxa de erros e percentis de latência
+    """
+    def timed(index: int):
+        start = time.perf_counter()
+        try:
+            ok = bool(request_fn(index))
+        except Exception:
+            ok = False
+        return ok, (time.perf_counter() - start) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, range(total_requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for _, latency in results]
+    errors = sum(1 for ok, _ in results if not ok)
+
+    return {
+        "requests": total_requests,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total_requests / elapsed, 2) if elapsed > 0 else 0,
+        "error_rate": round(errors / total_requests, 4) if total_requests else 0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 1),
+            "p95": round(percentile(latencies, 95), 1),
+            "p99": round(percentile(latencies, 99), 1),
+            "max": round(max(latencies), 1) if latencies else 0
+        }
+    }
+
+
+def bench_gateway(total_requests: int, concurrency: int) -> Dict[str, Any]:
+    """Chamadas de roteamento diretas pelo gateway de LLM (overhead do gateway + stub)"""
+    from llm_gateway import llm_gateway
+
+    client = llm_gateway.client_for("benchmark")
+    if client is None:
+        raise RuntimeError("Gateway de LLM indisponível (openai/httpx não instalados?)")
+
+    def request(index: int) -> bool:
+        query = BENCHMARK_QUERIES[index % len(BENCHMARK_QUERIES)]
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": 'Responda em JSON com "selected_agent".'},
+                {"role": "user", "content": f'CONSULTA DO CLIENTE: "{query}"'}
+            ],
+            max_tokens=200
+        )
+        return "selected_agent" in response.choices[0].message.content
+
+    result = run_load(request, total_requests, concurrency)
+    result["gateway"] = llm_gateway.get_statistics()["callers"].get("benchmark", {})
+    return result
+
+
+def bench_smart_chat(total_requests: int, concurrency: int) -> Dict[str, Any]:
+    """POST /api/smart-chat de ponta a ponta (roteamento, busca, resposta e revisão)"""
+    from app import app
+
+    def request(index: int) -> bool:
+        query = BENCHMARK_QUERIES[index % len(BENCHMARK_QUERIES)]
+        # Variação por índice evita que os caches transformem o teste em medição de cache
+        response = app.test_client().post('/api/smart-chat', json={
+            "query": f"{query} (#{index})",
+            "session_id": f"bench_{index % concurrency}",
+            "review_mode": "sync"
+        })
+        return response.status_code == 200
+
+    return run_load(request, total_requests, concurrency)
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve_flask():
+    """Servidor Flask com threads (werkzeug) em segundo plano; retorna (base_url, parar)"""
+    from werkzeug.serving import make_server
+    from app import app
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server.shutdown
+
+
+def _serve_asgi():
+    """Servidor ASGI (uvicorn) em segundo plano; retorna (base_url, parar)"""
+    import uvicorn
+    from asgi_app import asgi_app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(asgi_app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("Servidor ASGI não iniciou")
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join(timeout=10)
+
+    return f"http://127.0.0.1:{port}", stop
+
+
+def _bench_server(serve: Callable[[], Any], total_requests: int, concurrency: int) -> Dict[str, Any]:
+    """POST /api/smart-chat via HTTP contra um servidor real"""
+    base_url, stop = serve()
+
+    def request(index: int) -> bool:
+        query = BENCHMARK_QUERIES[index % len(BENCHMARK_QUERIES)]
+        body = json.dumps({
+            "query": f"{query} (#{index})",
+            "session_id": f"bench_{index % concurrency}",
+            "review_mode": "sync"
+        }).encode("utf-8")
+        http_request = urllib.request.Request(f"{base_url}/api/smart-chat", data=body,
+                                              headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(http_request, timeout=60) as response:
+            return response.status == 200
+
+    try:
+        result = run_load(request, total_requests, concurrency)
+    finally:
+        stop()
+    result["base_url"] = base_url
+    return result
+
+
+def bench_flask_server(total_requests: int, concurrency: int) -> Dict[str, Any]:
+    """Servidor Flask atual (uma thread por requisição bloqueada em E/S)"""
+    return _bench_server(_serve_flask, total_requests, concurrency)
+
+
+def bench_asgi_server(total_requests: int, concurrency: int) -> Dict[str, Any]:
+    """Servidor ASGI (handlers assíncronos nos estágios de E/S)"""
+    return _bench_server(_serve_asgi, total_requests, concurrency)
+
+
+def parse_importtime(output: str) -> List[Dict[str, Any]]:
+    """
+    Interpreta a saída de `python -X importtime`
+
+    Returns:
+        Lista de módulos com self_ms, cumulative_ms e depth (nível de aninhamento)
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # Cabeçalho
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        entries.append({
+            "module": stripped,
+            "self_ms": int(parts[0]) / 1000,
+            "cumulative_ms": int(parts[1]) / 1000,
+            "depth": (len(name) - len(stripped) - 1) // 2
+        })
+    return entries
+
+
+def bench_import_profile(total_requests: int, concurrency: int, top: int = 15) -> Dict[str, Any]:
+    """Tempo de importação do app por pacote (`-X importtime`, sem aquecimento)"""
+    env = dict(os.environ, WARM_UP_ON_START="false")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=PROJECT_DIR, env=env, capture_output=True, text=True, timeout=300
+    )
+    entries = parse_importtime(completed.stderr)
+    if completed.returncode != 0:
+        error_lines = [line for line in completed.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(error_lines[-1] if error_lines else f"código de saída {completed.returncode}")
+
+    # Custo de cada pacote = tempo cumulativo do próprio pacote (inclui seus submódulos)
+    packages = {}
+    for entry in entries:
+        if "." not in entry["module"]:
+            packages[entry["module"]] = max(packages.get(entry["module"], 0.0), entry["cumulative_ms"])
+    app_entry = next((entry for entry in entries if entry["module"] == "app"), None)
+
+    return {
+        "import_app_ms": round(app_entry["cumulative_ms"], 1) if app_entry else None,
+        "modules_imported": len(entries),
+        "heaviest_packages_ms": {
+            name: round(ms, 1) for name, ms in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        }
+    }
+
+
+def _get_json(url: str, timeout: float = 2.0):
+    """GET com corpo JSON; retorna (status, corpo) inclusive para respostas de erro"""
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+
+
+def bench_health_startup(total_requests: int, concurrency: int, max_wait_s: float = 120.0) -> Dict[str, Any]:
+    """Tempo até /api/health responder num processo web novo (meta: HEALTH_STARTUP_TARGET_MS)"""
+    port = _free_port()
+    server_code = (
+        "from werkzeug.serving import make_server\n"
+        "from app import app\n"
+        f"make_server('127.0.0.1', {port}, app, threaded=True).serve_forever()\n"
+    )
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", server_code], cwd=PROJECT_DIR,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        health_ms = None
+        while time.perf_counter() - started < max_wait_s:
+            if process.poll() is not None:
+                raise RuntimeError(f"Servidor encerrou durante o startup (código {process.returncode})")
+            try:
+                status, _ = _get_json(f"{base_url}/api/health")
+                if status == 200:
+                    health_ms = (time.perf_counter() - started) * 1000
+                    break
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            time.sleep(0.02)
+        if health_ms is None:
+            raise RuntimeError(f"/api/health não respondeu em {max_wait_s} s")
+
+        # Estado do aquecimento no momento em que o health respondeu
+        _, readiness = _get_json(f"{base_url}/api/ready")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    return {
+        "health_ms": round(health_ms, 1),
+        "target_ms": HEALTH_STARTUP_TARGET_MS,
+        "met_target": health_ms <= HEALTH_STARTUP_TARGET_MS,
+        "readiness": readiness
+    }
+
+
+BENCHMARK_TARGETS: Dict[str, Callable[[int, int], Dict[str, Any]]] = {
+    "gateway": bench_gateway,
+    "smart_chat": bench_smart_chat,
+    "flask_server": bench_flask_server,
+    "asgi_server": bench_asgi_server,
+    "import_profile": bench_import_profile,
+    "health_startup": bench_health_startup
+}
+
+
+def write_report(results: Dict[str, Any], stub_stats: Dict[str, Any], settings: Dict[str, Any]):
+    """Grava o relatório em bench_output.txt"""
+    lines = [
+        f"Benchmark {datetime.now().isoformat(timespec='seconds')}",
+        f"Configuração: {json.dumps(settings, ensure_ascii=False)}",
+        ""
+    ]
+    for target, result in results.items():
+        lines.append(f"[{target}]")
+        if "error" in result:
+            lines.append(f"  erro: {result['error']}")
+        elif "import_app_ms" in result:
+            lines.append(f"  import app: {result['import_app_ms']} ms ({result['modules_imported']} módulos)")
+            for name, ms in result["heaviest_packages_ms"].items():
+                lines.append(f"    {name}: {ms} ms")
+        elif "health_ms" in result:
+            status = "OK" if result["met_target"] else "ACIMA DA META"
+            lines.append(f"  /api/health em {result['health_ms']} ms (meta {result['target_ms']} ms): {status}")
+        else:
+            latency = result["latency_ms"]
+            lines.append(
+                f"  {result['requests']} req @ {result['concurrency']} conc: "
+                f"{result['throughput_rps']} req/s, erros {result['error_rate']:.2%}, "
+                f"p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms, max {latency['max']} ms"
+            )
+        lines.append("  " + json.dumps(result, ensure_ascii=False))
+        lines.append("")
+    lines.append(f"Stub: {json.dumps(stub_stats, ensure_ascii=False)}")
+
+    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de vazão e latência com o stub da OpenAI")
+    parser.add_argument("--targets", nargs="+", choices=list(BENCHMARK_TARGETS), default=list(BENCHMARK_TARGETS))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    stub = OpenAIStubServer(config=StubConfig(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed
+    )).start_background()
+
+    # O gateway lê o ambiente na importação: configurar antes de importar os alvos
+    os.environ["OPENAI_BASE_URL"] = stub.base_url
+    os.environ["OPENAI_API_KEY"] = "stub"
+    print(f"✅ Stub OpenAI em {stub.base_url}")
+
+    results = {}
+    try:
+        for target in args.targets:
+            print(f"▶️  {target}: {args.requests} requisições, concorrência {args.concurrency}")
+            try:
+                results[target] = BENCHMARK_TARGETS[target](args.requests, args.concurrency)
+            except Exception as e:
+                print(f"❌ Erro no benchmark {target}: {e}")
+                results[target] = {"error": str(e)}
+    finally:
+        stub_stats = stub.get_statistics()
+        stub.stop()
+
+    write_report(results, stub_stats, vars(args))
+    print(f"✅ Resultados gravados em {OUTPUT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
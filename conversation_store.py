@@ -0,0 +1,321 @@
+"""
+Armazenamento de Histórico de Conversas
+Histórico limitado por sessão (mensagens e tempo de vida), em memória com descarte LRU
+ou no Redis para ser compartilhado entre workers.
+"""
+
+import time
+import threading
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Dict, List, Any
+
+from redis_manager import redis_manager
+
+
+class InMemoryConversationStore:
+    def __init__(self,
+                 max_sessions: int = 5000,
+                 max_messages_per_session: int = 50,
+                 ttl_seconds: int = 3600):
+        """
+        Inicializa o armazenamento em memória
+
+        Args:
+            max_sessions: Número máximo de sessões mantidas (LRU)
+            max_messages_per_session: Mensagens mantidas por sessão
+            ttl_seconds: Sessões inativas por mais tempo que isso são descartadas
+        """
+        self.max_sessions = max_sessions
+        self.max_messages_per_session = max_messages_per_session
+        self.ttl_seconds = ttl_seconds
+
+        # {session_id: {"messages": deque, "last_seen": float}} em ordem de uso
+        self._sessions: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Contadores mantidos a cada operação
+        self.stored_messages = 0
+        self.appended_messages = 0
+        self.evicted_sessions = 0
+
+    def _drop(self, session_id: str):
+        session = self._sessions.pop(session_id)
+        self.stored_messages -= len(session["messages"])
+
+    def _evict(self, now: float):
+        """Remove sessões expiradas e excedentes (as menos recentes primeiro)"""
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions or now - session["last_seen"] > self.ttl_seconds:
+                self._drop(session_id)
+                self.evicted_sessions += 1
+            else:
+                break
+
+    def append(self, session_id: str, message: str):
+        """
+        Adiciona uma mensagem ao histórico da sessão em O(1)
+
+        Args:
+            session_id: ID da sessão
+            message: Mensagem a registrar
+        """
+        with self._lock:
+            now = time.time()
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = {"messages": deque(maxlen=self.max_messages_per_session), "last_seen": now}
+                self._sessions[session_id] = session
+
+            messages = session["messages"]
+            if len(messages) < messages.maxlen:
+                self.stored_messages += 1
+            messages.append(message)
+            session["last_seen"] = now
+            self._sessions.move_to_end(session_id)
+            self.appended_messages += 1
+
+            self._evict(now)
+
+    def recent(self, session_id: str, limit: int = 3) -> List[str]:
+        """
+        Retorna as últimas mensagens da sessão em O(limit)
+
+        Args:
+            session_id: ID da sessão
+            limit: Número de mensagens
+
+        Returns:
+            Mensagens em ordem cronológica
+        """
+        with self._lock:
+            self._evict(time.time())
+            session = self._sessions.get(session_id)
+            if not session:
+                return []
+            return list(islice(reversed(session["messages"]), limit))[::-1]
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def clear(self, session_id: str = None):
+        """
+        Limpa o histórico de uma sessão ou de todas
+
+        Args:
+            session_id: ID da sessão ou None para limpar tudo
+        """
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+                self.stored_messages = 0
+            elif session_id in self._sessions:
+                self._drop(session_id)
+
+    def get_statistics(self, sample_size: int = 20) -> Dict[str, Any]:
+        """
+        Retorna estatísticas a partir dos contadores mantidos
+
+        Args:
+            sample_size: Número de sessões mais recentes listadas
+
+        Returns:
+            Dicionário com estatísticas
+        """
+        with self._lock:
+            self._evict(time.time())
+            total_sessions = len(self._sessions)
+            recent_sessions = list(islice(reversed(self._sessions), sample_size))
+
+        return {
+            "backend": "memory",
+            "total_sessions": total_sessions,
+            "total_messages": self.stored_messages,
+            "appended_messages": self.appended_messages,
+            "evicted_sessions": self.evicted_sessions,
+            "active_sessions": recent_sessions,
+            "average_messages_per_session": self.stored_messages / total_sessions if total_sessions > 0 else 0
+        }
+
+
+class RedisConversationStore:
+    def __init__(self,
+                 manager=redis_manager,
+                 max_messages_per_session: int = 50,
+                 ttl_seconds: int = 3600,
+                 prefix: str = "orchestrator:history",
+                 prune_interval_seconds: float = 60.0):
+        """
+        Inicializa o armazenamento no Redis
+
+        Args:
+            manager: Gerenciador Redis conectado
+            max_messages_per_session: Mensagens mantidas por sessão (LTRIM)
+            ttl_seconds: Expiração de cada sessão
+            prefix: Prefixo das chaves
+            prune_interval_seconds: Intervalo mínimo entre podas do índice de sessões neste worker
+        """
+        self.manager = manager
+        self.max_messages_per_session = max_messages_per_session
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.prune_interval_seconds = prune_interval_seconds
+        self._last_prune = 0.0
+
+        # Índice de sessões (ZSET por último acesso), tamanho de cada histórico (HASH)
+        # e contadores mantidos a cada escrita: as estatísticas não percorrem as sessões
+        self._sessions_key = f"{prefix}:sessions"
+        self._lengths_key = f"{prefix}:lengths"
+        self._stored_key = f"{prefix}:stored"
+        self._appended_key = f"{prefix}:appended"
+
+        # Usado enquanto o Redis estiver indisponível (o histórico degrada para local ao worker)
+        self.fallback = InMemoryConversationStore(
+            max_messages_per_session=max_messages_per_session,
+            ttl_seconds=ttl_seconds
+        )
+        self.redis_errors = 0
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}:{session_id}"
+
+    def _on_error(self, operation: str, error: Exception):
+        self.redis_errors += 1
+        print(f"⚠️  Erro no Redis ({operation} do histórico): {error}. Usando memória local.")
+
+    def append(self, session_id: str, message: str):
+        """Adiciona uma mensagem (RPUSH + LTRIM + EXPIRE e contadores em uma transação)"""
+        now = time.time()
+        try:
+            client = self.manager.client
+            pipe = client.pipeline()
+            pipe.rpush(self._key(session_id), message)
+            pipe.ltrim(self._key(session_id), -self.max_messages_per_session, -1)
+            pipe.expire(self._key(session_id), self.ttl_seconds)
+            pipe.zadd(self._sessions_key, {session_id: now})
+            pipe.hincrby(self._lengths_key, session_id, 1)
+            pipe.incrby(self._stored_key, 1)
+            pipe.incr(self._appended_key)
+            for key in (self._sessions_key, self._lengths_key, self._stored_key):
+                pipe.expire(key, self.ttl_seconds)
+            length = pipe.execute()[0]
+
+            # O LTRIM descartou as mensagens mais antigas: descontar dos contadores
+            trimmed = length - self.max_messages_per_session
+            if trimmed > 0:
+                pipe = client.pipeline()
+                pipe.hincrby(self._lengths_key, session_id, -trimmed)
+                pipe.decrby(self._stored_key, trimmed)
+                pipe.execute()
+
+            if now - self._last_prune >= self.prune_interval_seconds:
+                self._prune(client, now)
+        except Exception as e:
+            self._on_error("append", e)
+            self.fallback.append(session_id, message)
+
+    def _prune(self, client, now: float):
+        """
+        Remove do índice as sessões expiradas e desconta suas mensagens do total
+
+        Custo proporcional às sessões expiradas desde a última poda; WATCH no índice
+        garante que duas podas simultâneas não descontem a mesma sessão.
+        """
+        self._last_prune = now
+        cutoff = now - self.ttl_seconds
+
+        def prune(pipe):
+            expired = pipe.zrangebyscore(self._sessions_key, 0, cutoff)
+            if not expired:
+                return
+            lengths = pipe.hmget(self._lengths_key, expired)
+            pipe.multi()
+            pipe.zrem(self._sessions_key, *expired)
+            pipe.hdel(self._lengths_key, *expired)
+            pipe.decrby(self._stored_key, sum(int(length or 0) for length in lengths))
+
+        client.transaction(prune, self._sessions_key)
+
+    def recent(self, session_id: str, limit: int = 3) -> List[str]:
+        """Retorna as últimas mensagens da sessão (LRANGE)"""
+        try:
+            messages = self.manager.client.lrange(self._key(session_id), -limit, -1)
+        except Exception as e:
+            self._on_error("leitura", e)
+            return self.fallback.recent(session_id, limit)
+        return [m.decode('utf-8') if isinstance(m, bytes) else m for m in messages]
+
+    def __contains__(self, session_id: str) -> bool:
+        try:
+            return bool(self.manager.client.exists(self._key(session_id)))
+        except Exception as e:
+            self._on_error("consulta", e)
+            return session_id in self.fallback
+
+    def clear(self, session_id: str = None):
+        """Limpa o histórico de uma sessão ou de todas"""
+        self.fallback.clear(session_id)
+        try:
+            if session_id is None:
+                self.manager.delete_prefix(f"{self.prefix}:")
+            else:
+                def clear_session(pipe):
+                    length = pipe.hget(self._lengths_key, session_id)
+                    pipe.multi()
+                    pipe.delete(self._key(session_id))
+                    pipe.zrem(self._sessions_key, session_id)
+                    pipe.hdel(self._lengths_key, session_id)
+                    pipe.decrby(self._stored_key, int(length or 0))
+
+                self.manager.client.transaction(clear_session, self._sessions_key)
+        except Exception as e:
+            self._on_error("limpeza", e)
+
+    def get_statistics(self, sample_size: int = 20) -> Dict[str, Any]:
+        """Retorna estatísticas a partir dos contadores mantidos no Redis (ZCARD, GET e uma amostra do índice)"""
+        try:
+            client = self.manager.client
+            self._prune(client, time.time())
+
+            pipe = client.pipeline()
+            pipe.zcard(self._sessions_key)
+            pipe.zrevrange(self._sessions_key, 0, max(sample_size, 1) - 1)
+            pipe.get(self._stored_key)
+            pipe.get(self._appended_key)
+            total_sessions, recent_sessions, stored, appended = pipe.execute()
+
+            session_ids = [s.decode('utf-8') if isinstance(s, bytes) else s for s in recent_sessions][:sample_size]
+            total_messages = max(0, int(stored or 0))
+            appended_messages = int(appended or 0)
+        except Exception as e:
+            self._on_error("estatísticas", e)
+            return {**self.fallback.get_statistics(sample_size), "backend": "redis", "redis_available": False,
+                    "redis_errors": self.redis_errors}
+
+        return {
+            "backend": "redis",
+            "total_sessions": total_sessions,
+            "total_messages": total_messages,
+            "appended_messages": appended_messages,
+            "evicted_sessions": None,  # Expiração feita pelo próprio Redis (TTL)
+            "active_sessions": session_ids,
+            "average_messages_per_session": total_messages / total_sessions if total_sessions > 0 else 0,
+            "redis_available": True,
+            "redis_errors": self.redis_errors
+        }
+
+
+def create_conversation_store(**kwargs):
+    """
+    Cria o armazenamento de histórico (Redis quando conectado, senão memória)
+
+    Returns:
+        Instância de RedisConversationStore ou InMemoryConversationStore
+    """
+    if redis_manager.is_connected():
+        return RedisConversationStore(
+            max_messages_per_session=kwargs.get("max_messages_per_session", 50),
+            ttl_seconds=kwargs.get("ttl_seconds", 3600)
+        )
+    return InMemoryConversationStore(**kwargs)
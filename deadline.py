@@ -0,0 +1,101 @@
+"""
+Prazos por Requisição
+Propaga o orçamento de latência de uma requisição pelos estágios do pipeline
+(sub-prazos por estágio) e registra as degradações aplicadas quando o prazo
+de um estágio está perto de acabar.
+"""
+
+import time
+import threading
+from typing import Dict, List, Any
+
+
+class Deadline:
+    def __init__(self, budget_seconds: float, parent: "Deadline" = None, stage: str = None):
+        """
+        Inicializa o prazo
+
+        Args:
+            budget_seconds: Orçamento em segundos a partir de agora
+            parent: Prazo da requisição (o sub-prazo nunca passa do prazo pai)
+            stage: Nome do estágio (para sub-prazos)
+        """
+        now = time.monotonic()
+        self.budget = budget_seconds
+        self.stage = stage
+        self.parent = parent
+        self.started_at = now
+        self.expires_at = now + budget_seconds
+        if parent is not None:
+            self.expires_at = min(self.expires_at, parent.expires_at)
+
+        # Degradações são compartilhadas com o prazo raiz da requisição
+        self._degradations: List[Dict[str, Any]] = parent._degradations if parent else []
+        self._lock = parent._lock if parent else threading.Lock()
+
+    @classmethod
+    def from_ms(cls, budget_ms: float) -> "Deadline":
+        """Cria o prazo raiz a partir de milissegundos"""
+        return cls(budget_ms / 1000)
+
+    def remaining(self) -> float:
+        """Segundos restantes (0 se expirado)"""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def near(self, min_seconds: float) -> bool:
+        """Verifica se restam menos de min_seconds"""
+        return self.remaining() < min_seconds
+
+    def child(self, stage: str, share: float = None, seconds: float = None) -> "Deadline":
+        """
+        Cria o sub-prazo de um estágio
+
+        Args:
+            stage: Nome do estágio
+            share: Fração do orçamento total da requisição
+            seconds: Orçamento absoluto (alternativa a share)
+
+        Returns:
+            Sub-prazo limitado ao que resta do prazo atual
+        """
+        root = self
+        while root.parent is not None:
+            root = root.parent
+        budget = seconds if seconds is not None else root.budget * (share if share is not None else 1.0)
+        return Deadline(budget, parent=self, stage=stage)
+
+    def degrade(self, action: str, reason: str, stage: str = None):
+        """
+        Registra uma degradação aplicada
+
+        Args:
+            action: O que foi feito no lugar do caminho normal
+            reason: Motivo
+            stage: Estágio (padrão: o estágio deste sub-prazo)
+        """
+        with self._lock:
+            self._degradations.append({
+                "stage": stage or self.stage,
+                "action": action,
+                "reason": reason,
+                "remaining_ms": round(self.remaining() * 1000, 1)
+            })
+
+    @property
+    def degradations(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._degradations)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Resumo do prazo para a resposta da API"""
+        now = time.monotonic()
+        return {
+            "budget_ms": round(self.budget * 1000, 1),
+            "elapsed_ms": round((now - self.started_at) * 1000, 1),
+            "remaining_ms": round(self.remaining() * 1000, 1),
+            "exceeded": now > self.expires_at,
+            "degradations": self.degradations
+        }
@@ -459,5 +459,65 @@ class EvolutionAPIClient:
         else:
             return f'[{message_type}]'
 
+class AsyncEvolutionAPIClient:
+    """
+    Cliente assíncrono da Evolution API para o servidor ASGI (envio de mensagens)
+    
+    Reutiliza a configuração e a formatação do cliente síncrono; as conexões
+    ficam num httpx.AsyncClient compartilhado.
+    """
+    
+    def __init__(self, sync_client: EvolutionAPIClient, timeout: float = None):
+        self.sync_client = sync_client
+        self.timeout = timeout if timeout is not None else float(os.getenv('EVOLUTION_API_TIMEOUT', '10'))
+        self._http = None
+    
+    def is_configured(self) -> bool:
+        return self.sync_client.is_configured()
+    
+    def _get_http(self):
+        if self._http is None:
+            import httpx
+            self._http = httpx.AsyncClient(
+                base_url=self.sync_client.api_url,
+                headers=self.sync_client.headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=16)
+            )
+        return self._http
+    
+    async def aclose(self):
+        """Fecha as conexões (encerramento do servidor ASGI)"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+    
+    # MENSAGENS
+    async def send_text_message(self, phone_number: str, message: str, instance_name: str = None) -> Dict:
+        """Envia mensagem de texto"""
+        if not self.is_configured():
+            return {'error': 'Evolution API não configurada'}
+        
+        instance_name = instance_name or self.sync_client.instance_name
+        
+        # Formatar número de telefone (remover caracteres especiais)
+        phone_number = ''.join(filter(str.isdigit, phone_number))
+        if not phone_number.endswith('@s.whatsapp.net'):
+            phone_number = f"{phone_number}@s.whatsapp.net"
+        
+        payload = {
+            "number": phone_number,
+            "text": message
+        }
+        
+        try:
+            response = await self._get_http().post(f"/message/sendText/{instance_name}", json=payload)
+            return response.json()
+        except Exception as e:
+            return {'error': f'Erro ao enviar mensagem: {str(e)}'}
+
 # Instância global do cliente Evolution API
 evolution_client = EvolutionAPIClient()
+
+# Instância global do cliente assíncrono (servidor ASGI)
+async_evolution_client = AsyncEvolutionAPIClient(evolution_client)
@@ -0,0 +1,91 @@
+"""
+Contadores de Facetas
+Mantém contagens por marca, tipo, ambiente e categoria de forma incremental,
+evitando percorrer toda a base de conhecimento a cada consulta.
+"""
+
+from collections import Counter
+from typing import Dict, List, Any, Callable, Union
+
+FieldExtractor = Union[str, Callable[[Any], Any]]
+
+
+class FacetCounter:
+    def __init__(self, fields: Dict[str, FieldExtractor], default: str = "Não especificado"):
+        """
+        Inicializa os contadores de facetas
+
+        Args:
+            fields: Mapeamento faceta -> campo do item (str) ou função extratora
+            default: Valor usado quando um campo escalar não está preenchido
+        """
+        self.fields = fields
+        self.default = default
+        self._counts: Dict[str, Counter] = {name: Counter() for name in fields}
+
+    def _values(self, item: Any, extractor: FieldExtractor) -> List[str]:
+        """Extrai os valores de uma faceta (campos de lista contam cada elemento)"""
+        if callable(extractor):
+            value = extractor(item)
+        else:
+            value = item.get(extractor, self.default) if isinstance(item, dict) else getattr(item, extractor, self.default)
+
+        if isinstance(value, (list, tuple, set)):
+            return [str(v) for v in value if v]
+        return [str(value) if value not in (None, '') else self.default]
+
+    def add(self, item: Any):
+        """Contabiliza um item em todas as facetas (O(facetas do item))"""
+        for name, extractor in self.fields.items():
+            self._counts[name].update(self._values(item, extractor))
+
+    def remove(self, item: Any):
+        """Remove um item das contagens, descartando valores zerados"""
+        for name, extractor in self.fields.items():
+            counts = self._counts[name]
+            for value in self._values(item, extractor):
+                counts[value] -= 1
+                if counts[value] <= 0:
+                    del counts[value]
+
+    def rebuild(self, items: List[Any]):
+        """Recalcula todas as contagens a partir de uma lista de itens"""
+        self._counts = {name: Counter() for name in self.fields}
+        for item in items:
+            self.add(item)
+
+    def counts(self, name: str) -> Dict[str, int]:
+        """
+        Retorna as contagens de uma faceta em O(valores da faceta)
+
+        Args:
+            name: Nome da faceta
+
+        Returns:
+            Dicionário valor -> contagem
+        """
+        return dict(self._counts.get(name, {}))
+
+    def all_counts(self) -> Dict[str, Dict[str, int]]:
+        """Retorna as contagens de todas as facetas"""
+        return {name: dict(counts) for name, counts in self._counts.items()}
+
+    def count_results(self, results: List[Dict[str, Any]], names: List[str] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Conta facetas dentro de um conjunto de resultados de busca (O(k))
+
+        Args:
+            results: Resultados no formato {'document': item, ...}
+            names: Facetas a contar (padrão: todas)
+
+        Returns:
+            Dicionário faceta -> {valor: contagem}
+        """
+        names = names or list(self.fields)
+        facets = {name: Counter() for name in names}
+        for result in results:
+            document = result.get('document', {})
+            for name in names:
+                facets[name].update(self._values(document, self.fields[name]))
+
+        return {name: dict(counts) for name, counts in facets.items()}
@@ -0,0 +1,155 @@
+"""
+Roteador Local de Intenção por Embeddings
+Compara o embedding da consulta com vetores protótipo de cada agente (descrição,
+palavras-chave, ambientes e consultas rotuladas) para decidir o roteamento em ~1ms,
+deixando a OpenAI apenas para os casos ambíguos.
+"""
+
+import threading
+from typing import Dict, Any, Optional, Callable
+import numpy as np
+
+
+class EmbeddingIntentRouter:
+    def __init__(self, margin_threshold: float = 0.05):
+        """
+        Inicializa o roteador local
+
+        Args:
+            margin_threshold: Diferença mínima entre o melhor e o segundo agente
+                              para decidir sem escalar para a OpenAI
+        """
+        self.margin_threshold = margin_threshold
+        self.encode_fn: Optional[Callable] = None
+
+        # Soma dos vetores normalizados e quantidade de exemplos por agente
+        self._sums: Dict[str, np.ndarray] = {}
+        self._counts: Dict[str, int] = {}
+        self._prototypes: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+        self.labelled_queries = 0
+        self.local_decisions = 0
+        self.escalations = 0
+
+    def is_ready(self) -> bool:
+        """Verifica se o roteador tem encoder e protótipos"""
+        return self.encode_fn is not None and bool(self._prototypes)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _add_vectors(self, agent_id: str, vectors: np.ndarray):
+        """Acumula vetores no protótipo do agente em O(d) por vetor"""
+        vectors = self._normalize(vectors)
+        with self._lock:
+            if agent_id not in self._sums:
+                self._sums[agent_id] = np.zeros(vectors.shape[1], dtype=np.float32)
+                self._counts[agent_id] = 0
+            self._sums[agent_id] += vectors.sum(axis=0)
+            self._counts[agent_id] += len(vectors)
+            self._prototypes[agent_id] = self._normalize(self._sums[agent_id])[0]
+
+    def build(self, available_agents: Dict[str, Dict[str, Any]], encode_fn: Callable = None):
+        """
+        Constrói os protótipos a partir das definições dos agentes
+
+        Args:
+            available_agents: Agentes do orquestrador (descrição, keywords, environments)
+            encode_fn: Função de codificação de textos (lista -> matriz)
+        """
+        if encode_fn is not None:
+            self.encode_fn = encode_fn
+        if self.encode_fn is None:
+            return
+
+        with self._lock:
+            self._sums, self._counts, self._prototypes = {}, {}, {}
+            self.labelled_queries = 0
+
+        for agent_id, agent_info in available_agents.items():
+            texts = [agent_info.get("description", ""), agent_info.get("name", "")]
+            texts += agent_info.get("keywords", []) + agent_info.get("environments", [])
+            texts += agent_info.get("examples", [])
+            texts = [text for text in texts if text]
+            if texts:
+                self._add_vectors(agent_id, self.encode_fn(texts))
+
+    def add_labelled_query(self, query: str, agent_id: str):
+        """
+        Incorpora uma consulta rotulada ao protótipo do agente
+
+        Args:
+            query: Consulta do usuário
+            agent_id: Agente correto para a consulta
+        """
+        if self.encode_fn is None or not query:
+            return
+        self._add_vectors(agent_id, self.encode_fn([query]))
+        self.labelled_queries += 1
+
+    def classify(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Classifica a consulta comparando com os protótipos
+
+        Args:
+            query: Consulta do usuário
+
+        Returns:
+            Análise com agente, confiança, margem e se precisa escalar, ou None
+        """
+        if not self.is_ready():
+            return None
+
+        query_vector = self._normalize(self.encode_fn([query]))[0]
+        with self._lock:
+            scores = {
+                agent_id: float(prototype @ query_vector)
+                for agent_id, prototype in self._prototypes.items()
+            }
+
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        best_agent, best_score = ranked[0]
+        margin = best_score - ranked[1][1] if len(ranked) > 1 else 1.0
+        escalate = margin < self.margin_threshold
+
+        if escalate:
+            self.escalations += 1
+        else:
+            self.local_decisions += 1
+
+        return {
+            "selected_agent": best_agent,
+            "confidence": round(min(0.5 + margin * 5, 1.0), 3),
+            "reasoning": f"Consulta mais próxima do perfil de {best_agent} (margem {margin:.3f})",
+            "analysis_method": "embedding_router",
+            "all_scores": scores,
+            "margin": margin,
+            "escalate": escalate,
+            "requires_multiple_agents": False,
+            "additional_context": {}
+        }
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Retorna estatísticas do roteador
+
+        Returns:
+            Dicionário com estatísticas
+        """
+        total = self.local_decisions + self.escalations
+        return {
+            "ready": self.is_ready(),
+            "margin_threshold": self.margin_threshold,
+            "examples_per_agent": dict(self._counts),
+            "labelled_queries": self.labelled_queries,
+            "local_decisions": self.local_decisions,
+            "escalations": self.escalations,
+            "local_rate": self.local_decisions / total if total > 0 else 0
+        }
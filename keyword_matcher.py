@@ -0,0 +1,120 @@
+"""
+Matcher de Palavras-chave (Aho-Corasick)
+Compila tabelas rótulo -> palavras-chave em um autômato único que encontra todas as
+ocorrências em uma só passada pelo texto, ignorando acentos e maiúsculas.
+"""
+
+import unicodedata
+from collections import deque
+from typing import Dict, List, Any, Iterable, Set, Tuple
+
+
+def fold_accents(text: str) -> str:
+    """
+    Remove acentos e converte para minúsculas, preservando o restante do texto
+
+    Args:
+        text: Texto original
+
+    Returns:
+        Texto sem acentos e em minúsculas
+    """
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    return ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+
+
+class KeywordMatcher:
+    def __init__(self, table: Dict[Any, Iterable[str]] = None):
+        """
+        Inicializa o matcher
+
+        Args:
+            table: Mapeamento rótulo -> palavras-chave (casamento por substring)
+        """
+        self.build(table or {})
+
+    def build(self, table: Dict[Any, Iterable[str]]):
+        """
+        Compila (ou recompila) o autômato a partir da tabela
+
+        Args:
+            table: Mapeamento rótulo -> palavras-chave
+        """
+        self.table = {label: list(keywords) for label, keywords in table.items()}
+
+        # Trie: transições, links de falha e saídas (rótulo, palavra-chave) por estado
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[Any, str]]] = [[]]
+
+        for label, keywords in self.table.items():
+            for keyword in keywords:
+                folded = fold_accents(keyword)
+                if not folded:
+                    continue
+                state = 0
+                for ch in folded:
+                    if ch not in self._goto[state]:
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._output.append([])
+                        self._goto[state][ch] = len(self._goto) - 1
+                    state = self._goto[state][ch]
+                if (label, keyword) not in self._output[state]:
+                    self._output[state].append((label, keyword))
+
+        # Links de falha em largura; saídas herdadas dos sufixos
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                if state:
+                    self._fail[next_state] = self._goto[fail].get(ch, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text: str) -> List[Tuple[Any, str]]:
+        """
+        Encontra todas as ocorrências de palavras-chave em uma passada
+
+        Args:
+            text: Texto a analisar
+
+        Returns:
+            Lista de (rótulo, palavra-chave) na ordem em que terminam no texto
+        """
+        hits = []
+        state = 0
+        for ch in fold_accents(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            if self._output[state]:
+                hits.extend(self._output[state])
+        return hits
+
+    def matches(self, text: str) -> Dict[Any, Set[str]]:
+        """
+        Agrupa as palavras-chave distintas encontradas por rótulo
+
+        Args:
+            text: Texto a analisar
+
+        Returns:
+            Dicionário rótulo -> conjunto de palavras-chave encontradas
+        """
+        grouped: Dict[Any, Set[str]] = {}
+        for label, keyword in self.find_all(text):
+            grouped.setdefault(label, set()).add(keyword)
+        return grouped
+
+    def labels(self, text: str) -> Set[Any]:
+        """Retorna os rótulos com pelo menos uma palavra-chave no texto"""
+        return set(self.matches(text))
+
+    def contains_any(self, text: str) -> bool:
+        """Verifica se alguma palavra-chave aparece no texto"""
+        return bool(self.find_all(text))
@@ -0,0 +1,247 @@
+"""
+Grafo de Vizinhos Mais Próximos (kNN) para Produtos
+Pré-calcula os k produtos mais parecidos de cada item da base de conhecimento,
+permitindo consultas de "produtos parecidos" em O(k) sem nova codificação da consulta.
+"""
+
+import re
+import numpy as np
+from typing import Dict, List, Any, Set
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Normaliza vetores para norma unitária (similaridade de cosseno via produto interno)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class KNNGraph:
+    def __init__(self, k: int = 10, block_size: int = 1024):
+        """
+        Inicializa o grafo kNN
+
+        Args:
+            k: Número de vizinhos mantidos por item
+            block_size: Número de linhas processadas por bloco na construção
+        """
+        self.k = k
+        self.block_size = block_size
+
+        # Vetores normalizados e mapeamento id -> linha
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+
+        # Lista de vizinhos ordenada por similaridade: {id: [(vizinho_id, score), ...]}
+        self._neighbors: Dict[str, List[tuple]] = {}
+
+        # Índice reverso: {id: {ids que apontam para ele}}
+        self._reverse: Dict[str, Set[str]] = {}
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        return normalize_rows(vectors)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._rows
+
+    def build(self, item_ids: List[str], embeddings: np.ndarray):
+        """
+        Constrói o grafo completo a partir dos embeddings
+
+        Args:
+            item_ids: Identificadores dos itens, alinhados com os embeddings
+            embeddings: Matriz (n, d) de embeddings
+        """
+        self._ids = [str(item_id) for item_id in item_ids]
+        self._rows = {item_id: row for row, item_id in enumerate(self._ids)}
+        self._vectors = self._normalize(embeddings) if len(self._ids) else np.zeros((0, 0), dtype=np.float32)
+        self._neighbors = {}
+        self._reverse = {item_id: set() for item_id in self._ids}
+
+        n = len(self._ids)
+        if n == 0:
+            return
+
+        k = min(self.k, n - 1)
+
+        # Processar em blocos para limitar memória da matriz de similaridades
+        for start in range(0, n, self.block_size):
+            end = min(start + self.block_size, n)
+            similarities = self._vectors[start:end] @ self._vectors.T
+
+            # Excluir o próprio item
+            similarities[np.arange(end - start), np.arange(start, end)] = -np.inf
+
+            for offset, row_scores in enumerate(similarities):
+                item_id = self._ids[start + offset]
+                self._neighbors[item_id] = self._top_k(row_scores, k)
+
+        for item_id, neighbors in self._neighbors.items():
+            for neighbor_id, _ in neighbors:
+                self._reverse[neighbor_id].add(item_id)
+
+    def _top_k(self, scores: np.ndarray, k: int) -> List[tuple]:
+        """Seleciona os k maiores scores em O(n) com argpartition"""
+        if k <= 0:
+            return []
+
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        candidates = candidates[np.argsort(-scores[candidates])]
+
+        return [
+            (self._ids[idx], float(scores[idx]))
+            for idx in candidates
+            if np.isfinite(scores[idx])
+        ]
+
+    def add(self, item_id: str, embedding: np.ndarray):
+        """
+        Adiciona um item ao grafo de forma incremental (O(n·d))
+
+        Args:
+            item_id: Identificador do item
+            embedding: Embedding do item
+        """
+        item_id = str(item_id)
+        if item_id in self._rows:
+            self.remove(item_id)
+
+        vector = self._normalize(embedding)
+
+        if len(self._ids) == 0:
+            self._vectors = vector
+            self._ids = [item_id]
+            self._rows = {item_id: 0}
+            self._neighbors[item_id] = []
+            self._reverse[item_id] = set()
+            return
+
+        scores = (self._vectors @ vector[0]).astype(np.float32)
+
+        # Vizinhos do novo item
+        self._neighbors[item_id] = self._top_k(scores, min(self.k, len(self._ids)))
+        self._reverse[item_id] = set()
+        for neighbor_id, _ in self._neighbors[item_id]:
+            self._reverse[neighbor_id].add(item_id)
+
+        # Inserir o novo item nas listas dos itens existentes quando for mais próximo
+        for row, score in enumerate(scores):
+            other_id = self._ids[row]
+            neighbors = self._neighbors[other_id]
+            if len(neighbors) < self.k or score > neighbors[-1][1]:
+                neighbors.append((item_id, float(score)))
+                neighbors.sort(key=lambda pair: pair[1], reverse=True)
+                self._reverse[item_id].add(other_id)
+                if len(neighbors) > self.k:
+                    dropped_id, _ = neighbors.pop()
+                    self._reverse[dropped_id].discard(other_id)
+
+        self._rows[item_id] = len(self._ids)
+        self._ids.append(item_id)
+        self._vectors = np.vstack([self._vectors, vector])
+
+    def remove(self, item_id: str) -> bool:
+        """
+        Remove um item do grafo, recalculando apenas os itens que apontavam para ele
+
+        Args:
+            item_id: Identificador do item
+
+        Returns:
+            True se removido, False se não encontrado
+        """
+        item_id = str(item_id)
+        if item_id not in self._rows:
+            return False
+
+        row = self._rows[item_id]
+        affected = self._reverse.pop(item_id, set())
+
+        for neighbor_id, _ in self._neighbors.pop(item_id, []):
+            if neighbor_id in self._reverse:
+                self._reverse[neighbor_id].discard(item_id)
+
+        # Remover linha e reindexar
+        self._vectors = np.delete(self._vectors, row, axis=0)
+        del self._ids[row]
+        del self._rows[item_id]
+        for idx in range(row, len(self._ids)):
+            self._rows[self._ids[idx]] = idx
+
+        # Recalcular listas que perderam um vizinho
+        k = min(self.k, len(self._ids) - 1)
+        for other_id in affected:
+            if other_id not in self._rows:
+                continue
+            for neighbor_id, _ in self._neighbors.get(other_id, []):
+                if neighbor_id in self._reverse:
+                    self._reverse[neighbor_id].discard(other_id)
+
+            other_row = self._rows[other_id]
+            scores = self._vectors @ self._vectors[other_row]
+            scores[other_row] = -np.inf
+            self._neighbors[other_id] = self._top_k(scores, k)
+            for neighbor_id, _ in self._neighbors[other_id]:
+                self._reverse[neighbor_id].add(other_id)
+
+        return True
+
+    def neighbors(self, item_id: str, top_k: int = None) -> List[Dict[str, Any]]:
+        """
+        Retorna os vizinhos pré-calculados de um item em O(k)
+
+        Args:
+            item_id: Identificador do item
+            top_k: Número máximo de vizinhos (padrão: k do grafo)
+
+        Returns:
+            Lista de vizinhos com id e score de similaridade
+        """
+        neighbors = self._neighbors.get(str(item_id), [])
+        if top_k is not None:
+            neighbors = neighbors[:top_k]
+
+        return [
+            {'id': neighbor_id, 'similarity_score': score}
+            for neighbor_id, score in neighbors
+        ]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Retorna estatísticas do grafo
+
+        Returns:
+            Dicionário com estatísticas
+        """
+        return {
+            "nodes": len(self._ids),
+            "k": self.k,
+            "edges": sum(len(neighbors) for neighbors in self._neighbors.values())
+        }
+
+
+def get_item_id(item: Dict[str, Any]) -> str:
+    """
+    Retorna um identificador estável para um item da base de conhecimento
+
+    Args:
+        item: Item da base de conhecimento
+
+    Returns:
+        ID do item (campo id/product_id ou derivado de marca e nome)
+    """
+    if item.get('id'):
+        return str(item['id'])
+    if item.get('product_id'):
+        return str(item['product_id'])
+
+    name = f"{item.get('brand', '')} {item.get('product_name', item.get('name', ''))}".strip().lower()
+    return re.sub(r'[^\w]+', '_', name).strip('_') or 'item'
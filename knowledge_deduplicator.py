@@ -0,0 +1,417 @@
+"""
+Deduplicação de Produtos da Base de Conhecimento
+Detecta produtos quase duplicados vindos de fontes diferentes (JSON estruturado,
+upload de PDFs, editor de conhecimento e importação de catálogos) antes da indexação.
+"""
+
+import re
+import copy
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Dict, List, Any, Optional, Callable, Tuple
+from datetime import datetime
+import numpy as np
+
+# Palavras genéricas que não ajudam a distinguir produtos
+STOPWORDS = {
+    "de", "da", "do", "das", "dos", "e", "para", "com", "em", "a", "o",
+    "tinta", "piso", "produto", "linha"
+}
+
+# Campos de lista que são unidos ao mesclar duplicatas
+LIST_FIELDS = ["features", "use_case", "application_tools", "colors", "tags"]
+
+
+def normalize_text(text: Any) -> str:
+    """
+    Normaliza texto: minúsculas, sem acentos e sem pontuação
+
+    Args:
+        text: Texto original
+
+    Returns:
+        Texto normalizado
+    """
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class KnowledgeDeduplicator:
+    def __init__(self,
+                 embedding_threshold: float = 0.92,
+                 name_threshold: float = 0.85,
+                 review_threshold: float = 0.92,
+                 max_block_size: int = 50,
+                 mode: str = "merge"):
+        """
+        Inicializa o deduplicador
+
+        Args:
+            embedding_threshold: Similaridade de cosseno mínima entre embeddings
+            name_threshold: Similaridade mínima entre nomes normalizados
+            review_threshold: Similaridade de nome a partir da qual pares não confirmados vão para revisão
+            max_block_size: Blocos maiores que isso são ignorados (tokens muito comuns)
+            mode: "merge" para mesclar duplicatas ou "flag" para apenas marcá-las
+        """
+        self.embedding_threshold = embedding_threshold
+        self.name_threshold = name_threshold
+        self.review_threshold = review_threshold
+        self.max_block_size = max_block_size
+        self.mode = mode
+
+        # Últimos relatórios gerados
+        self.reports = []
+        self.max_reports = 50
+
+    def _item_name(self, item: Dict[str, Any]) -> str:
+        """Nome normalizado do item, sem a marca e sem palavras genéricas"""
+        name = item.get('product_name') or item.get('name') or item.get('title') or ''
+        brand_tokens = set(self._item_brand(item).split())
+        tokens = [
+            token for token in normalize_text(name).split()
+            if token not in STOPWORDS and token not in brand_tokens
+        ]
+        return ' '.join(tokens)
+
+    def _name_numbers(self, item: Dict[str, Any]) -> Tuple[float, ...]:
+        """Números do nome, em ordem ("60x60" -> (60.0, 60.0)): medidas e versões diferentes não são duplicatas"""
+        name = str(item.get('product_name') or item.get('name') or item.get('title') or '')
+        return tuple(float(n.replace(',', '.')) for n in re.findall(r'\d+(?:[.,]\d+)?', name))
+
+    def _item_brand(self, item: Dict[str, Any]) -> str:
+        """Marca normalizada do item"""
+        brand = item.get('brand') or (item.get('metadata') or {}).get('brand') or ''
+        return normalize_text(brand)
+
+    def _item_text(self, item: Dict[str, Any]) -> str:
+        """Texto usado para o embedding de comparação"""
+        parts = [
+            item.get('brand', ''),
+            item.get('product_name') or item.get('name') or item.get('title') or '',
+            item.get('type', ''),
+            item.get('description') or item.get('content') or ''
+        ]
+        return ' '.join(str(part) for part in parts if part)
+
+    def _item_label(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Resumo do item para o relatório"""
+        return {
+            "id": item.get('id') or item.get('product_id'),
+            "name": item.get('product_name') or item.get('name') or item.get('title'),
+            "brand": item.get('brand') or (item.get('metadata') or {}).get('brand'),
+            "source": item.get('extracted_from') or item.get('source')
+        }
+
+    def _generate_candidates(self, names: List[str], brands: List[str]) -> Tuple[set, int]:
+        """
+        Gera pares candidatos por blocagem (marca + token do nome)
+
+        Returns:
+            Conjunto de pares (i, j) e número de blocos utilizados
+        """
+        blocks: Dict[Tuple[str, str], List[int]] = {}
+        for idx, (name, brand) in enumerate(zip(names, brands)):
+            tokens = set(token for token in name.split() if len(token) >= 3) or {name}
+            for token in tokens:
+                blocks.setdefault((brand, token), []).append(idx)
+
+        pairs = set()
+        used_blocks = 0
+        for members in blocks.values():
+            if len(members) < 2 or len(members) > self.max_block_size:
+                continue
+            used_blocks += 1
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    pairs.add((members[a], members[b]))
+
+        return pairs, used_blocks
+
+    def find_duplicates(self,
+                        items: List[Dict[str, Any]],
+                        encode_fn: Callable = None,
+                        restrict_to: Optional[set] = None) -> Dict[str, Any]:
+        """
+        Encontra grupos de itens quase duplicados
+
+        Um par só é duplicata quando os nomes são parecidos, os números dos nomes
+        (medidas, versões) coincidem e os embeddings concordam. Sem encode_fn nada
+        é mesclado: pares com nomes muito parecidos vão para revisão.
+
+        Args:
+            items: Lista de itens
+            encode_fn: Função de embeddings (ex.: model.encode); se None apenas sugere pares para revisão
+            restrict_to: Se fornecido, apenas pares envolvendo esses índices são avaliados
+
+        Returns:
+            Dicionário com clusters (listas de índices), pares para revisão e métricas da blocagem
+        """
+        names = [self._item_name(item) for item in items]
+        brands = [self._item_brand(item) for item in items]
+        numbers = [self._name_numbers(item) for item in items]
+
+        pairs, used_blocks = self._generate_candidates(names, brands)
+        if restrict_to is not None:
+            pairs = {(a, b) for a, b in pairs if a in restrict_to or b in restrict_to}
+
+        # Codificar apenas os itens que aparecem em algum par candidato
+        vectors = {}
+        if encode_fn and pairs:
+            candidate_indices = sorted({idx for pair in pairs for idx in pair})
+            embeddings = np.asarray(encode_fn([self._item_text(items[idx]) for idx in candidate_indices]), dtype=np.float32)
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            embeddings = embeddings / norms
+            vectors = dict(zip(candidate_indices, embeddings))
+
+        # Union-find para agrupar duplicatas
+        parent = list(range(len(items)))
+
+        def find(idx):
+            while parent[idx] != idx:
+                parent[idx] = parent[parent[idx]]
+                idx = parent[idx]
+            return idx
+
+        matches = []
+        review = []
+        blocked_by_numbers = 0
+        for a, b in sorted(pairs):
+            if not names[a] or not names[b]:
+                continue
+
+            name_score = 1.0 if names[a] == names[b] else SequenceMatcher(None, names[a], names[b]).ratio()
+            if name_score < self.name_threshold:
+                continue
+
+            # "Porcelanato 60x60" e "Porcelanato 90x90" são produtos diferentes
+            if numbers[a] != numbers[b]:
+                blocked_by_numbers += 1
+                continue
+
+            # Nome parecido nunca basta: a mescla exige concordância dos embeddings
+            embedding_score = float(vectors[a] @ vectors[b]) if vectors else None
+            match = {
+                "pair": (a, b),
+                "name_similarity": round(name_score, 3),
+                "embedding_similarity": round(embedding_score, 3) if embedding_score is not None else None
+            }
+
+            if embedding_score is not None and embedding_score >= self.embedding_threshold:
+                matches.append(match)
+                root_a, root_b = find(a), find(b)
+                if root_a != root_b:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+            elif name_score >= self.review_threshold:
+                review.append({**match, "items": [self._item_label(items[a]), self._item_label(items[b])]})
+
+        clusters: Dict[int, List[int]] = {}
+        for idx in range(len(items)):
+            clusters.setdefault(find(idx), []).append(idx)
+
+        n = len(items)
+        return {
+            "clusters": [members for members in clusters.values() if len(members) > 1],
+            "matches": matches,
+            "review": review,
+            "blocked_by_numbers": blocked_by_numbers,
+            "blocks": used_blocks,
+            "candidate_pairs": len(pairs),
+            "all_pairs": n * (n - 1) // 2
+        }
+
+    def _completeness(self, item: Dict[str, Any]) -> int:
+        """Número de campos preenchidos (usado para escolher o item canônico)"""
+        return sum(1 for value in item.values() if value not in (None, '', [], {}))
+
+    def merge_items(self, canonical: Dict[str, Any], duplicate: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Mescla um item duplicado no item canônico (in-place)
+
+        Args:
+            canonical: Item que será mantido
+            duplicate: Item duplicado
+
+        Returns:
+            Item canônico atualizado
+        """
+        for field, value in duplicate.items():
+            if field in LIST_FIELDS and isinstance(value, list):
+                existing = canonical.get(field) or []
+                canonical[field] = existing + [v for v in value if v not in existing]
+            elif canonical.get(field) in (None, '', [], {}):
+                canonical[field] = value
+
+        merged_from = canonical.setdefault('merged_from', [])
+        merged_from.append(self._item_label(duplicate))
+        return canonical
+
+    def deduplicate(self,
+                    items: List[Dict[str, Any]],
+                    encode_fn: Callable = None,
+                    source: str = None,
+                    mode: str = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Remove (ou marca) duplicatas de uma lista de itens antes da indexação
+
+        Args:
+            items: Lista de itens
+            encode_fn: Função de embeddings (opcional)
+            source: Origem dos itens (para o relatório)
+            mode: "merge" ou "flag" (padrão: modo do deduplicador)
+
+        Returns:
+            Tupla (itens resultantes, relatório)
+        """
+        mode = mode or self.mode
+        result = self.find_duplicates(items, encode_fn)
+
+        drop = set()
+        clusters_report = []
+        for members in result["clusters"]:
+            # Item mais completo é o canônico; em empate, o primeiro da lista
+            canonical_idx = max(members, key=lambda idx: (self._completeness(items[idx]), -idx))
+            canonical = items[canonical_idx]
+
+            for idx in members:
+                if idx == canonical_idx:
+                    continue
+                if mode == "merge":
+                    self.merge_items(canonical, items[idx])
+                    drop.add(idx)
+                else:
+                    items[idx]['duplicate_of'] = canonical.get('id') or canonical.get('product_id') or canonical_idx
+
+            clusters_report.append({
+                "canonical": self._item_label(canonical),
+                "duplicates": [self._item_label(items[idx]) for idx in members if idx != canonical_idx]
+            })
+
+        deduplicated = [item for idx, item in enumerate(items) if idx not in drop]
+        report = self._build_report(source, mode, len(items), len(deduplicated), result, clusters_report)
+
+        if result["clusters"]:
+            print(f"🧹 Deduplicação ({source or 'itens'}): {len(result['clusters'])} grupos de duplicatas, "
+                  f"{len(items)} → {len(deduplicated)} itens")
+        if result["review"]:
+            print(f"⚠️ Deduplicação ({source or 'itens'}): {len(result['review'])} pares para revisão manual")
+
+        return deduplicated, report
+
+    def deduplicate_against(self,
+                            existing_items: List[Dict[str, Any]],
+                            new_items: List[Dict[str, Any]],
+                            encode_fn: Callable = None,
+                            source: str = None,
+                            update_fn: Callable = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Filtra novos itens que duplicam itens já indexados (ou duplicam entre si)
+
+        Itens novos duplicados de itens existentes são mesclados numa cópia do item
+        existente e descartados; update_fn grava a mescla na origem (banco, editor
+        ou índice de busca). Os itens existentes não são alterados aqui. Quando um
+        item novo liga dois ou mais itens existentes, o primeiro recebe a mescla e
+        os demais são listados no relatório como duplicatas existentes para revisão.
+
+        Args:
+            existing_items: Itens já indexados
+            new_items: Itens a indexar
+            encode_fn: Função de embeddings (opcional)
+            source: Origem dos novos itens
+            update_fn: Chamada como update_fn(item_existente, campos_alterados) para cada item existente mesclado
+
+        Returns:
+            Tupla (novos itens únicos, relatório)
+        """
+        items = list(existing_items) + list(new_items)
+        offset = len(existing_items)
+        result = self.find_duplicates(items, encode_fn, restrict_to=set(range(offset, len(items))))
+
+        drop = set()
+        clusters_report = []
+        updated_existing = 0
+        flagged_existing = 0
+        for members in result["clusters"]:
+            existing_members = [idx for idx in members if idx < offset]
+            new_members = [idx for idx in members if idx >= offset]
+            if not new_members:
+                continue
+
+            if existing_members:
+                canonical_idx = existing_members[0]
+                canonical = copy.deepcopy(items[canonical_idx])
+            else:
+                canonical_idx = max(new_members, key=lambda idx: (self._completeness(items[idx]), -idx))
+                canonical = items[canonical_idx]
+
+            for idx in new_members:
+                if idx == canonical_idx:
+                    continue
+                self.merge_items(canonical, items[idx])
+                drop.add(idx)
+
+            if existing_members:
+                original = items[canonical_idx]
+                changes = {field: value for field, value in canonical.items() if original.get(field) != value}
+                if update_fn and changes:
+                    update_fn(original, changes)
+                    updated_existing += 1
+
+            # Itens já indexados que o novo item revelou como duplicatas entre si:
+            # continuam na origem e ficam marcados para revisão
+            existing_duplicates = [self._item_label(items[idx]) for idx in existing_members[1:]]
+            flagged_existing += len(existing_duplicates)
+
+            clusters_report.append({
+                "canonical": self._item_label(canonical),
+                "duplicates": [self._item_label(items[idx]) for idx in new_members if idx != canonical_idx],
+                "existing_duplicates": existing_duplicates
+            })
+
+        unique_new = [items[idx] for idx in range(offset, len(items)) if idx not in drop]
+        report = self._build_report(source, "merge", len(new_items), len(unique_new), result, clusters_report)
+        report["updated_existing"] = updated_existing
+        report["existing_duplicates_flagged"] = flagged_existing
+        if flagged_existing:
+            print(f"⚠️ Deduplicação ({source or 'itens'}): {flagged_existing} itens existentes duplicados marcados para revisão")
+        return unique_new, report
+
+    def _build_report(self, source, mode, total_items, unique_items, result, clusters_report) -> Dict[str, Any]:
+        """Monta e armazena o relatório de deduplicação"""
+        report = {
+            "timestamp": datetime.now().isoformat(),
+            "source": source,
+            "mode": mode,
+            "total_items": total_items,
+            "unique_items": unique_items,
+            "duplicates_found": sum(len(cluster["duplicates"]) for cluster in clusters_report),
+            "review_candidates": result["review"],
+            "blocked_by_numbers": result["blocked_by_numbers"],
+            "blocks": result["blocks"],
+            "candidate_pairs": result["candidate_pairs"],
+            "all_pairs": result["all_pairs"],
+            "clusters": clusters_report
+        }
+
+        self.reports.append(report)
+        if len(self.reports) > self.max_reports:
+            self.reports = self.reports[-self.max_reports:]
+
+        return report
+
+    def get_reports(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Retorna os relatórios de deduplicação mais recentes
+
+        Args:
+            limit: Número máximo de relatórios
+
+        Returns:
+            Lista de relatórios (mais recentes primeiro)
+        """
+        return list(reversed(self.reports[-limit:]))
+
+# Instância global do deduplicador
+knowledge_deduplicator = KnowledgeDeduplicator()
@@ -5,10 +5,12 @@ Permite edição visual e estruturada da base de conhecimento dos agentes.
 
 import json
 import uuid
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable
 from datetime import datetime
 from dataclasses import dataclass, asdict
 import copy
+from knowledge_deduplicator import knowledge_deduplicator
+from facet_counter import FacetCounter
 
 @dataclass
 class KnowledgeItem:
@@ -31,6 +33,14 @@ class KnowledgeEditor:
         Inicializa o editor de base de conhecimento
         """
         self.knowledge_base = {}  # {agent_type: {category: [items]}}
+        
+        # Contagens por agente, categoria e status (mantidas incrementalmente)
+        self.facets = FacetCounter({
+            "agent": lambda item: item.agent_type,
+            "category": lambda item: item.category,
+            "agent_category": lambda item: f"{item.agent_type}:{item.category}",
+            "status": lambda item: item.status
+        })
         self.categories = {
             "tintas": [
                 "Produtos", "Técnicas de Aplicação", "Problemas e Soluções",
@@ -154,6 +164,7 @@ class KnowledgeEditor:
             self.knowledge_base[agent_type][category] = []
         
         self.knowledge_base[agent_type][category].append(item)
+        self.facets.add(item)
         
         return item
 
@@ -185,6 +196,7 @@ class KnowledgeEditor:
             return None
         
         # Atualizar campos se fornecidos
+        self.facets.remove(item)
         if title is not None:
             item.title = title
         if content is not None:
@@ -195,6 +207,7 @@ class KnowledgeEditor:
             item.metadata.update(metadata)
         if status is not None:
             item.status = status
+        self.facets.add(item)
         
         # Mover para nova categoria se necessário
         if category is not None and category != item.category:
@@ -239,6 +252,7 @@ class KnowledgeEditor:
                 for i, item in enumerate(self.knowledge_base[agent_type][category]):
                     if item.id == item_id:
                         del self.knowledge_base[agent_type][category][i]
+                        self.facets.remove(item)
                         return True
         return False
 
@@ -258,6 +272,7 @@ class KnowledgeEditor:
             return False
         
         # Remover da categoria atual
+        self.facets.remove(item)
         old_category = item.category
         agent_type = item.agent_type
         
@@ -272,6 +287,7 @@ class KnowledgeEditor:
         
         item.category = new_category
         self.knowledge_base[agent_type][new_category].append(item)
+        self.facets.add(item)
         
         return True
 
@@ -377,6 +393,26 @@ class KnowledgeEditor:
         
         return sorted(list(all_categories))
 
+    def get_category_counts(self, agent_type: str = None) -> Dict[str, int]:
+        """
+        Retorna o número de itens por categoria em O(categorias)
+        
+        Args:
+            agent_type: Tipo do agente (opcional)
+            
+        Returns:
+            Dicionário categoria -> número de itens
+        """
+        if not agent_type:
+            return self.facets.counts("category")
+        
+        prefix = f"{agent_type}:"
+        return {
+            key[len(prefix):]: count
+            for key, count in self.facets.counts("agent_category").items()
+            if key.startswith(prefix)
+        }
+
     def get_available_templates(self) -> Dict[str, Dict[str, Any]]:
         """
         Retorna templates disponíveis
@@ -435,7 +471,28 @@ class KnowledgeEditor:
         
         return str(data)
 
-    def import_knowledge(self, data: str, agent_type: str, merge: bool = True) -> Dict[str, Any]:
+    def _apply_merge(self, existing: Dict[str, Any], changes: Dict[str, Any]):
+        """
+        Grava no item do editor a mescla feita pelo deduplicador
+        
+        Args:
+            existing: Item existente (como dicionário)
+            changes: Campos alterados pela mescla
+        """
+        metadata = dict(changes.get("metadata") or {})
+        if "merged_from" in changes:
+            metadata["merged_from"] = existing["metadata"].get("merged_from", []) + changes["merged_from"]
+        
+        self.update_knowledge_item(
+            existing["id"],
+            title=changes.get("title"),
+            content=changes.get("content"),
+            tags=changes.get("tags"),
+            metadata=metadata or None
+        )
+
+    def import_knowledge(self, data: str, agent_type: str, merge: bool = True,
+                         encode_fn: Callable = None) -> Dict[str, Any]:
         """
         Importa base de conhecimento
         
@@ -443,6 +500,7 @@ class KnowledgeEditor:
             data: Dados em formato JSON
             agent_type: Tipo do agente
             merge: Se True, mescla com existente; se False, substitui
+            encode_fn: Função de embeddings para confirmar duplicatas (sem ela os pares só vão para revisão)
             
         Returns:
             Resultado da importação
@@ -452,31 +510,54 @@ class KnowledgeEditor:
             
             if not merge:
                 # Limpar conhecimento existente
+                for items in self.knowledge_base.get(agent_type, {}).values():
+                    for item in items:
+                        self.facets.remove(item)
                 self.knowledge_base[agent_type] = {}
             
+            # Descartar itens que duplicam conhecimento existente
+            existing_items = [
+                asdict(item)
+                for items in self.knowledge_base.get(agent_type, {}).values()
+                for item in items
+            ]
+            new_items = [
+                dict(item_data, category=category)
+                for category, items in imported_data.items()
+                for item_data in items
+            ]
+            unique_items, dedup_report = knowledge_deduplicator.deduplicate_against(
+                existing_items, new_items, encode_fn=encode_fn,
+                source=f"knowledge_import:{agent_type}", update_fn=self._apply_merge
+            )
+            
             imported_count = 0
             
-            for category, items in imported_data.items():
-                for item_data in items:
-                    # Criar novo item
-                    item = self.create_knowledge_item(
-                        title=item_data.get("title", ""),
-                        content=item_data.get("content", ""),
-                        category=category,
-                        agent_type=agent_type,
-                        tags=item_data.get("tags", []),
-                        metadata=item_data.get("metadata", {})
-                    )
-                    
-                    # Preservar status se fornecido
-                    if "status" in item_data:
-                        item.status = item_data["status"]
-                    
-                    imported_count += 1
+            for item_data in unique_items:
+                category = item_data["category"]
+                # Criar novo item
+                item = self.create_knowledge_item(
+                    title=item_data.get("title", ""),
+                    content=item_data.get("content", ""),
+                    category=category,
+                    agent_type=agent_type,
+                    tags=item_data.get("tags", []),
+                    metadata=item_data.get("metadata", {})
+                )
+                
+                # Preservar status se fornecido
+                if "status" in item_data:
+                    self.facets.remove(item)
+                    item.status = item_data["status"]
+                    self.facets.add(item)
+                
+                imported_count += 1
             
             return {
                 "success": True,
                 "imported_count": imported_count,
+                "duplicates_skipped": len(new_items) - len(unique_items),
+                "dedup_report": dedup_report,
                 "message": f"{imported_count} itens importados com sucesso"
             }
             
@@ -0,0 +1,157 @@
+"""
+Inicialização Sob Demanda dos Subsistemas
+Os subsistemas pesados (modelos de embeddings, spaCy, Supabase, serviço do
+WhatsApp) são registrados como proxies: o objeto real só é criado no primeiro
+acesso ou no aquecimento em segundo plano. O registro mantém o estado de cada
+subsistema e os tempos de inicialização para o probe de prontidão.
+"""
+
+import time
+import threading
+from typing import Dict, List, Any, Callable, Optional
+
+PENDING = "pending"
+INITIALIZING = "initializing"
+READY = "ready"
+FAILED = "failed"
+
+
+class LazySubsystem:
+    """Proxy que cria o subsistema no primeiro acesso a um atributo"""
+
+    __slots__ = ("_name", "_factory", "_instance", "_status", "_error", "_init_ms", "_lock")
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_status", PENDING)
+        object.__setattr__(self, "_error", None)
+        object.__setattr__(self, "_init_ms", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _resolve(self) -> Any:
+        """Retorna o objeto real, criando-o se necessário (uma única vez entre threads)"""
+        if self._status == READY:
+            return self._instance
+
+        with self._lock:
+            if self._status == READY:
+                return self._instance
+
+            object.__setattr__(self, "_status", INITIALIZING)
+            start = time.perf_counter()
+            try:
+                instance = self._factory()
+            except Exception as e:
+                # Falhou: o próximo acesso tenta de novo
+                object.__setattr__(self, "_status", FAILED)
+                object.__setattr__(self, "_error", str(e))
+                raise
+            finally:
+                object.__setattr__(self, "_init_ms", round((time.perf_counter() - start) * 1000, 1))
+
+            object.__setattr__(self, "_instance", instance)
+            object.__setattr__(self, "_error", None)
+            object.__setattr__(self, "_status", READY)
+            print(f"✅ Subsistema {self._name} pronto em {self._init_ms} ms")
+            return instance
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._resolve(), attr)
+
+    def __setattr__(self, attr: str, value: Any):
+        setattr(self._resolve(), attr, value)
+
+    def __repr__(self) -> str:
+        return f"<LazySubsystem {self._name} ({self._status})>"
+
+
+class SubsystemRegistry:
+    def __init__(self):
+        """Inicializa o registro (o instante de criação é a referência dos tempos de startup)"""
+        self.started_at = time.perf_counter()
+        self._subsystems: Dict[str, LazySubsystem] = {}
+        self._startup_marks: Dict[str, float] = {}
+        self._warm_up_thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, factory: Callable[[], Any]) -> LazySubsystem:
+        """
+        Registra um subsistema de inicialização sob demanda
+
+        Args:
+            name: Nome do subsistema (usado no /api/ready)
+            factory: Função sem argumentos que cria o objeto real
+
+        Returns:
+            Proxy que encaminha os acessos ao objeto real
+        """
+        proxy = LazySubsystem(name, factory)
+        self._subsystems[name] = proxy
+        return proxy
+
+    def get(self, name: str) -> Any:
+        """Objeto real do subsistema (inicializa se necessário)"""
+        return self._subsystems[name]._resolve()
+
+    def is_ready(self, name: str) -> bool:
+        proxy = self._subsystems.get(name)
+        return proxy is not None and proxy._status == READY
+
+    def mark(self, phase: str):
+        """Registra o instante (ms desde o início) de uma fase do startup"""
+        self._startup_marks[phase] = round((time.perf_counter() - self.started_at) * 1000, 1)
+
+    def warm_up(self, names: List[str] = None, background: bool = True):
+        """
+        Inicializa todos os subsistemas registrados
+
+        Args:
+            names: Subsistemas a aquecer primeiro, nesta ordem (os demais seguem a ordem de registro)
+            background: Rodar numa thread em segundo plano
+        """
+        order = list(names or []) + [name for name in self._subsystems if name not in (names or [])]
+
+        def run():
+            self.mark("warm_up_started")
+            for name in order:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"❌ Erro ao inicializar subsistema {name}: {e}")
+            self.mark("warm_up_finished")
+
+        if not background:
+            run()
+            return
+
+        if self._warm_up_thread is None or not self._warm_up_thread.is_alive():
+            self._warm_up_thread = threading.Thread(target=run, daemon=True, name="subsystem-warm-up")
+            self._warm_up_thread.start()
+
+    def readiness(self) -> Dict[str, Any]:
+        """
+        Estado de prontidão por subsistema e tempos de startup
+
+        Returns:
+            Dicionário com ready (todos prontos), subsistemas e marcos do startup
+        """
+        subsystems = {
+            name: {
+                "status": proxy._status,
+                "init_ms": proxy._init_ms,
+                "error": proxy._error
+            }
+            for name, proxy in self._subsystems.items()
+        }
+        return {
+            "ready": all(info["status"] == READY for info in subsystems.values()),
+            "subsystems": subsystems,
+            "startup": {
+                **self._startup_marks,
+                "uptime_ms": round((time.perf_counter() - self.started_at) * 1000, 1)
+            }
+        }
+
+# Instância global do registro de subsistemas
+subsystems = SubsystemRegistry()
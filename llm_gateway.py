@@ -0,0 +1,434 @@
+"""
+Gateway Compartilhado de LLM
+Centraliza as chamadas à OpenAI dos agentes: cliente HTTP com pool de conexões,
+limites de requisições e tokens por minuto, retentativas com jitter, prazo por chamada,
+circuit breaker e métricas por chamador.
+"""
+
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from typing import Dict, List, Any, Optional
+
+from rate_limiter import TokenBucket
+
+
+class LLMGatewayError(Exception):
+    """Erro do gateway (circuito aberto, prazo esgotado ou retentativas esgotadas)"""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Inicializa o circuit breaker
+
+        Args:
+            failure_threshold: Falhas consecutivas para abrir o circuito
+            reset_timeout: Segundos em aberto antes de permitir uma chamada de teste
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_started_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Verifica se uma chamada pode ser feita (meio-aberto libera uma de teste)
+        
+        Uma chamada de teste sem veredito após reset_timeout libera outra, para que o
+        circuito nunca fique preso em meio-aberto.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "open" and now - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self.probe_started_at = now
+                return True
+            if self.state == "half_open" and now - self.probe_started_at >= self.reset_timeout:
+                self.probe_started_at = now
+                return True
+            return self.state == "closed"
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """Chamada admitida terminou sem veredito (limite, prazo, cancelamento ou erro 4xx)"""
+        with self._lock:
+            if self.state == "half_open":
+                # Volta para aberto já vencido: a próxima chamada pode testar de novo
+                self.state = "open"
+                self.opened_at = time.monotonic() - self.reset_timeout
+
+
+class _CallerMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latencies_ms = deque(maxlen=500)
+
+    def to_dict(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies_ms)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "error_rate": round(self.errors / self.calls, 3) if self.calls else 0,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "latency_ms": {
+                "avg": round(sum(latencies) / len(latencies), 1) if latencies else 0,
+                "p50": round(latencies[len(latencies) // 2], 1) if latencies else 0,
+                "p95": round(latencies[int(len(latencies) * 0.95) - 1], 1) if latencies else 0,
+                "max": round(latencies[-1], 1) if latencies else 0
+            }
+        }
+
+
+class _Completions:
+    def __init__(self, gateway, caller: str):
+        self._gateway = gateway
+        self._caller = caller
+
+    def create(self, **kwargs):
+        return self._gateway.create_chat_completion(self._caller, **kwargs)
+
+
+class _Chat:
+    def __init__(self, gateway, caller: str):
+        self.completions = _Completions(gateway, caller)
+
+
+class CallerClient:
+    """Adaptador com a interface client.chat.completions.create do SDK, roteado pelo gateway"""
+
+    def __init__(self, gateway, caller: str):
+        self.chat = _Chat(gateway, caller)
+
+
+class _AsyncCompletions:
+    def __init__(self, gateway, caller: str):
+        self._gateway = gateway
+        self._caller = caller
+
+    async def create(self, **kwargs):
+        return await self._gateway.acreate_chat_completion(self._caller, **kwargs)
+
+
+class _AsyncChat:
+    def __init__(self, gateway, caller: str):
+        self.completions = _AsyncCompletions(gateway, caller)
+
+
+class AsyncCallerClient:
+    """Versão assíncrona do CallerClient (await client.chat.completions.create(...))"""
+
+    def __init__(self, gateway, caller: str):
+        self.chat = _AsyncChat(gateway, caller)
+
+
+class LLMGateway:
+    def __init__(self):
+        """Inicializa o gateway a partir das variáveis de ambiente"""
+        self.api_key = os.getenv('OPENAI_API_KEY', '')
+        self.base_url = os.getenv('OPENAI_BASE_URL') or None
+        self.max_retries = int(os.getenv('LLM_MAX_RETRIES', '3'))
+        self.default_timeout = float(os.getenv('LLM_TIMEOUT_SECONDS', '30'))
+
+        requests_per_minute = float(os.getenv('LLM_REQUESTS_PER_MINUTE', '500'))
+        tokens_per_minute = float(os.getenv('LLM_TOKENS_PER_MINUTE', '200000'))
+        self.request_limiter = TokenBucket(rate=requests_per_minute / 60, capacity=max(requests_per_minute / 6, 1))
+        self.token_limiter = TokenBucket(rate=tokens_per_minute / 60, capacity=max(tokens_per_minute / 6, 1))
+        self.concurrency = threading.BoundedSemaphore(int(os.getenv('LLM_MAX_CONCURRENCY', '16')))
+
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv('LLM_CIRCUIT_FAILURES', '5')),
+            reset_timeout=float(os.getenv('LLM_CIRCUIT_RESET_SECONDS', '30'))
+        )
+
+        self.metrics: Dict[str, _CallerMetrics] = {}
+        self._metrics_lock = threading.Lock()
+
+        self.client = self._build_client()
+
+        # Cliente assíncrono e semáforo criados no primeiro uso, dentro do event loop do servidor ASGI
+        self._async_client = None
+        self._async_concurrency = None
+        self.max_concurrency = int(os.getenv('LLM_MAX_CONCURRENCY', '16'))
+
+    def _build_client(self):
+        """Cria o cliente OpenAI com pool de conexões HTTP compartilhado"""
+        if not self.api_key:
+            return None
+
+        try:
+            import httpx
+            from openai import OpenAI
+
+            http_client = httpx.Client(
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+                timeout=self.default_timeout
+            )
+            # Retentativas feitas pelo gateway (com jitter e prazo), não pelo SDK
+            return OpenAI(api_key=self.api_key, base_url=self.base_url, http_client=http_client, max_retries=0)
+        except Exception as e:
+            print(f"❌ Erro ao configurar gateway LLM: {e}")
+            return None
+
+    def _get_async_client(self):
+        """Cria (uma vez) o AsyncOpenAI com pool de conexões assíncrono"""
+        if self._async_client is None and self.api_key:
+            import httpx
+            from openai import AsyncOpenAI
+
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+                timeout=self.default_timeout
+            )
+            self._async_client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url,
+                                             http_client=http_client, max_retries=0)
+            self._async_concurrency = asyncio.Semaphore(self.max_concurrency)
+        return self._async_client
+
+    async def aclose(self):
+        """Fecha o cliente assíncrono (encerramento do servidor ASGI)"""
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
+    def is_available(self) -> bool:
+        """Verifica se há cliente configurado"""
+        return self.client is not None
+
+    def client_for(self, caller: str) -> Optional[CallerClient]:
+        """
+        Retorna um cliente com a interface do SDK identificado pelo chamador
+
+        Args:
+            caller: Nome do chamador para as métricas (ex.: "orchestrator")
+
+        Returns:
+            CallerClient ou None se a OpenAI não estiver configurada
+        """
+        return CallerClient(self, caller) if self.is_available() else None
+
+    def async_client_for(self, caller: str) -> Optional[AsyncCallerClient]:
+        """Versão assíncrona de client_for"""
+        return AsyncCallerClient(self, caller) if self.is_available() else None
+
+    def _caller_metrics(self, caller: str) -> _CallerMetrics:
+        with self._metrics_lock:
+            if caller not in self.metrics:
+                self.metrics[caller] = _CallerMetrics()
+            return self.metrics[caller]
+
+    @staticmethod
+    def _estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+        """Estimativa de tokens da chamada (~4 caracteres por token + limite de saída)"""
+        prompt_chars = sum(len(message.get("content") or "") for message in messages)
+        return prompt_chars // 4 + (max_tokens or 256)
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Erros transitórios: rede, timeout, limite de taxa e 5xx"""
+        status = getattr(error, "status_code", None)
+        if status is not None:
+            return status == 429 or status >= 500
+        name = type(error).__name__
+        return name in ("APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError",
+                        "TimeoutException", "ConnectError", "ReadTimeout", "TimeoutError")
+
+    def _admit(self, caller: str, kwargs: Dict[str, Any], deadline: Optional[float]):
+        """Valida disponibilidade e circuito; retorna métricas, prazo e estimativa de tokens"""
+        if not self.is_available():
+            raise LLMGatewayError("OpenAI não configurada")
+
+        metrics = self._caller_metrics(caller)
+        timeout = kwargs.pop("timeout", None)
+        budget = deadline or timeout or self.default_timeout
+
+        if not self.circuit_breaker.allow():
+            metrics.rejected += 1
+            raise LLMGatewayError("Circuito aberto: OpenAI indisponível temporariamente")
+
+        estimated_tokens = self._estimate_tokens(kwargs.get("messages", []), kwargs.get("max_tokens"))
+        return metrics, budget, time.monotonic() + budget, estimated_tokens
+
+    def _on_failure(self, metrics: _CallerMetrics, error: Exception, attempt: int, deadline_at: float) -> Optional[float]:
+        """Registra a falha da tentativa; retorna o backoff da próxima ou None para desistir"""
+        metrics.errors += 1
+
+        if attempt > self.max_retries or not self._is_retryable(error):
+            return None
+
+        # Backoff exponencial com jitter completo, limitado ao prazo restante
+        backoff = random.uniform(0, min(8.0, 0.5 * (2 ** attempt)))
+        if time.monotonic() + backoff >= deadline_at:
+            return None
+        metrics.retries += 1
+        return backoff
+
+    def _on_success(self, metrics: _CallerMetrics, start_time: float, response):
+        metrics.latencies_ms.append((time.monotonic() - start_time) * 1000)
+
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            metrics.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            metrics.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+    def _settle_circuit(self, outcome: Optional[str]):
+        """
+        Informa o circuito uma única vez por chamada lógica (não por tentativa)
+
+        Args:
+            outcome: "success", "failure" (erro transitório após as retentativas) ou
+                     None (sem veredito: limite, prazo, cancelamento ou erro não transitório)
+        """
+        if outcome == "success":
+            self.circuit_breaker.record_success()
+        elif outcome == "failure":
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.release()
+
+    def create_chat_completion(self, caller: str, deadline: float = None, **kwargs):
+        """
+        Executa chat.completions.create com limites, retentativas e prazo
+
+        Args:
+            caller: Nome do chamador para as métricas
+            deadline: Prazo total em segundos (padrão: LLM_TIMEOUT_SECONDS)
+            **kwargs: Parâmetros do chat.completions.create
+
+        Returns:
+            Resposta do SDK da OpenAI
+        """
+        metrics, budget, deadline_at, estimated_tokens = self._admit(caller, kwargs, deadline)
+
+        outcome = None
+        try:
+            if not (self.request_limiter.acquire(1, timeout=deadline_at - time.monotonic()) and
+                    self.token_limiter.acquire(estimated_tokens, timeout=deadline_at - time.monotonic())):
+                metrics.rejected += 1
+                raise LLMGatewayError("Limite de requisições/tokens por minuto atingido dentro do prazo")
+
+            attempt = 0
+            while True:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    metrics.errors += 1
+                    # Prazo consumido por falhas transitórias conta como falha
+                    outcome = "failure" if attempt else None
+                    raise LLMGatewayError(f"Prazo de {budget}s esgotado")
+
+                start_time = time.monotonic()
+                metrics.calls += 1
+                try:
+                    with self.concurrency:
+                        response = self.client.chat.completions.create(timeout=remaining, **kwargs)
+                except Exception as e:
+                    attempt += 1
+                    backoff = self._on_failure(metrics, e, attempt, deadline_at)
+                    if backoff is None:
+                        outcome = "failure" if self._is_retryable(e) else None
+                        raise
+                    time.sleep(backoff)
+                    continue
+
+                self._on_success(metrics, start_time, response)
+                outcome = "success"
+                return response
+        finally:
+            self._settle_circuit(outcome)
+
+    async def acreate_chat_completion(self, caller: str, deadline: float = None, **kwargs):
+        """
+        Versão assíncrona de create_chat_completion (mesmos limites, circuito e métricas)
+
+        Args:
+            caller: Nome do chamador para as métricas
+            deadline: Prazo total em segundos (padrão: LLM_TIMEOUT_SECONDS)
+            **kwargs: Parâmetros do chat.completions.create
+
+        Returns:
+            Resposta do SDK da OpenAI
+        """
+        metrics, budget, deadline_at, estimated_tokens = self._admit(caller, kwargs, deadline)
+
+        # Cancelamento (CancelledError) também passa pelo finally e libera o circuito
+        outcome = None
+        try:
+            client = self._get_async_client()
+            if not (await self.request_limiter.acquire_async(1, timeout=deadline_at - time.monotonic()) and
+                    await self.token_limiter.acquire_async(estimated_tokens, timeout=deadline_at - time.monotonic())):
+                metrics.rejected += 1
+                raise LLMGatewayError("Limite de requisições/tokens por minuto atingido dentro do prazo")
+
+            attempt = 0
+            while True:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    metrics.errors += 1
+                    outcome = "failure" if attempt else None
+                    raise LLMGatewayError(f"Prazo de {budget}s esgotado")
+
+                start_time = time.monotonic()
+                metrics.calls += 1
+                try:
+                    async with self._async_concurrency:
+                        response = await client.chat.completions.create(timeout=remaining, **kwargs)
+                except Exception as e:
+                    attempt += 1
+                    backoff = self._on_failure(metrics, e, attempt, deadline_at)
+                    if backoff is None:
+                        outcome = "failure" if self._is_retryable(e) else None
+                        raise
+                    await asyncio.sleep(backoff)
+                    continue
+
+                self._on_success(metrics, start_time, response)
+                outcome = "success"
+                return response
+        finally:
+            self._settle_circuit(outcome)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Retorna métricas do gateway por chamador
+
+        Returns:
+            Dicionário com estado do circuito e métricas
+        """
+        with self._metrics_lock:
+            callers = {caller: metrics.to_dict() for caller, metrics in self.metrics.items()}
+
+        return {
+            "available": self.is_available(),
+            "base_url": self.base_url or "https://api.openai.com/v1",
+            "circuit_state": self.circuit_breaker.state,
+            "consecutive_failures": self.circuit_breaker.consecutive_failures,
+            "callers": callers
+        }
+
+# Instância global do gateway
+llm_gateway = LLMGateway()
@@ -0,0 +1,236 @@
+"""
+Avaliador Local de Qualidade
+Avalia respostas dos agentes em milissegundos, sem LLM: similaridade semântica
+entre pergunta e resposta, produtos citados versus resultados da busca, validação
+de números (rendimento, PEI, secagem) contra a base de conhecimento e legibilidade.
+Produz o mesmo formato de quality_scores do revisor e indica quando escalar para a OpenAI.
+"""
+
+import re
+from typing import Dict, List, Any, Optional, Callable, Set
+import numpy as np
+
+from keyword_matcher import KeywordMatcher, fold_accents
+
+# Afirmações numéricas verificáveis: padrão na resposta -> campos do produto
+NUMERIC_CLAIMS = {
+    "coverage": {
+        "pattern": r'(?:rend\w*|cobertura|cobre)\D{0,25}?(\d+(?:[.,]\d+)?)',
+        "fields": ["coverage"]
+    },
+    "pei": {
+        "pattern": r'\bpei\s*(\d)',
+        "fields": ["pei_class"]
+    },
+    "drying_time": {
+        "pattern": r'(?:secagem|seca\w*)\D{0,25}?(\d+(?:[.,]\d+)?)',
+        "fields": ["drying_time"]
+    }
+}
+
+# Palavras que indicam orientação prática ao cliente
+ACTIONABLE_TERMS = ["recomend", "sugir", "indic", "utilize", "aplique", "escolha", "ideal para"]
+
+
+def _numbers(value: Any) -> Set[float]:
+    """Extrai todos os números de um valor (texto ou número)"""
+    return {float(n.replace(',', '.')) for n in re.findall(r'\d+(?:[.,]\d+)?', str(value))}
+
+
+class LocalQualityScorer:
+    def __init__(self,
+                 approval_threshold: float = 0.7,
+                 escalation_band: tuple = (0.55, 0.75)):
+        """
+        Inicializa o avaliador local
+
+        Args:
+            approval_threshold: Score geral mínimo para aprovação
+            escalation_band: Faixa de scores incertos que devem ser escalados
+        """
+        self.approval_threshold = approval_threshold
+        self.escalation_band = escalation_band
+
+        # Encoders e catálogo de produtos por agente (espaços de embedding diferentes)
+        self._encoders: Dict[str, Callable] = {}
+        self._product_matchers: Dict[str, KeywordMatcher] = {}
+
+    def set_encoder(self, agent_type: str, encode_fn: Callable):
+        """
+        Configura o encoder usado para as respostas de um agente
+
+        Args:
+            agent_type: Tipo do agente
+            encode_fn: Função que recebe lista de textos e retorna embeddings
+        """
+        self._encoders[agent_type] = encode_fn
+
+    def register_knowledge_base(self, agent_type: str, items: List[Dict[str, Any]]):
+        """
+        Compila os nomes de produtos da base para detectar produtos citados
+
+        Args:
+            agent_type: Tipo do agente
+            items: Itens da base de conhecimento
+        """
+        table = {}
+        for item in items:
+            name = item.get('product_name') or item.get('name')
+            if name and len(name) >= 4:
+                table.setdefault(fold_accents(name), [name])
+        self._product_matchers[agent_type] = KeywordMatcher(table)
+
+    def _similarity(self, agent_type: str, user_query: str, agent_response: str) -> Optional[float]:
+        """Similaridade de cosseno entre pergunta e resposta"""
+        encode_fn = self._encoders.get(agent_type) or next(iter(self._encoders.values()), None)
+        if encode_fn is None:
+            return None
+
+        vectors = np.asarray(encode_fn([user_query, agent_response]), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1)
+        if not norms.all():
+            return 0.0
+        return float(vectors[0] @ vectors[1] / (norms[0] * norms[1]))
+
+    def _cited_products(self, agent_type: str, agent_response: str,
+                        documents: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+        """Produtos citados na resposta, separados entre encontrados ou não na busca"""
+        retrieved = {
+            fold_accents(doc.get('product_name') or doc.get('name') or ''): doc
+            for doc in documents
+        }
+        retrieved.pop('', None)
+
+        cited = set(KeywordMatcher({name: [name] for name in retrieved}).labels(agent_response)) if retrieved else set()
+
+        unsupported = []
+        matcher = self._product_matchers.get(agent_type)
+        if matcher:
+            unsupported = sorted(name for name in matcher.labels(agent_response) if name not in retrieved)
+
+        return {"supported": sorted(cited), "unsupported": unsupported}
+
+    def _validate_numeric_claims(self, agent_response: str,
+                                 reference_docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Confere números citados na resposta contra os campos dos produtos de referência"""
+        text = fold_accents(agent_response)
+        checked, invalid = 0, []
+
+        for claim, spec in NUMERIC_CLAIMS.items():
+            known = set()
+            for doc in reference_docs:
+                for field in spec["fields"]:
+                    if doc.get(field) not in (None, ''):
+                        known |= _numbers(doc[field])
+            if not known:
+                continue  # Nada na base para comparar
+
+            for match in re.finditer(spec["pattern"], text):
+                checked += 1
+                value = float(match.group(1).replace(',', '.'))
+                if value not in known:
+                    invalid.append({"claim": claim, "value": value, "expected": sorted(known)[:5]})
+
+        return {"checked": checked, "invalid": invalid}
+
+    def _readability(self, agent_response: str) -> float:
+        """Legibilidade pelo tamanho médio das frases e proporção de palavras longas"""
+        sentences = [s for s in re.split(r'[.!?\n]+', agent_response) if s.strip()]
+        words = re.findall(r'\w+', agent_response)
+        if not sentences or not words:
+            return 0.0
+
+        words_per_sentence = len(words) / len(sentences)
+        long_words = sum(1 for w in words if len(w) > 12) / len(words)
+
+        sentence_score = 1.0 if 6 <= words_per_sentence <= 25 else 0.7 if words_per_sentence <= 40 else 0.4
+        return max(0.0, sentence_score - long_words)
+
+    def score(self,
+              user_query: str,
+              agent_response: str,
+              agent_type: str,
+              search_results: List[Dict] = None,
+              quality_criteria: Dict[str, Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Avalia a resposta localmente
+
+        Args:
+            user_query: Pergunta do usuário
+            agent_response: Resposta do agente
+            agent_type: Tipo do agente
+            search_results: Resultados da busca semântica
+            quality_criteria: Critérios com pesos do revisor
+
+        Returns:
+            quality_scores, overall_score, approved, suggestions, local_checks e escalate
+        """
+        documents = [
+            result.get('document') or result.get('metadata') or {}
+            for result in (search_results or [])
+        ]
+
+        similarity = self._similarity(agent_type, user_query, agent_response)
+        relevance = min(max((similarity - 0.1) / 0.6, 0.0), 1.0) if similarity is not None else 0.6
+
+        products = self._cited_products(agent_type, agent_response, documents)
+        cited_docs = [
+            doc for doc in documents
+            if fold_accents(doc.get('product_name') or doc.get('name') or '') in products["supported"]
+        ]
+        numeric = self._validate_numeric_claims(agent_response, cited_docs or documents)
+
+        readability = self._readability(agent_response)
+        response_lower = fold_accents(agent_response)
+        actionable = any(term in response_lower for term in ACTIONABLE_TERMS)
+
+        # Precisão: penaliza números divergentes e produtos fora da busca
+        accuracy = 0.85
+        if numeric["checked"]:
+            accuracy -= 0.4 * len(numeric["invalid"]) / numeric["checked"]
+        cited_total = len(products["supported"]) + len(products["unsupported"])
+        if cited_total:
+            accuracy -= 0.3 * len(products["unsupported"]) / cited_total
+
+        quality_scores = {
+            "accuracy": round(max(accuracy, 0.0), 3),
+            "completeness": round(0.5 * min(len(agent_response) / 300, 1.0) + 0.5 * relevance, 3),
+            "clarity": round(readability, 3),
+            "helpfulness": round(min(0.7 * relevance + (0.3 if actionable or products["supported"] else 0.1), 1.0), 3),
+            "professionalism": 0.9 if agent_response.startswith(("Olá", "Oi", "Bom dia", "Boa tarde", "Boa noite")) else 0.8
+        }
+
+        weights = {name: info["weight"] for name, info in (quality_criteria or {}).items()} or {
+            name: 1 / len(quality_scores) for name in quality_scores
+        }
+        overall_score = sum(quality_scores[name] * weights.get(name, 0) for name in quality_scores)
+
+        suggestions = []
+        if numeric["invalid"]:
+            suggestions.append("Verifique os valores técnicos citados; há divergências com a base de conhecimento")
+        if products["unsupported"]:
+            suggestions.append("Cite apenas produtos retornados pela busca para esta consulta")
+        if relevance < 0.4:
+            suggestions.append("A resposta parece pouco relacionada à pergunta do cliente")
+        if quality_scores["completeness"] < 0.7:
+            suggestions.append("Considere fornecer mais detalhes na resposta")
+        if quality_scores["clarity"] < 0.7:
+            suggestions.append("Torne a linguagem mais clara e acessível")
+
+        low, high = self.escalation_band
+        escalate = bool(numeric["invalid"] or products["unsupported"] or low <= overall_score < high)
+
+        return {
+            "quality_scores": quality_scores,
+            "overall_score": round(overall_score, 2),
+            "approved": overall_score >= self.approval_threshold and not numeric["invalid"],
+            "suggestions": suggestions,
+            "improved_response": None,
+            "local_checks": {
+                "similarity": round(similarity, 3) if similarity is not None else None,
+                "cited_products": products,
+                "numeric_claims": numeric,
+                "readability": round(readability, 3)
+            },
+            "escalate": escalate
+        }
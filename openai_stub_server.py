@@ -0,0 +1,327 @@
+"""
+Servidor Stub Compatível com a OpenAI
+Servidor HTTP local que implementa POST /v1/chat/completions com respostas JSON
+determinísticas e válidas para os prompts do orquestrador e do revisor, com
+distribuição de latência e taxa de erros configuráveis. Usado em testes de carga
+e latência sem depender (nem pagar) da OpenAI: aponte OPENAI_BASE_URL para ele.
+
+Uso:
+    python openai_stub_server.py --port 8765 --latency-ms 300 --latency-dist lognormal --error-rate 0.02
+"""
+
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Any, Optional
+
+# Palavras que decidem o agente nas respostas simuladas do orquestrador
+STUB_AGENT_KEYWORDS = {
+    "tintas": ["tinta", "verniz", "esmalte", "primer", "pintura", "pintar", "demão", "cor"],
+    "pisos": ["piso", "porcelanato", "cerâmica", "ceramica", "laminado", "vinílico", "vinilico", "azulejo", "revestimento"]
+}
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+
+class StubConfig:
+    def __init__(self,
+                 latency_ms: float = 0.0,
+                 latency_dist: str = "fixed",
+                 latency_sigma: float = 0.5,
+                 error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        """
+        Inicializa a configuração do stub
+
+        Args:
+            latency_ms: Latência média (ou fixa) por requisição em milissegundos
+            latency_dist: Distribuição da latência (fixed, uniform, exponential, lognormal)
+            latency_sigma: Dispersão da lognormal (cauda mais longa com valores maiores)
+            error_rate: Fração de requisições que retornam 500/503
+            rate_limit_rate: Fração de requisições que retornam 429
+            seed: Semente do sorteio de latência/erros (None = aleatória)
+        """
+        if latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Distribuição de latência inválida: {latency_dist}")
+
+        self.latency_ms = latency_ms
+        self.latency_dist = latency_dist
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample_latency(self) -> float:
+        """Sorteia a latência de uma requisição em segundos"""
+        mean = self.latency_ms / 1000
+        if mean <= 0:
+            return 0.0
+
+        with self._lock:
+            if self.latency_dist == "uniform":
+                return self._random.uniform(0, 2 * mean)
+            if self.latency_dist == "exponential":
+                return self._random.expovariate(1 / mean)
+            if self.latency_dist == "lognormal":
+                # Mediana ajustada para que a média seja latency_ms
+                mu = math.log(mean) - self.latency_sigma ** 2 / 2
+                return self._random.lognormvariate(mu, self.latency_sigma)
+        return mean
+
+    def sample_error(self) -> Optional[int]:
+        """Sorteia se a requisição falha e com qual status HTTP"""
+        with self._lock:
+            draw = self._random.random()
+        if draw < self.rate_limit_rate:
+            return 429
+        if draw < self.rate_limit_rate + self.error_rate:
+            return 503 if draw < self.rate_limit_rate + self.error_rate / 2 else 500
+        return None
+
+
+def _digest_fraction(text: str, salt: str) -> float:
+    """Número determinístico em [0, 1) derivado do texto"""
+    digest = hashlib.sha256(f"{salt}:{text}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") / 2 ** 32
+
+
+def _quoted(text: str, label: str) -> str:
+    """Extrai o texto entre aspas após um rótulo do prompt"""
+    match = re.search(label + r'\s*"(.*?)"', text, re.DOTALL)
+    return match.group(1) if match else text
+
+
+def _review_payload(user_prompt: str) -> Dict[str, Any]:
+    """Avaliação determinística no formato do revisor"""
+    criteria = ["accuracy", "completeness", "clarity", "helpfulness", "professionalism"]
+    scores = {
+        criterion: round(0.6 + 0.35 * _digest_fraction(user_prompt, criterion), 2)
+        for criterion in criteria
+    }
+    weights = {"accuracy": 0.3, "completeness": 0.25, "clarity": 0.2, "helpfulness": 0.15, "professionalism": 0.1}
+    overall = round(sum(scores[c] * weights[c] for c in criteria), 2)
+    approved = overall >= 0.7
+
+    return {
+        "quality_scores": scores,
+        "overall_score": overall,
+        "approved": approved,
+        "suggestions": [] if approved else ["Inclua mais detalhes técnicos sobre o produto recomendado"],
+        "improved_response": None if approved else "Resposta revisada (stub): recomendamos confirmar as especificações técnicas do produto."
+    }
+
+
+def _routing_payload(user_prompt: str) -> Dict[str, Any]:
+    """Roteamento determinístico no formato do orquestrador"""
+    query = _quoted(user_prompt, "CONSULTA DO CLIENTE:").lower()
+    scores = {
+        agent: sum(1 for keyword in keywords if keyword in query)
+        for agent, keywords in STUB_AGENT_KEYWORDS.items()
+    }
+    ranked = sorted(scores, key=lambda agent: (-scores[agent], agent))
+    best, second = ranked[0], ranked[1]
+
+    if scores[best] == 0:
+        best = "tintas" if _digest_fraction(query, "route") < 0.5 else "pisos"
+
+    return {
+        "selected_agent": best,
+        "confidence": round(0.7 + 0.25 * _digest_fraction(query, "confidence"), 2) if scores[best] else 0.55,
+        "reasoning": f"Stub: {scores[best]} palavra(s)-chave de {best} na consulta",
+        "requires_multiple_agents": scores[second] > 0,
+        "additional_context": {}
+    }
+
+
+def build_completion_content(messages: List[Dict[str, Any]]) -> str:
+    """
+    Gera o conteúdo da resposta conforme o prompt recebido
+
+    Args:
+        messages: Mensagens da requisição chat.completions
+
+    Returns:
+        Texto da resposta (JSON quando o prompt pede JSON)
+    """
+    system_prompt = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+    user_prompt = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+
+    if '"reviews"' in system_prompt:
+        items = re.findall(r'^ITEM (\d+)', user_prompt, re.MULTILINE)
+        blocks = re.split(r'^ITEM \d+', user_prompt, flags=re.MULTILINE)[1:]
+        reviews = [
+            {"item": int(item), **_review_payload(block)}
+            for item, block in zip(items, blocks)
+        ]
+        return json.dumps({"reviews": reviews}, ensure_ascii=False)
+
+    if '"quality_scores"' in system_prompt:
+        return json.dumps(_review_payload(user_prompt), ensure_ascii=False)
+
+    if '"selected_agent"' in system_prompt:
+        return json.dumps(_routing_payload(user_prompt), ensure_ascii=False)
+
+    return "Resposta simulada (stub) para: " + user_prompt[:200]
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    server_version = "OpenAIStub/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Silencioso durante benchmarks
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "gpt-3.5-turbo", "object": "model"}]})
+        elif self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, self.server.get_statistics())
+        else:
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "Invalid JSON", "type": "invalid_request_error"}})
+            return
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+            return
+
+        config = self.server.config
+        time.sleep(config.sample_latency())
+
+        error_status = config.sample_error()
+        if error_status:
+            self.server.record(error_status)
+            error_type = "rate_limit_error" if error_status == 429 else "server_error"
+            self._send_json(error_status, {"error": {"message": f"Stub error {error_status}", "type": error_type}})
+            return
+
+        messages = request.get("messages") or []
+        content = build_completion_content(messages)
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+        completion_tokens = len(content) // 4
+
+        self.server.record(200)
+        self._send_json(200, {
+            "id": "chatcmpl-stub-" + hashlib.sha1(content.encode("utf-8")).hexdigest()[:12],
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-3.5-turbo"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        })
+
+
+class OpenAIStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: StubConfig = None):
+        """
+        Inicializa o servidor stub
+
+        Args:
+            host: Endereço de escuta
+            port: Porta (0 = porta livre escolhida pelo sistema)
+            config: Configuração de latência e erros
+        """
+        super().__init__((host, port), StubRequestHandler)
+        self.config = config or StubConfig()
+        self.status_counts: Dict[int, int] = {}
+        self._stats_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """URL base para OPENAI_BASE_URL"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def record(self, status: int):
+        with self._stats_lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "requests": sum(self.status_counts.values()),
+                "status_counts": {str(status): count for status, count in self.status_counts.items()},
+                "latency_ms": self.config.latency_ms,
+                "latency_dist": self.config.latency_dist,
+                "error_rate": self.config.error_rate,
+                "rate_limit_rate": self.config.rate_limit_rate
+            }
+
+    def start_background(self) -> "OpenAIStubServer":
+        """Inicia o servidor em uma thread daemon"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Encerra o servidor"""
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor stub compatível com a API de chat da OpenAI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed
+    )
+    server = OpenAIStubServer(args.host, args.port, config)
+    print(f"✅ Stub OpenAI escutando em {server.base_url}")
+    print(f"   export OPENAI_BASE_URL={server.base_url} OPENAI_API_KEY=stub")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,23 @@ deve responder a cada consulta e gerenciar fluxos complexos de conversação.
 
 import os
 import json
+import asyncio
 import re
-from typing import Dict, List, Any, Optional, Tuple
+import copy
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import Dict, List, Any, Optional, Tuple, Callable
 from datetime import datetime
-import openai
-from openai import OpenAI
+from llm_gateway import llm_gateway
+from ttl_cache import TTLCache
+from redis_manager import redis_manager
+from knowledge_deduplicator import normalize_text
+from intent_router import EmbeddingIntentRouter
+from keyword_matcher import KeywordMatcher
+from conversation_store import create_conversation_store
+from deadline import Deadline
+from single_flight import SingleFlight
 
 class OrchestratorAgent:
     def __init__(self):
@@ -19,6 +31,7 @@ class OrchestratorAgent:
         """
         self.agent_type = "orquestrador"
         self.client = None
+        self.async_client = None
         self.model = "gpt-3.5-turbo"  # Modelo padrão
         
         # Configurar cliente OpenAI
@@ -42,14 +55,39 @@ class OrchestratorAgent:
             }
         }
         
-        # Histórico de conversas para contexto
-        self.conversation_history = {}
+        # Tabela de palavras-chave compilada (recompilada quando os agentes mudam)
+        self.keyword_matcher = KeywordMatcher()
+        self._build_keyword_matcher()
+        
+        # Handlers dos pipelines especialistas (registrados pela aplicação) para fan-out
+        self.agent_handlers: Dict[str, Callable] = {}
+        self.agent_timeouts: Dict[str, float] = {}
+        self.default_agent_timeout = float(os.getenv('AGENT_TIMEOUT_SECONDS', '8'))
+        self.fanout_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="agent-fanout")
+        
+        # Histórico de conversas para contexto (limitado; Redis quando configurado)
+        self.conversation_history = create_conversation_store(
+            max_sessions=5000, max_messages_per_session=50, ttl_seconds=3600
+        )
+        
+        # Cache de decisões de roteamento (compartilhado via Redis quando configurado)
+        self.routing_cache = TTLCache(max_size=2048, ttl_seconds=600, namespace="routing", backend=redis_manager)
+        self.routing_latency_saved_ms = 0.0
+        self.routing_flight = SingleFlight("routing")  # Consultas idênticas simultâneas: uma chamada à OpenAI
+        
+        # Roteador local por embeddings (encoder injetado via set_encoder)
+        self.local_router = EmbeddingIntentRouter(
+            margin_threshold=float(os.getenv('ROUTER_MARGIN_THRESHOLD', '0.05'))
+        )
+        
+        # Tempo mínimo restante no prazo para consultar a OpenAI no roteamento
+        self.llm_routing_min_seconds = float(os.getenv('ROUTING_LLM_MIN_SECONDS', '0.3'))
 
     def _setup_openai_client(self):
-        """Configura o cliente OpenAI"""
-        api_key = os.getenv('OPENAI_API_KEY')
-        if api_key:
-            self.client = OpenAI(api_key=api_key)
+        """Configura o cliente OpenAI (via gateway compartilhado)"""
+        self.client = llm_gateway.client_for("orchestrator")
+        self.async_client = llm_gateway.async_client_for("orchestrator")
+        if self.client:
             print("✅ Cliente OpenAI configurado")
         else:
             print("⚠️  OPENAI_API_KEY não encontrada. Orquestrador funcionará em modo limitado.")
@@ -58,48 +96,142 @@ class OrchestratorAgent:
         """Verifica se a OpenAI está disponível"""
         return self.client is not None
 
-    def identify_intent_and_agent(self, user_query: str, session_id: str = None) -> Dict[str, Any]:
+    def _build_keyword_matcher(self):
+        """Compila palavras-chave e ambientes de todos os agentes em um único matcher"""
+        table = {}
+        for agent_id, agent_info in self.available_agents.items():
+            table[(agent_id, "keywords")] = agent_info.get("keywords", [])
+            table[(agent_id, "environments")] = agent_info.get("environments", [])
+        self.keyword_matcher.build(table)
+
+    def register_agent(self, agent_id: str, agent_info: Dict[str, Any]):
         """
-        Identifica a intenção do usuário e qual agente deve responder
+        Adiciona ou atualiza um agente especialista
+        
+        Args:
+            agent_id: Identificador do agente
+            agent_info: Nome, descrição, keywords, environments e endpoint
+        """
+        self.available_agents[agent_id] = agent_info
+        self._build_keyword_matcher()
+        self.local_router.build(self.available_agents)
+        self.routing_cache.invalidate()
+
+    def register_agent_handler(self, agent_id: str, handler: Callable, timeout: float = None):
+        """
+        Registra o pipeline de um agente especialista
+        
+        Args:
+            agent_id: Identificador do agente
+            handler: Função (user_query, session_id, search_results=None) -> {"response", "search_results"};
+                     search_results, quando informado, vem de uma busca já feita (especulativa)
+            timeout: Tempo máximo de resposta do agente em segundos
+        """
+        self.agent_handlers[agent_id] = handler
+        if timeout is not None:
+            self.agent_timeouts[agent_id] = timeout
+
+    def _needs_multiple_agents(self, keyword_scores: Dict[str, int]) -> bool:
+        """Consulta mista quando o segundo agente tem pontuação próxima à do primeiro"""
+        ranked = sorted(keyword_scores.values(), reverse=True)
+        if len(ranked) < 2:
+            return False
+        best, second = ranked[0], ranked[1]
+        return second >= 2 and second * 2 >= best
+
+    def set_encoder(self, encode_fn):
+        """
+        Configura o encoder do roteador local e constrói os protótipos dos agentes
+        
+        Args:
+            encode_fn: Função que recebe lista de textos e retorna embeddings
+        """
+        self.local_router.build(self.available_agents, encode_fn)
+
+    def add_routing_example(self, user_query: str, agent_id: str) -> bool:
+        """
+        Adiciona uma consulta rotulada ao roteador local
         
         Args:
             user_query: Consulta do usuário
-            session_id: ID da sessão para contexto
+            agent_id: Agente correto
             
         Returns:
-            Dicionário com agente identificado e informações adicionais
+            True se adicionada, False se o agente não existe
+        """
+        if agent_id not in self.available_agents:
+            return False
+        self.local_router.add_labelled_query(user_query, agent_id)
+        return True
+
+    def _local_intent(self, user_query: str) -> Tuple[Dict[str, int], Optional[Dict[str, Any]]]:
         """
-        query_lower = user_query.lower()
+        Etapa local do roteamento (CPU, sem rede): palavras-chave e roteador por embeddings
         
-        # Análise baseada em palavras-chave (fallback)
-        keyword_scores = {}
-        for agent_id, agent_info in self.available_agents.items():
-            score = 0
-            keywords = agent_info["keywords"]
-            environments = agent_info["environments"]
-            
-            # Pontuação por palavras-chave
-            for keyword in keywords:
-                if keyword in query_lower:
-                    score += 2
-            
-            # Pontuação por ambientes
-            for env in environments:
-                if env in query_lower:
-                    score += 1
+        Args:
+            user_query: Consulta do usuário
             
-            keyword_scores[agent_id] = score
+        Returns:
+            Pontuação por palavras-chave e análise do roteador local (ou None)
+        """
+        # Análise baseada em palavras-chave (fallback), em uma passada pela consulta
+        matches = self.keyword_matcher.matches(user_query)
+        keyword_scores = {}
+        for agent_id in self.available_agents:
+            # 2 pontos por palavra-chave e 1 por ambiente
+            keyword_scores[agent_id] = (
+                2 * len(matches.get((agent_id, "keywords"), ())) +
+                len(matches.get((agent_id, "environments"), ()))
+            )
         
-        # Se OpenAI está disponível, usar análise avançada
-        if self._is_openai_available():
-            try:
-                openai_analysis = self._analyze_with_openai(user_query, session_id)
-                if openai_analysis:
-                    return openai_analysis
-            except Exception as e:
-                print(f"⚠️  Erro na análise OpenAI: {e}. Usando análise por palavras-chave.")
+        # Roteador local: decide sem OpenAI quando a margem entre agentes é suficiente
+        local_analysis = None
+        try:
+            local_analysis = self.local_router.classify(user_query)
+        except Exception as e:
+            print(f"⚠️  Erro no roteador local: {e}")
         
-        # Análise por palavras-chave (fallback)
+        if local_analysis:
+            local_analysis["requires_multiple_agents"] = self._needs_multiple_agents(keyword_scores)
+        
+        return keyword_scores, local_analysis
+
+    def _cached_routing(self, user_query: str, session_id: str = None) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Chave do cache de roteamento e a análise em cache (se houver)"""
+        cache_key = self._routing_cache_key(user_query, session_id)
+        cached = self.routing_cache.get(cache_key)
+        if not cached:
+            return cache_key, None
+        
+        self.routing_latency_saved_ms += cached.get("latency_ms", 0)
+        analysis = copy.deepcopy(cached["analysis"])
+        analysis["cache_hit"] = True
+        return cache_key, analysis
+
+    def _routing_llm_allowed(self, deadline: Optional[Deadline], local_analysis: Optional[Dict[str, Any]]) -> bool:
+        """Verifica se o prazo comporta o roteamento via OpenAI (registra a degradação se não)"""
+        if deadline is not None and deadline.near(self.llm_routing_min_seconds):
+            # Prazo curto: fica com o roteador local ou as palavras-chave
+            deadline.degrade(
+                "local_analysis" if local_analysis else "keyword_matching",
+                "Prazo insuficiente para roteamento via OpenAI"
+            )
+            return False
+        return True
+
+    def _remember_routing(self, user_query: str, cache_key: str, analysis: Dict[str, Any], start_time: float):
+        """Guarda a decisão da OpenAI no cache e no roteador local"""
+        # Decisões confiantes viram exemplos rotulados do roteador local
+        if (analysis.get("selected_agent") in self.available_agents
+                and analysis.get("confidence", 0) >= 0.8):
+            self.local_router.add_labelled_query(user_query, analysis["selected_agent"])
+        self.routing_cache.set(cache_key, {
+            "analysis": analysis,
+            "latency_ms": (time.time() - start_time) * 1000
+        })
+
+    def _keyword_analysis(self, keyword_scores: Dict[str, int]) -> Dict[str, Any]:
+        """Análise por palavras-chave (último fallback)"""
         best_agent = max(keyword_scores.items(), key=lambda x: x[1])
         
         if best_agent[1] == 0:
@@ -118,30 +250,111 @@ class OrchestratorAgent:
             "reasoning": reasoning,
             "analysis_method": "keyword_matching",
             "all_scores": keyword_scores,
-            "requires_multiple_agents": False,
+            "requires_multiple_agents": self._needs_multiple_agents(keyword_scores),
             "additional_context": {}
         }
 
-    def _analyze_with_openai(self, user_query: str, session_id: str = None) -> Optional[Dict[str, Any]]:
+    def identify_intent_and_agent(self, user_query: str, session_id: str = None,
+                                  deadline: Deadline = None) -> Dict[str, Any]:
         """
-        Usa OpenAI para análise avançada da consulta
+        Identifica a intenção do usuário e qual agente deve responder
         
         Args:
             user_query: Consulta do usuário
-            session_id: ID da sessão
+            session_id: ID da sessão para contexto
+            deadline: Prazo do estágio de roteamento (sem OpenAI quando está perto do fim)
             
         Returns:
-            Análise detalhada ou None se falhar
+            Dicionário com agente identificado e informações adicionais
         """
-        try:
-            # Contexto da conversa anterior se disponível
-            context = ""
-            if session_id and session_id in self.conversation_history:
-                recent_messages = self.conversation_history[session_id][-3:]  # Últimas 3 mensagens
-                context = "\n".join([f"- {msg}" for msg in recent_messages])
+        keyword_scores, local_analysis = self._local_intent(user_query)
+        if local_analysis and not local_analysis["escalate"]:
+            return local_analysis
+        
+        # Se OpenAI está disponível, usar análise avançada
+        if self._is_openai_available():
+            cache_key, cached = self._cached_routing(user_query, session_id)
+            if cached:
+                return cached
+            
+            if self._routing_llm_allowed(deadline, local_analysis):
+                try:
+                    start_time = time.time()
+                    timeout = deadline.remaining() if deadline is not None else None
+                    openai_analysis = self.routing_flight.do(
+                        cache_key, lambda: self._analyze_with_openai(user_query, session_id, timeout=timeout),
+                        timeout=timeout
+                    )
+                    if openai_analysis:
+                        self._remember_routing(user_query, cache_key, openai_analysis, start_time)
+                        return openai_analysis
+                except Exception as e:
+                    print(f"⚠️  Erro na análise OpenAI: {e}. Usando análise por palavras-chave.")
+        
+        # Sem OpenAI, a melhor estimativa local é mantida mesmo com margem pequena
+        return local_analysis or self._keyword_analysis(keyword_scores)
+
+    async def aidentify_intent_and_agent(self, user_query: str, session_id: str = None,
+                                         deadline: Deadline = None) -> Dict[str, Any]:
+        """
+        Versão assíncrona de identify_intent_and_agent (servidor ASGI)
+        
+        A etapa local roda no pool de threads e a chamada à OpenAI no cliente assíncrono.
+        """
+        keyword_scores, local_analysis = await asyncio.to_thread(self._local_intent, user_query)
+        if local_analysis and not local_analysis["escalate"]:
+            return local_analysis
+        
+        if self._is_openai_available():
+            cache_key, cached = await asyncio.to_thread(self._cached_routing, user_query, session_id)
+            if cached:
+                return cached
+            
+            if self._routing_llm_allowed(deadline, local_analysis):
+                try:
+                    start_time = time.time()
+                    timeout = deadline.remaining() if deadline is not None else None
+                    openai_analysis = await self.routing_flight.ado(
+                        cache_key, lambda: self._aanalyze_with_openai(user_query, session_id, timeout=timeout),
+                        timeout=timeout
+                    )
+                    if openai_analysis:
+                        self._remember_routing(user_query, cache_key, openai_analysis, start_time)
+                        return openai_analysis
+                except Exception as e:
+                    print(f"⚠️  Erro na análise OpenAI: {e}. Usando análise por palavras-chave.")
+        
+        return local_analysis or self._keyword_analysis(keyword_scores)
+
+    def _get_recent_context(self, session_id: str = None) -> str:
+        """Retorna as últimas mensagens da sessão usadas como contexto do roteamento"""
+        if session_id:
+            recent_messages = self.conversation_history.recent(session_id, 3)  # Últimas 3 mensagens
+            return "\n".join([f"- {msg}" for msg in recent_messages])
+        return ""
+
+    def _routing_cache_key(self, user_query: str, session_id: str = None) -> str:
+        """
+        Gera a chave do cache de roteamento
+        
+        Args:
+            user_query: Consulta do usuário
+            session_id: ID da sessão
             
-            # Prompt para análise
-            system_prompt = f"""Você é um orquestrador inteligente para uma loja de materiais de construção.
+        Returns:
+            Consulta normalizada + impressão digital curta do contexto
+        """
+        context = self._get_recent_context(session_id)
+        fingerprint = hashlib.sha1(context.encode('utf-8')).hexdigest()[:12] if context else "none"
+        return f"{normalize_text(user_query)}|{fingerprint}"
+
+    def _routing_messages(self, user_query: str, session_id: str = None) -> List[Dict[str, str]]:
+        """Monta as mensagens do prompt de roteamento"""
+        # Contexto da conversa anterior se disponível
+        context = self._get_recent_context(session_id)
+        
+        # Prompt para análise
+        system_prompt = f"""Você é um orquestrador inteligente para uma loja de materiais de construção.
 Sua função é analisar consultas de clientes e determinar qual especialista deve responder.
 
 AGENTES DISPONÍVEIS:
@@ -169,65 +382,85 @@ FORMATO DE RESPOSTA (JSON):
     "additional_context": {{}}
 }}"""
 
-            user_prompt = f"""CONSULTA DO CLIENTE: "{user_query}"
+        user_prompt = f"""CONSULTA DO CLIENTE: "{user_query}"
 
 CONTEXTO DA CONVERSA ANTERIOR:
 {context if context else "Nenhum contexto anterior"}
 
 Analise esta consulta e determine qual agente especialista deve responder."""
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
 
+    def _parse_routing_content(self, content: str) -> Optional[Dict[str, Any]]:
+        """Extrai a análise JSON da resposta da OpenAI"""
+        try:
+            # Procurar por JSON na resposta
+            json_match = re.search(r'\{.*\}', content.strip(), re.DOTALL)
+            if json_match:
+                analysis = json.loads(json_match.group())
+                analysis["analysis_method"] = "openai_gpt"
+                return analysis
+        except json.JSONDecodeError:
+            print("⚠️  Erro ao parsear resposta JSON da OpenAI")
+        
+        return None
+
+    def _analyze_with_openai(self, user_query: str, session_id: str = None,
+                             timeout: float = None) -> Optional[Dict[str, Any]]:
+        """
+        Usa OpenAI para análise avançada da consulta
+        
+        Args:
+            user_query: Consulta do usuário
+            session_id: ID da sessão
+            timeout: Prazo da chamada em segundos (padrão do gateway se None)
+            
+        Returns:
+            Análise detalhada ou None se falhar
+        """
+        try:
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=self._routing_messages(user_query, session_id),
                 temperature=0.3,
-                max_tokens=500
+                max_tokens=500,
+                **({"timeout": timeout} if timeout is not None else {})
             )
+            return self._parse_routing_content(response.choices[0].message.content)
             
-            # Extrair resposta
-            content = response.choices[0].message.content.strip()
-            
-            # Tentar parsear JSON
-            try:
-                # Procurar por JSON na resposta
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    analysis = json.loads(json_match.group())
-                    analysis["analysis_method"] = "openai_gpt"
-                    return analysis
-            except json.JSONDecodeError:
-                print("⚠️  Erro ao parsear resposta JSON da OpenAI")
-            
+        except Exception as e:
+            print(f"⚠️  Erro na análise OpenAI: {e}")
             return None
+
+    async def _aanalyze_with_openai(self, user_query: str, session_id: str = None,
+                                    timeout: float = None) -> Optional[Dict[str, Any]]:
+        """Versão assíncrona de _analyze_with_openai"""
+        try:
+            messages = await asyncio.to_thread(self._routing_messages, user_query, session_id)
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.3,
+                max_tokens=500,
+                **({"timeout": timeout} if timeout is not None else {})
+            )
+            return self._parse_routing_content(response.choices[0].message.content)
             
         except Exception as e:
             print(f"⚠️  Erro na análise OpenAI: {e}")
             return None
 
-    def route_query(self, user_query: str, session_id: str = None) -> Dict[str, Any]:
-        """
-        Roteia a consulta para o agente apropriado
-        
-        Args:
-            user_query: Consulta do usuário
-            session_id: ID da sessão
-            
-        Returns:
-            Resultado do roteamento com resposta do agente
-        """
-        # Identificar agente
-        analysis = self.identify_intent_and_agent(user_query, session_id)
-        
+    def _build_routing_result(self, user_query: str, session_id: str, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Registra a consulta no histórico e monta o resultado do roteamento"""
         # Salvar no histórico
         if session_id:
-            if session_id not in self.conversation_history:
-                self.conversation_history[session_id] = []
-            self.conversation_history[session_id].append(f"User: {user_query}")
+            self.conversation_history.append(session_id, f"User: {user_query}")
         
         # Preparar resposta de roteamento
-        routing_result = {
+        return {
             "user_query": user_query,
             "session_id": session_id,
             "routing_analysis": analysis,
@@ -239,8 +472,26 @@ Analise esta consulta e determine qual agente especialista deve responder."""
                 "should_forward": analysis["confidence"] > 0.5
             }
         }
+
+    def route_query(self, user_query: str, session_id: str = None, deadline: Deadline = None) -> Dict[str, Any]:
+        """
+        Roteia a consulta para o agente apropriado
         
-        return routing_result
+        Args:
+            user_query: Consulta do usuário
+            session_id: ID da sessão
+            deadline: Prazo do estágio de roteamento
+            
+        Returns:
+            Resultado do roteamento com resposta do agente
+        """
+        analysis = self.identify_intent_and_agent(user_query, session_id, deadline)
+        return self._build_routing_result(user_query, session_id, analysis)
+
+    async def aroute_query(self, user_query: str, session_id: str = None, deadline: Deadline = None) -> Dict[str, Any]:
+        """Versão assíncrona de route_query (servidor ASGI)"""
+        analysis = await self.aidentify_intent_and_agent(user_query, session_id, deadline)
+        return await asyncio.to_thread(self._build_routing_result, user_query, session_id, analysis)
 
     def _generate_routing_response(self, analysis: Dict[str, Any]) -> str:
         """
@@ -273,9 +524,113 @@ Analise esta consulta e determine qual agente especialista deve responder."""
         Returns:
             Resposta coordenada de múltiplos agentes
         """
-        # Por enquanto, implementação simples
-        # Em versões futuras, pode coordenar respostas de múltiplos agentes
-        return self.route_query(user_query, session_id)
+        routing_result = self.route_query(user_query, session_id)
+        analysis = routing_result["routing_analysis"]
+        
+        agents = [analysis["selected_agent"]]
+        if analysis.get("requires_multiple_agents"):
+            agents = self.select_agents(analysis)
+        
+        routing_result["multi_agent"] = self.fan_out(user_query, session_id, agents)
+        return routing_result
+
+    def select_agents(self, analysis: Dict[str, Any]) -> List[str]:
+        """
+        Seleciona os agentes de uma consulta mista (o escolhido primeiro)
+        
+        Args:
+            analysis: Análise do roteamento
+            
+        Returns:
+            Lista de agentes com handler registrado
+        """
+        scores = analysis.get("all_scores") or {}
+        ranked = [agent for agent, score in sorted(scores.items(), key=lambda x: x[1], reverse=True) if score > 0]
+        agents = [analysis["selected_agent"]] + [agent for agent in ranked if agent != analysis["selected_agent"]]
+        
+        if len(agents) < 2:
+            agents += [agent for agent in self.agent_handlers if agent not in agents]
+        
+        return [agent for agent in agents if agent in self.agent_handlers]
+
+    def fan_out(self, user_query: str, session_id: str = None, agents: List[str] = None,
+                prefetched_results: Dict[str, List[Dict]] = None, timeout: float = None) -> Dict[str, Any]:
+        """
+        Consulta os pipelines dos agentes em paralelo e combina as respostas
+        
+        Args:
+            user_query: Consulta do usuário
+            session_id: ID da sessão
+            agents: Agentes a consultar (padrão: todos com handler)
+            prefetched_results: Resultados de busca já obtidos por agente (recuperação especulativa)
+            timeout: Limite total em segundos (prazo da requisição), além do prazo de cada agente
+            
+        Returns:
+            Resposta combinada, resultados por agente e agentes que expiraram/falharam
+        """
+        agents = [agent for agent in (agents or list(self.agent_handlers)) if agent in self.agent_handlers]
+        prefetched_results = prefetched_results or {}
+        start_time = time.time()
+        
+        futures = {
+            agent: self.fanout_executor.submit(
+                self.agent_handlers[agent], user_query, session_id,
+                **({"search_results": prefetched_results[agent]} if prefetched_results.get(agent) is not None else {})
+            )
+            for agent in agents
+        }
+        
+        results, timed_out, errors = {}, [], {}
+        for agent, future in futures.items():
+            # Todos começaram juntos: cada agente espera só o que resta do seu prazo
+            deadline = start_time + self.agent_timeouts.get(agent, self.default_agent_timeout)
+            if timeout is not None:
+                deadline = min(deadline, start_time + timeout)
+            try:
+                results[agent] = future.result(timeout=max(deadline - time.time(), 0))
+            except FuturesTimeoutError:
+                future.cancel()
+                timed_out.append(agent)
+            except Exception as e:
+                errors[agent] = str(e)
+        
+        merged_response = self._merge_agent_responses(results)
+        merged_results = []
+        for agent, result in results.items():
+            for search_result in result.get("search_results", []):
+                merged_results.append({**search_result, "agent": agent})
+        
+        return {
+            "agents": agents,
+            "response": merged_response,
+            "search_results": merged_results,
+            "responses": {agent: result.get("response", "") for agent, result in results.items()},
+            "timed_out": timed_out,
+            "errors": errors,
+            "partial": bool(timed_out or errors),
+            "elapsed_ms": round((time.time() - start_time) * 1000, 1)
+        }
+
+    def _merge_agent_responses(self, results: Dict[str, Dict[str, Any]]) -> str:
+        """
+        Combina as respostas dos agentes em um único texto
+        
+        Args:
+            results: Resultados por agente
+            
+        Returns:
+            Resposta combinada
+        """
+        if not results:
+            return "Não foi possível obter resposta dos especialistas no momento."
+        if len(results) == 1:
+            return next(iter(results.values())).get("response", "")
+        
+        sections = []
+        for agent, result in results.items():
+            agent_name = self.available_agents.get(agent, {}).get("name", agent)
+            sections.append(f"**{agent_name}**\n{result.get('response', '')}")
+        return "\n\n".join(sections)
 
     def get_agent_capabilities(self) -> Dict[str, Any]:
         """
@@ -307,11 +662,7 @@ Analise esta consulta e determine qual agente especialista deve responder."""
         Args:
             session_id: ID da sessão específica ou None para limpar tudo
         """
-        if session_id:
-            if session_id in self.conversation_history:
-                del self.conversation_history[session_id]
-        else:
-            self.conversation_history.clear()
+        self.conversation_history.clear(session_id)
 
     def get_conversation_stats(self) -> Dict[str, Any]:
         """
@@ -320,14 +671,14 @@ Analise esta consulta e determine qual agente especialista deve responder."""
         Returns:
             Estatísticas das conversas
         """
-        total_sessions = len(self.conversation_history)
-        total_messages = sum(len(messages) for messages in self.conversation_history.values())
-        
         return {
-            "total_sessions": total_sessions,
-            "total_messages": total_messages,
-            "active_sessions": list(self.conversation_history.keys()),
-            "average_messages_per_session": total_messages / total_sessions if total_sessions > 0 else 0
+            **self.conversation_history.get_statistics(),
+            "routing_cache": {
+                **self.routing_cache.get_statistics(),
+                "latency_saved_ms": round(self.routing_latency_saved_ms, 1)
+            },
+            "local_router": self.local_router.get_statistics(),
+            "routing_flight": self.routing_flight.get_statistics()
         }
 
 # Instância global do orquestrador
@@ -10,9 +10,7 @@ import shutil
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 from werkzeug.utils import secure_filename
-import PyPDF2
-from pdfminer.high_level import extract_text
-import spacy
+from lazy_subsystems import subsystems
 import re
 
 class PDFUploadProcessor:
@@ -37,6 +35,7 @@ class PDFUploadProcessor:
         
         # Carregar modelo spaCy para português
         try:
+            import spacy  # Import pesado: só quando o processador é criado
             self.nlp = spacy.load("pt_core_news_sm")
         except OSError:
             print("⚠️  Modelo spaCy não encontrado. Funcionalidade de PLN limitada.")
@@ -111,6 +110,7 @@ class PDFUploadProcessor:
         """
         try:
             # Tentar com pdfminer primeiro (melhor qualidade)
+            from pdfminer.high_level import extract_text
             text = extract_text(file_path)
             if text and len(text.strip()) > 100:
                 return text
@@ -119,6 +119,7 @@ class PDFUploadProcessor:
         
         try:
             # Fallback para PyPDF2
+            import PyPDF2
             text = ""
             with open(file_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
@@ -464,5 +465,5 @@ class PDFUploadProcessor:
                 total_size += os.path.getsize(file_path)
         return round(total_size / (1024 * 1024), 2)
 
-# Instância global do processador
-pdf_processor = PDFUploadProcessor()
+# Instância global do processador (spaCy carregado no primeiro uso ou no aquecimento)
+pdf_processor = subsystems.register("pdf_processor", PDFUploadProcessor)
@@ -8,6 +8,36 @@ import json
 import re
 from typing import Dict, List, Any, Optional
 from datetime import datetime
+from keyword_matcher import KeywordMatcher
+
+# Mapeamento de palavras-chave para tipos de piso
+FLOOR_TYPE_KEYWORDS = {
+    "ceramico": ["cerâmic", "azulejo", "revestimento cerâmic"],
+    "porcelanato": ["porcelanat", "porcelain"],
+    "laminado": ["laminad", "madeira laminad", "piso de madeira"],
+    "vinilico": ["vinílic", "pvc", "vinyl"],
+    "madeira": ["madeira maciça", "taco", "parquet", "assoalho"],
+    "pedra": ["mármore", "granito", "pedra", "travertino", "ardósia"],
+    "cimento": ["cimento queimad", "concreto", "industrial"]
+}
+
+# Mapeamento de palavras-chave para ambientes
+ENVIRONMENT_KEYWORDS = {
+    "cozinha": ["cozinha", "área gourmet"],
+    "banheiro": ["banheiro", "lavabo", "box"],
+    "sala": ["sala", "living", "estar"],
+    "quarto": ["quarto", "dormitório", "suíte"],
+    "area_externa": ["área externa", "varanda", "terraço", "quintal", "piscina"],
+    "comercial": ["loja", "escritório", "comercial", "empresa"],
+    "industrial": ["indústria", "fábrica", "galpão"]
+}
+
+# Intenções da consulta usadas na resposta
+QUERY_INTENT_KEYWORDS = {
+    "problema": ["problema", "trinca", "mancha", "escorrega"],
+    "calculo": ["calcul", "quantidade", "material"],
+    "instalacao": ["instala", "como instalar", "aplicar"]
+}
 
 class PisosAgent:
     def __init__(self, knowledge_base_path: str = None):
@@ -30,6 +60,11 @@ class PisosAgent:
             "especificacoes_tecnicas"
         ]
         
+        # Matchers compilados uma vez para identificação de tipo e ambiente
+        self.floor_type_matcher = KeywordMatcher(FLOOR_TYPE_KEYWORDS)
+        self.environment_matcher = KeywordMatcher(ENVIRONMENT_KEYWORDS)
+        self.intent_matcher = KeywordMatcher(QUERY_INTENT_KEYWORDS)
+        
         # Base de conhecimento específica de pisos
         self.knowledge_base = self._load_knowledge_base(knowledge_base_path)
         
@@ -84,27 +119,7 @@ class PisosAgent:
         Returns:
             Lista de tipos de piso identificados
         """
-        query_lower = query.lower()
-        identified_types = []
-        
-        # Mapeamento de palavras-chave para tipos de piso
-        floor_keywords = {
-            "ceramico": ["cerâmic", "azulejo", "revestimento cerâmic"],
-            "porcelanato": ["porcelanat", "porcelain"],
-            "laminado": ["laminad", "madeira laminad", "piso de madeira"],
-            "vinilico": ["vinílic", "pvc", "vinyl"],
-            "madeira": ["madeira maciça", "taco", "parquet", "assoalho"],
-            "pedra": ["mármore", "granito", "pedra", "travertino", "ardósia"],
-            "cimento": ["cimento queimad", "concreto", "industrial"]
-        }
-        
-        for floor_type, keywords in floor_keywords.items():
-            for keyword in keywords:
-                if keyword in query_lower:
-                    identified_types.append(floor_type)
-                    break
-        
-        return list(set(identified_types))  # Remove duplicatas
+        return list(self.floor_type_matcher.labels(query))
 
     def identify_environment(self, query: str) -> List[str]:
         """
@@ -116,26 +131,7 @@ class PisosAgent:
         Returns:
             Lista de ambientes identificados
         """
-        query_lower = query.lower()
-        environments = []
-        
-        environment_keywords = {
-            "cozinha": ["cozinha", "área gourmet"],
-            "banheiro": ["banheiro", "lavabo", "box"],
-            "sala": ["sala", "living", "estar"],
-            "quarto": ["quarto", "dormitório", "suíte"],
-            "area_externa": ["área externa", "varanda", "terraço", "quintal", "piscina"],
-            "comercial": ["loja", "escritório", "comercial", "empresa"],
-            "industrial": ["indústria", "fábrica", "galpão"]
-        }
-        
-        for env_type, keywords in environment_keywords.items():
-            for keyword in keywords:
-                if keyword in query_lower:
-                    environments.append(env_type)
-                    break
-        
-        return list(set(environments))
+        return list(self.environment_matcher.labels(query))
 
     def get_technical_recommendation(self, floor_type: str, environment: str) -> Dict[str, Any]:
         """
@@ -343,7 +339,7 @@ class PisosAgent:
         Returns:
             Resposta formatada do especialista
         """
-        query_lower = user_query.lower()
+        intents = self.intent_matcher.labels(user_query)
         
         # Identificar contexto da consulta
         floor_types = self.identify_floor_type(user_query)
@@ -370,7 +366,7 @@ class PisosAgent:
                             response += f"e resistência ao escorregamento **{tech_rec['slip_resistance']}**. "
         
         # Consultas sobre problemas
-        elif any(word in query_lower for word in ["problema", "trinca", "mancha", "escorrega"]):
+        elif "problema" in intents:
             diagnosis = self.diagnose_problem(user_query)
             if diagnosis["problema_identificado"]:
                 response += f"Identifiquei o problema: **{diagnosis['problema_identificado']}**.\n\n"
@@ -382,7 +378,7 @@ class PisosAgent:
                     response += f"• {solucao}\n"
         
         # Consultas sobre cálculo
-        elif any(word in query_lower for word in ["calcul", "quantidade", "material"]):
+        elif "calculo" in intents:
             response += "Para calcular a quantidade correta de material, preciso saber:\n\n"
             response += "📐 **Área total a ser revestida (m²)**\n"
             response += "🏠 **Tipo de ambiente** (sala, cozinha, banheiro, etc.)\n"
@@ -392,7 +388,7 @@ class PisosAgent:
             response += "incluindo o fator de perda adequado para cada tipo de material."
         
         # Consultas sobre instalação
-        elif any(word in query_lower for word in ["instala", "como instalar", "aplicar"]):
+        elif "instalacao" in intents:
             response += "A instalação adequada é fundamental para a durabilidade do piso. "
             response += "Os principais passos incluem:\n\n"
             response += "1️⃣ **Preparação do contrapiso** - nivelamento e limpeza\n"
@@ -5,10 +5,37 @@ Especializado em encontrar informações relevantes sobre pisos, revestimentos e
 
 import json
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 from typing import List, Dict, Any, Optional
 import re
+import threading
+from knn_graph import KNNGraph, get_item_id, normalize_rows
+from knowledge_deduplicator import knowledge_deduplicator
+from facet_counter import FacetCounter
+from single_flight import SingleFlight
+from lazy_subsystems import subsystems
+
+# Filtros estruturados: nome do filtro -> (coluna inferior, coluna superior)
+# Atributos com faixa (ex.: "R$ 15-30/m²") passam no filtro quando a faixa intersecta o intervalo pedido
+ATTRIBUTE_FILTERS = {
+    "pei_class": ("pei_class", "pei_class"),
+    "slip_resistance": ("slip_resistance", "slip_resistance"),
+    "water_absorption": ("water_absorption_min", "water_absorption_max"),
+    "price": ("price_min", "price_max"),
+    "size": ("size_max_cm", "size_max_cm")
+}
+
+ATTRIBUTE_COLUMNS = [
+    "pei_class", "slip_resistance",
+    "water_absorption_min", "water_absorption_max",
+    "price_min", "price_max",
+    "size_min_cm", "size_max_cm"
+]
+
+# Números em formato brasileiro: "1.200,50" (milhar com ponto), "0,5" ou "19.7"
+NUMBER_PATTERN = r'\d{1,3}(?:\.\d{3})+(?:,\d+)?|\d+(?:[.,]\d+)?'
+
+# Fator de conversão das unidades de formato para centímetros
+SIZE_UNITS_CM = {"mm": 0.1, "cm": 1.0, "m": 100.0}
 
 class PisosSemanticSearch:
     def __init__(self, knowledge_base_path: str = None):
@@ -20,12 +47,27 @@ class PisosSemanticSearch:
         """
         print("🔍 Inicializando sistema de busca semântica para pisos...")
         
-        # Carregar modelo de embeddings
+        # Carregar modelo de embeddings (importa o torch: só ao criar o sistema)
+        from sentence_transformers import SentenceTransformer
         self.model = SentenceTransformer('sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
+        self.encode_flight = SingleFlight("encode_pisos")  # Consultas idênticas simultâneas
         
         # Base de conhecimento específica de pisos
         self.knowledge_base = []
+        self.item_ids = []
+        self._index_by_id = {}
         self.embeddings = None
+        self._unit_cache = (None, None)  # (embeddings de origem, versão normalizada)
+        self._index_lock = threading.RLock()  # Protege o índice entre buscas e atualizações incrementais
+        
+        # Grafo de produtos parecidos (atualizado junto com os embeddings)
+        self.knn_graph = KNNGraph(k=10)
+        
+        # Contagens por marca, tipo e ambiente (mantidas incrementalmente)
+        self.facets = FacetCounter({"brand": "brand", "type": "type", "environment": "use_case"})
+        
+        # Colunas numéricas dos atributos técnicos (alinhadas com knowledge_base)
+        self.attribute_columns = {name: np.empty(0) for name in ATTRIBUTE_COLUMNS}
         
         # Carregar base de conhecimento
         if knowledge_base_path:
@@ -33,6 +75,11 @@ class PisosSemanticSearch:
         else:
             self._create_default_knowledge_base()
         
+        # Remover duplicatas antes de indexar
+        self.knowledge_base, self.dedup_report = knowledge_deduplicator.deduplicate(
+            self.knowledge_base, encode_fn=self.model.encode, source=knowledge_base_path or "pisos_default"
+        )
+        
         # Gerar embeddings
         self._generate_embeddings()
         
@@ -192,29 +239,202 @@ class PisosSemanticSearch:
             }
         ]
 
+    def _build_text(self, item: Dict[str, Any]) -> str:
+        """Cria texto para embedding combinando campos relevantes do item"""
+        text_parts = [
+            item.get('product_name', ''),
+            item.get('brand', ''),
+            item.get('type', ''),
+            item.get('description', ''),
+            ' '.join(item.get('features', [])),
+            ' '.join(item.get('use_case', []))
+        ]
+        return ' '.join(filter(None, text_parts))
+
     def _generate_embeddings(self):
         """Gera embeddings para todos os itens da base de conhecimento"""
+        with self._index_lock:
+            self._rebuild_index()
+
+    def _rebuild_index(self):
+        """Reconstrói embeddings, colunas numéricas, IDs e grafo (chamar com o lock)"""
+        self.facets.rebuild(self.knowledge_base)
+        
         if not self.knowledge_base:
             return
         
         # Criar textos para embedding combinando campos relevantes
-        texts = []
-        for item in self.knowledge_base:
-            text_parts = [
-                item.get('product_name', ''),
-                item.get('brand', ''),
-                item.get('type', ''),
-                item.get('description', ''),
-                ' '.join(item.get('features', [])),
-                ' '.join(item.get('use_case', []))
-            ]
-            text = ' '.join(filter(None, text_parts))
-            texts.append(text)
+        texts = [self._build_text(item) for item in self.knowledge_base]
         
         # Gerar embeddings
         self.embeddings = self.model.encode(texts)
+        
+        # Converter atributos técnicos em colunas numéricas
+        self._build_attribute_columns()
+        
+        # Reconstruir grafo de produtos parecidos
+        self.item_ids = []
+        self._index_by_id = {}
+        for idx, item in enumerate(self.knowledge_base):
+            item_id = self._unique_id(get_item_id(item))
+            self.item_ids.append(item_id)
+            self._index_by_id[item_id] = idx
+        
+        self.knn_graph.build(self.item_ids, self.embeddings)
+
+    def _unique_id(self, item_id: str) -> str:
+        """ID ainda não indexado: IDs repetidos recebem o sufixo da posição ("id_12")"""
+        if item_id not in self._index_by_id:
+            return item_id
+        
+        position = len(self.item_ids)
+        while f"{item_id}_{position}" in self._index_by_id:
+            position += 1
+        return f"{item_id}_{position}"
+
+    @staticmethod
+    def _parse_number(text: str) -> float:
+        """Converte número em formato brasileiro ("0,5", "1.200,00") para float"""
+        if re.fullmatch(r'\d{1,3}(?:\.\d{3})+(?:,\d+)?', text):
+            text = text.replace('.', '')
+        return float(text.replace(',', '.'))
+
+    def _parse_numbers(self, text: str) -> List[float]:
+        """Extrai todos os números de um texto livre"""
+        return [self._parse_number(n) for n in re.findall(NUMBER_PATTERN, text)]
+
+    def _parse_range(self, value: Any) -> tuple:
+        """
+        Extrai faixa numérica de textos como "10-20%", "<0.5%" ou "R$ 15-30/m²"
+        
+        Returns:
+            Tupla (mínimo, máximo) ou (nan, nan) se não houver número
+        """
+        if isinstance(value, (int, float)):
+            return float(value), float(value)
+        
+        text = str(value or '')
+        numbers = self._parse_numbers(text)
+        if not numbers:
+            return np.nan, np.nan
+        
+        if '<' in text:
+            return 0.0, numbers[0]
+        if '>' in text:
+            return numbers[0], np.inf
+        return min(numbers[:2]), max(numbers[:2])
+
+    def _parse_attributes(self, item: Dict[str, Any]) -> Dict[str, float]:
+        """
+        Converte atributos técnicos em texto livre para valores numéricos
+        
+        Args:
+            item: Item da base de conhecimento
+            
+        Returns:
+            Dicionário com um valor por coluna (nan quando não informado)
+        """
+        attributes = {name: np.nan for name in ATTRIBUTE_COLUMNS}
+        
+        # PEI: 4, "4" ou "PEI 4"
+        pei_match = re.search(r'\d', str(item.get('pei_class', '')))
+        if pei_match:
+            attributes["pei_class"] = float(pei_match.group())
+        
+        # Resistência ao escorregamento: "R10"
+        slip_match = re.search(r'\d+', str(item.get('slip_resistance', '')))
+        if slip_match:
+            attributes["slip_resistance"] = float(slip_match.group())
+        
+        # Absorção de água: "10-20%", "<0.5%", "Impermeável"
+        water = item.get('water_absorption', '')
+        if 'impermeável' in str(water).lower():
+            attributes["water_absorption_min"], attributes["water_absorption_max"] = 0.0, 0.0
+        else:
+            attributes["water_absorption_min"], attributes["water_absorption_max"] = self._parse_range(water)
+        
+        # Preço: "R$ 15-30/m²" (ignorar o "2" de m²)
+        price = re.sub(r'm[²2]', '', str(item.get('price_range', '')))
+        attributes["price_min"], attributes["price_max"] = self._parse_range(price)
+        
+        # Formato: "45x45cm", "7x10x100cm", "1,20x2,40m" (considerar os dois maiores lados, em cm)
+        size = str(item.get('size', '')).lower()
+        unit_match = re.search(r'\d\s*(mm|cm|m)\b', size)
+        factor = SIZE_UNITS_CM[unit_match.group(1)] if unit_match else 1.0
+        sides = sorted(value * factor for value in self._parse_numbers(size))[-2:]
+        if sides:
+            attributes["size_min_cm"], attributes["size_max_cm"] = sides[0], sides[-1]
+        
+        return attributes
+
+    def _build_attribute_columns(self):
+        """Constrói as colunas numéricas a partir da base de conhecimento (uma vez no carregamento)"""
+        parsed = [self._parse_attributes(item) for item in self.knowledge_base]
+        self.attribute_columns = {
+            name: np.array([attributes[name] for attributes in parsed], dtype=np.float64)
+            for name in ATTRIBUTE_COLUMNS
+        }
+
+    def filter_mask(self, filters: Dict[str, Any]) -> np.ndarray:
+        """
+        Avalia filtros estruturados como máscara vetorizada
+        
+        Args:
+            filters: Ex.: {"pei_class": {"min": 4}, "slip_resistance": {"min": "R10"}, "price": {"max": 60}}
+            
+        Returns:
+            Máscara booleana alinhada com a base de conhecimento
+            
+        Raises:
+            ValueError: Filtro desconhecido, filtros fora do formato ou limite sem número
+        """
+        if not isinstance(filters or {}, dict):
+            raise ValueError("Filtros devem ser um objeto: {\"nome\": {\"min\": ..., \"max\": ...}}")
+        
+        mask = np.ones(len(self.knowledge_base), dtype=bool)
+        
+        for name, bounds in (filters or {}).items():
+            if name not in ATTRIBUTE_FILTERS:
+                raise ValueError(f"Filtro desconhecido: {name}. Disponíveis: {', '.join(ATTRIBUTE_FILTERS)}")
+            if not isinstance(bounds, dict):
+                bounds = {"min": bounds, "max": bounds}
+            
+            low_column, high_column = ATTRIBUTE_FILTERS[name]
+            low_values = self.attribute_columns[low_column]
+            high_values = self.attribute_columns[high_column]
+            
+            # Comparações com nan resultam em False: itens sem o atributo são excluídos
+            if bounds.get("min") is not None:
+                minimum, _ = self._parse_bound(name, bounds["min"])
+                mask &= high_values >= minimum
+            if bounds.get("max") is not None:
+                _, maximum = self._parse_bound(name, bounds["max"])
+                mask &= low_values <= maximum
+        
+        return mask
+
+    def _parse_bound(self, name: str, value: Any) -> tuple:
+        """Faixa de um limite de filtro; limites sem número são erro (e não uma máscara vazia)"""
+        minimum, maximum = self._parse_range(value)
+        if np.isnan(minimum) or np.isnan(maximum):
+            raise ValueError(f"Limite inválido para o filtro {name}: {value!r}")
+        return minimum, maximum
+
+    def encode_query(self, query: str) -> np.ndarray:
+        """Gera o embedding de uma consulta (consultas idênticas simultâneas compartilham o cálculo)"""
+        return self.encode_flight.do(query, lambda: self.model.encode([query])[0])
+
+    def _unit_embeddings(self) -> np.ndarray:
+        """Embeddings normalizados; recalculados só quando self.embeddings é substituído"""
+        source, unit = self._unit_cache
+        if source is not self.embeddings:
+            unit = normalize_rows(self.embeddings)
+            self._unit_cache = (self.embeddings, unit)
+        return unit
 
-    def search(self, query: str, top_k: int = 5, similarity_threshold: float = 0.3) -> List[Dict[str, Any]]:
+    def search(self, query: str, top_k: int = 5, similarity_threshold: float = 0.3,
+               filters: Optional[Dict[str, Any]] = None,
+               query_embedding: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
         """
         Busca semântica na base de conhecimento de pisos
         
@@ -222,33 +442,44 @@ class PisosSemanticSearch:
             query: Consulta do usuário
             top_k: Número máximo de resultados
             similarity_threshold: Limiar mínimo de similaridade
+            filters: Filtros estruturados por faixa (ver filter_mask)
+            query_embedding: Embedding já calculado (ex.: misturado com o contexto da sessão)
             
         Returns:
             Lista de resultados ordenados por relevância
         """
-        if not self.embeddings.size:
+        if self.embeddings is None or not self.embeddings.size:
             return []
         
         # Gerar embedding da consulta
-        query_embedding = self.model.encode([query])
-        
-        # Calcular similaridades
-        similarities = cosine_similarity(query_embedding, self.embeddings)[0]
-        
-        # Encontrar índices dos resultados mais similares
-        similar_indices = np.argsort(similarities)[::-1]
+        if query_embedding is None:
+            query_embedding = self.model.encode([query])
+        else:
+            query_embedding = np.asarray(query_embedding).reshape(1, -1)
         
-        results = []
-        for idx in similar_indices[:top_k]:
-            similarity_score = similarities[idx]
+        # Embeddings, colunas e itens lidos sob o lock: sempre da mesma versão do índice
+        with self._index_lock:
+            # Similaridade de cosseno: produto interno entre vetores normalizados
+            similarities = self._unit_embeddings() @ normalize_rows(query_embedding)[0]
             
-            if similarity_score >= similarity_threshold:
-                result = {
-                    'document': self.knowledge_base[idx],
-                    'similarity_score': float(similarity_score),
-                    'index': int(idx)
-                }
-                results.append(result)
+            # Excluir itens que não atendem aos filtros estruturados
+            if filters:
+                similarities = np.where(self.filter_mask(filters), similarities, -np.inf)
+            
+            # Encontrar índices dos resultados mais similares
+            similar_indices = np.argsort(similarities)[::-1]
+            
+            results = []
+            for idx in similar_indices[:top_k]:
+                similarity_score = similarities[idx]
+                
+                if similarity_score >= similarity_threshold:
+                    result = {
+                        'document': self.knowledge_base[idx],
+                        'similarity_score': float(similarity_score),
+                        'index': int(idx)
+                    }
+                    results.append(result)
         
         return results
 
@@ -315,11 +546,114 @@ class PisosSemanticSearch:
         """
         Adiciona novo item à base de conhecimento
         
+        IDs já indexados recebem sufixo, como no carregamento; para substituir
+        um item, remova-o antes.
+        
         Args:
             item: Dicionário com informações do produto/conhecimento
+            
+        Returns:
+            ID com que o item foi indexado
+        """
+        # Codificar apenas o novo item (fora do lock: é a parte lenta)
+        embedding = self.model.encode([self._build_text(item)])
+        attributes = self._parse_attributes(item)
+        
+        with self._index_lock:
+            if self.embeddings is None or not len(self.knowledge_base):
+                self.knowledge_base.append(item)
+                self._rebuild_index()
+                return self.item_ids[-1]
+            
+            # Atualizar índice, colunas e grafo incrementalmente
+            item_id = self._unique_id(get_item_id(item))
+            
+            self.knowledge_base.append(item)
+            self.facets.add(item)
+            self.embeddings = np.vstack([self.embeddings, embedding])
+            self.item_ids.append(item_id)
+            self._index_by_id[item_id] = len(self.knowledge_base) - 1
+            self.knn_graph.add(item_id, embedding[0])
+            
+            for name in ATTRIBUTE_COLUMNS:
+                self.attribute_columns[name] = np.append(self.attribute_columns[name], attributes[name])
+        return item_id
+
+    def update_knowledge_item(self, item: Dict[str, Any], updated: Dict[str, Any]) -> Optional[str]:
         """
-        self.knowledge_base.append(item)
-        self._generate_embeddings()  # Regenerar embeddings
+        Substitui um item já indexado (ex.: após mesclar uma duplicata)
+        
+        Embedding, grafo, facetas e colunas numéricas são atualizados junto.
+        
+        Args:
+            item: Item indexado (o próprio objeto da base de conhecimento)
+            updated: Nova versão do item
+            
+        Returns:
+            ID com que o item foi reindexado ou None se não estiver indexado
+        """
+        with self._index_lock:
+            idx = next((i for i, indexed in enumerate(self.knowledge_base) if indexed is item), None)
+            if idx is None:
+                return None
+            
+            self.remove_knowledge_item(self.item_ids[idx])
+            return self.add_knowledge_item(updated)
+
+    def remove_knowledge_item(self, item_id: str) -> bool:
+        """
+        Remove um item da base de conhecimento
+        
+        Args:
+            item_id: ID do item
+            
+        Returns:
+            True se removido, False se não encontrado
+        """
+        with self._index_lock:
+            idx = self._index_by_id.get(item_id)
+            if idx is None:
+                return False
+            
+            self.facets.remove(self.knowledge_base[idx])
+            del self.knowledge_base[idx]
+            del self.item_ids[idx]
+            self.embeddings = np.delete(self.embeddings, idx, axis=0)
+            self._index_by_id = {other_id: i for i, other_id in enumerate(self.item_ids)}
+            
+            self.knn_graph.remove(item_id)
+            
+            for name in ATTRIBUTE_COLUMNS:
+                self.attribute_columns[name] = np.delete(self.attribute_columns[name], idx)
+            return True
+
+    def get_similar_products(self, item_id: str, top_k: int = 5) -> Optional[List[Dict[str, Any]]]:
+        """
+        Retorna produtos parecidos a partir do grafo kNN pré-calculado (O(k))
+        
+        Args:
+            item_id: ID do produto de referência
+            top_k: Número máximo de produtos parecidos
+            
+        Returns:
+            Lista de produtos parecidos ou None se o produto não existir
+        """
+        with self._index_lock:
+            if item_id not in self._index_by_id:
+                return None
+            
+            results = []
+            for neighbor in self.knn_graph.neighbors(item_id, top_k):
+                idx = self._index_by_id.get(neighbor['id'])
+                if idx is None:
+                    continue
+                results.append({
+                    'document': self.knowledge_base[idx],
+                    'similarity_score': neighbor['similarity_score'],
+                    'index': idx
+                })
+            
+            return results
 
     def update_knowledge_base(self, new_knowledge_base: List[Dict[str, Any]]):
         """
@@ -328,8 +662,21 @@ class PisosSemanticSearch:
         Args:
             new_knowledge_base: Nova base de conhecimento
         """
-        self.knowledge_base = new_knowledge_base
-        self._generate_embeddings()
+        with self._index_lock:
+            self.knowledge_base = new_knowledge_base
+            self._rebuild_index()
+
+    def facets_for_results(self, results: List[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+        """
+        Conta marcas e tipos dentro do conjunto de resultados
+        
+        Args:
+            results: Resultados da busca
+            
+        Returns:
+            Contagens por marca e tipo
+        """
+        return self.facets.count_results(results, ["brand", "type"])
 
     def get_statistics(self) -> Dict[str, Any]:
         """
@@ -341,23 +688,15 @@ class PisosSemanticSearch:
         if not self.knowledge_base:
             return {"total_items": 0}
         
-        # Contar por tipo
-        type_counts = {}
-        brand_counts = {}
-        
-        for item in self.knowledge_base:
-            item_type = item.get('type', 'Não especificado')
-            brand = item.get('brand', 'Não especificado')
-            
-            type_counts[item_type] = type_counts.get(item_type, 0) + 1
-            brand_counts[brand] = brand_counts.get(brand, 0) + 1
-        
+        # Contagens mantidas incrementalmente (O(facetas))
         return {
             "total_items": len(self.knowledge_base),
-            "types": type_counts,
-            "brands": brand_counts,
-            "has_embeddings": self.embeddings is not None
+            "types": self.facets.counts("type"),
+            "brands": self.facets.counts("brand"),
+            "environments": self.facets.counts("environment"),
+            "has_embeddings": self.embeddings is not None,
+            "knn_graph": self.knn_graph.get_statistics()
         }
 
-# Instância global do sistema de busca
-pisos_search_system = PisosSemanticSearch()
+# Instância global do sistema de busca (carrega o modelo no primeiro uso ou no aquecimento)
+pisos_search_system = subsystems.register("pisos_search", PisosSemanticSearch)
@@ -0,0 +1,85 @@
+"""
+Limitador de Taxa (Token Bucket)
+Controla a vazão de chamadas a serviços externos, permitindo rajadas curtas
+até a capacidade do balde.
+"""
+
+import time
+import asyncio
+import threading
+from typing import Optional
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        Inicializa o balde de tokens
+
+        Args:
+            rate: Tokens repostos por segundo
+            capacity: Máximo de tokens acumulados (padrão: rate)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """
+        Tenta consumir tokens sem bloquear
+
+        Args:
+            tokens: Quantidade de tokens
+
+        Returns:
+            0 se consumiu, senão segundos até haver tokens suficientes
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate if self.rate > 0 else float('inf')
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """
+        Consome tokens, aguardando a reposição se necessário
+
+        Args:
+            tokens: Quantidade de tokens (limitada à capacidade)
+            timeout: Espera máxima em segundos (None = sem limite)
+
+        Returns:
+            True se consumiu, False se o prazo expirou
+        """
+        tokens = min(tokens, self.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait > remaining:
+                    return False
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """Versão de acquire que aguarda sem bloquear o event loop"""
+        tokens = min(tokens, self.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait > remaining:
+                    return False
+            await asyncio.sleep(wait)
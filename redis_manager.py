@@ -1,17 +1,91 @@
-'''
-import redis
+import os
 import json
+from typing import Any, Optional
+
+try:
+    import redis
+except ImportError:
+    redis = None
 
 class RedisManager:
-    def __init__(self, host='localhost', port=6379, db=0):
-        self.client = redis.Redis(host=host, port=port, db=db)
+    def __init__(self):
+        # Configuração do Redis (definir REDIS_URL como variável de ambiente)
+        self.redis_url = os.getenv('REDIS_URL', '')
+
+        if not self.redis_url:
+            print("⚠️  REDIS_URL não encontrada. Caches compartilhados desativados.")
+            self.client = None
+        elif redis is None:
+            print("⚠️  Pacote redis não instalado. Caches compartilhados desativados.")
+            self.client = None
+        else:
+            try:
+                self.client = redis.Redis.from_url(self.redis_url, socket_timeout=0.5)
+                self.client.ping()
+                print("✅ Conectado ao Redis com sucesso!")
+            except Exception as e:
+                print(f"❌ Erro ao conectar com Redis: {e}")
+                self.client = None
+
+    def is_connected(self) -> bool:
+        """Verifica se está conectado ao Redis"""
+        return self.client is not None
+
+    def get_json(self, key: str) -> Optional[Any]:
+        """Lê um valor JSON do Redis"""
+        if not self.client:
+            return None
+
+        try:
+            value = self.client.get(key)
+            return json.loads(value) if value else None
+        except Exception as e:
+            print(f"⚠️  Erro ao ler chave {key} do Redis: {e}")
+            return None
+
+    def set_json(self, key: str, value: Any, expiration_seconds: int = 3600) -> bool:
+        """Grava um valor JSON no Redis com expiração"""
+        if not self.client:
+            return False
+
+        try:
+            self.client.setex(key, expiration_seconds, json.dumps(value, ensure_ascii=False))
+            return True
+        except Exception as e:
+            print(f"⚠️  Erro ao gravar chave {key} no Redis: {e}")
+            return False
+
+    def delete(self, key: str) -> bool:
+        """Remove uma chave do Redis"""
+        if not self.client:
+            return False
+
+        try:
+            self.client.delete(key)
+            return True
+        except Exception as e:
+            print(f"⚠️  Erro ao remover chave {key} do Redis: {e}")
+            return False
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Remove todas as chaves com um prefixo"""
+        if not self.client:
+            return 0
+
+        try:
+            keys = list(self.client.scan_iter(match=f"{prefix}*"))
+            if keys:
+                self.client.delete(*keys)
+            return len(keys)
+        except Exception as e:
+            print(f"⚠️  Erro ao remover chaves {prefix}* do Redis: {e}")
+            return 0
 
     def set_conversation_context(self, session_id, context, expiration_seconds=3600):
-        self.client.setex(f"conversation:{session_id}", expiration_seconds, json.dumps(context))
+        self.set_json(f"conversation:{session_id}", context, expiration_seconds)
 
     def get_conversation_context(self, session_id):
-        context = self.client.get(f"conversation:{session_id}")
-        return json.loads(context) if context else None
+        return self.get_json(f"conversation:{session_id}")
 
+# Instância global do gerenciador Redis
 redis_manager = RedisManager()
-'''
@@ -0,0 +1,174 @@
+"""
+Agregados Incrementais de Revisões
+Mantém um buffer circular das revisões recentes e estatísticas ponderadas
+(contagem, média, variância, aprovação e séries diárias) atualizadas a cada revisão,
+para que os relatórios de qualidade sejam servidos em O(1) com memória constante.
+"""
+
+import threading
+from collections import deque, OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Any
+
+
+class WeightedStats:
+    """Média e variância ponderadas pelo algoritmo incremental de Welford"""
+
+    __slots__ = ("count", "weight", "mean", "m2", "approved_weight")
+
+    def __init__(self):
+        self.count = 0
+        self.weight = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.approved_weight = 0.0
+
+    def add(self, value: float, weight: float = 1.0, approved: bool = None):
+        self.count += 1
+        self.weight += weight
+        delta = value - self.mean
+        self.mean += delta * weight / self.weight
+        self.m2 += weight * delta * (value - self.mean)
+        if approved:
+            self.approved_weight += weight
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / self.weight if self.weight > 0 else 0.0
+
+    @property
+    def approval_rate(self) -> float:
+        return self.approved_weight / self.weight if self.weight > 0 else 0.0
+
+    def to_dict(self, with_approval: bool = True) -> Dict[str, Any]:
+        data = {
+            "count": self.count,
+            "estimated_responses": round(self.weight, 1),
+            "mean": round(self.mean, 3),
+            "variance": round(self.variance, 4)
+        }
+        if with_approval:
+            data["approval_rate"] = round(self.approval_rate, 3)
+        return data
+
+
+class ReviewAggregates:
+    def __init__(self, ring_size: int = 1000, max_days: int = 90):
+        """
+        Inicializa os agregados
+
+        Args:
+            ring_size: Número de revisões brutas mantidas no buffer circular
+            max_days: Número de dias mantidos na série diária de cada agente
+        """
+        self.ring_size = ring_size
+        self.max_days = max_days
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Zera buffer e agregados"""
+        self.recent = deque(maxlen=self.ring_size)
+        self.overall = WeightedStats()
+        self.agents: Dict[str, Dict[str, Any]] = {}
+
+    def _agent(self, agent_type: str) -> Dict[str, Any]:
+        if agent_type not in self.agents:
+            self.agents[agent_type] = {
+                "overall": WeightedStats(),
+                "criteria": {},
+                "daily": OrderedDict()  # data ISO -> WeightedStats
+            }
+        return self.agents[agent_type]
+
+    def add(self, review: Dict[str, Any]):
+        """
+        Incorpora uma revisão em O(critérios)
+
+        Args:
+            review: Dicionário com timestamp, agent_type, overall_score, approved,
+                    weight e quality_scores
+        """
+        weight = review.get("weight", 1.0)
+        score = review["overall_score"]
+        approved = review["approved"]
+        day = review["timestamp"][:10]
+
+        with self._lock:
+            self.recent.append(review)
+            self.overall.add(score, weight, approved)
+
+            agent = self._agent(review["agent_type"])
+            agent["overall"].add(score, weight, approved)
+
+            for criterion, value in (review.get("quality_scores") or {}).items():
+                if isinstance(value, (int, float)):
+                    agent["criteria"].setdefault(criterion, WeightedStats()).add(value, weight)
+
+            daily = agent["daily"]
+            if day not in daily:
+                daily[day] = WeightedStats()
+                while len(daily) > self.max_days:
+                    daily.popitem(last=False)
+            daily[day].add(score, weight, approved)
+
+    def __len__(self) -> int:
+        return self.overall.count
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Relatório consolidado a partir dos agregados
+
+        Returns:
+            Estatísticas gerais e por agente/critério
+        """
+        with self._lock:
+            return {
+                "overall": self.overall.to_dict(),
+                "agents": {
+                    agent_type: {
+                        "overall": agent["overall"].to_dict(),
+                        "criteria": {
+                            criterion: stats.to_dict(with_approval=False)
+                            for criterion, stats in agent["criteria"].items()
+                        }
+                    }
+                    for agent_type, agent in self.agents.items()
+                }
+            }
+
+    def period_summary(self, agent_type: str, days: int) -> WeightedStats:
+        """
+        Combina os buckets diários de um agente nos últimos N dias (O(dias))
+
+        Args:
+            agent_type: Tipo do agente
+            days: Período em dias
+
+        Returns:
+            Estatísticas combinadas do período
+        """
+        cutoff = (datetime.now() - timedelta(days=days)).date().isoformat()
+        combined = WeightedStats()
+
+        with self._lock:
+            daily = self.agents.get(agent_type, {}).get("daily", {})
+            for day, stats in daily.items():
+                if day < cutoff or stats.weight == 0:
+                    continue
+                # Combinação de médias/variâncias ponderadas (fórmula paralela)
+                total = combined.weight + stats.weight
+                delta = stats.mean - combined.mean
+                combined.m2 += stats.m2 + delta * delta * combined.weight * stats.weight / total
+                combined.mean += delta * stats.weight / total
+                combined.weight = total
+                combined.count += stats.count
+                combined.approved_weight += stats.approved_weight
+
+        return combined
+
+    def daily_series(self, agent_type: str) -> List[Dict[str, Any]]:
+        """Série diária de score médio e aprovação de um agente"""
+        with self._lock:
+            daily = self.agents.get(agent_type, {}).get("daily", {})
+            return [{"date": day, **stats.to_dict()} for day, stats in daily.items()]
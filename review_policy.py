@@ -0,0 +1,149 @@
+"""
+Política de Amostragem de Revisões
+Decide, por resposta, se a revisão deve ser síncrona, assíncrona ou dispensada,
+com base no risco estimado. Revisões amostradas carregam o peso 1/p (inverso da
+probabilidade de seleção) para que os relatórios de qualidade continuem não enviesados.
+"""
+
+import os
+import random
+import threading
+from typing import Dict, List, Any, Optional
+
+
+class ReviewPolicy:
+    def __init__(self,
+                 sync_risk_threshold: float = 0.6,
+                 min_sample_rate: float = None,
+                 ewma_alpha: float = 0.1,
+                 default_quality: float = 0.75):
+        """
+        Inicializa a política
+
+        Args:
+            sync_risk_threshold: Risco a partir do qual a revisão é síncrona
+            min_sample_rate: Probabilidade mínima de revisar respostas de baixo risco
+            ewma_alpha: Fator de suavização da qualidade móvel por agente
+            default_quality: Qualidade assumida para agentes sem histórico
+        """
+        self.sync_risk_threshold = sync_risk_threshold
+        self.min_sample_rate = min_sample_rate if min_sample_rate is not None else float(os.getenv('REVIEW_MIN_SAMPLE_RATE', '0.1'))
+        self.ewma_alpha = ewma_alpha
+        self.default_quality = default_quality
+
+        # Pesos dos componentes de risco
+        self.risk_weights = {
+            "routing": 0.3,
+            "retrieval": 0.3,
+            "length": 0.1,
+            "agent_quality": 0.3
+        }
+
+        self.agent_quality: Dict[str, float] = {}
+        self.decisions = {"sync": 0, "async": 0, "skip": 0}
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+    def _length_risk(self, response: str) -> float:
+        """Respostas muito curtas ou muito longas tendem a ter mais problemas"""
+        length = len(response or "")
+        if length < 80:
+            return 1.0
+        if length > 2000:
+            return 0.7
+        return 0.2
+
+    def assess_risk(self,
+                    agent_type: str,
+                    response: str,
+                    routing_confidence: Optional[float] = None,
+                    search_results: List[Dict] = None) -> Dict[str, float]:
+        """
+        Estima o risco da resposta por componente
+
+        Args:
+            agent_type: Tipo do agente
+            response: Resposta do agente
+            routing_confidence: Confiança do roteamento (0-1)
+            search_results: Resultados da busca usados na resposta
+
+        Returns:
+            Dicionário componente -> risco (0-1) e o risco total ponderado
+        """
+        top_similarity = max(
+            (result.get("similarity_score", 0) for result in (search_results or [])),
+            default=0.0
+        )
+
+        components = {
+            "routing": 1.0 - (routing_confidence if routing_confidence is not None else 0.5),
+            "retrieval": 1.0 - min(max(top_similarity, 0.0), 1.0),
+            "length": self._length_risk(response),
+            "agent_quality": 1.0 - self.agent_quality.get(agent_type, self.default_quality)
+        }
+        components = {name: min(max(value, 0.0), 1.0) for name, value in components.items()}
+        components["total"] = sum(components[name] * weight for name, weight in self.risk_weights.items())
+        return components
+
+    def decide(self,
+               agent_type: str,
+               response: str,
+               routing_confidence: Optional[float] = None,
+               search_results: List[Dict] = None) -> Dict[str, Any]:
+        """
+        Decide como (e se) a resposta será revisada
+
+        Args:
+            agent_type: Tipo do agente
+            response: Resposta do agente
+            routing_confidence: Confiança do roteamento (0-1)
+            search_results: Resultados da busca usados na resposta
+
+        Returns:
+            Decisão com ação (sync/async/skip), probabilidade, peso amostral e riscos
+        """
+        risk = self.assess_risk(agent_type, response, routing_confidence, search_results)
+
+        if risk["total"] >= self.sync_risk_threshold:
+            action, probability = "sync", 1.0
+        else:
+            probability = max(self.min_sample_rate, min(risk["total"] / self.sync_risk_threshold, 1.0))
+            action = "async" if self._random.random() < probability else "skip"
+
+        with self._lock:
+            self.decisions[action] += 1
+
+        return {
+            "action": action,
+            "probability": round(probability, 4),
+            "sampling_weight": 1.0 / probability,
+            "risk": {name: round(value, 3) for name, value in risk.items()}
+        }
+
+    def record_outcome(self, agent_type: str, overall_score: float):
+        """
+        Atualiza a qualidade móvel (EWMA) do agente com o resultado de uma revisão
+
+        Args:
+            agent_type: Tipo do agente
+            overall_score: Score geral da revisão
+        """
+        with self._lock:
+            current = self.agent_quality.get(agent_type, self.default_quality)
+            self.agent_quality[agent_type] = (1 - self.ewma_alpha) * current + self.ewma_alpha * overall_score
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Retorna estatísticas da política
+
+        Returns:
+            Dicionário com estatísticas
+        """
+        total = sum(self.decisions.values())
+        return {
+            "decisions": dict(self.decisions),
+            "review_rate": (self.decisions["sync"] + self.decisions["async"]) / total if total > 0 else 0,
+            "agent_quality": {agent: round(score, 3) for agent, score in self.agent_quality.items()},
+            "sync_risk_threshold": self.sync_risk_threshold,
+            "min_sample_rate": self.min_sample_rate
+        }
@@ -7,10 +7,29 @@ garantindo qualidade, precisão e consistência das informações fornecidas.
 import os
 import json
 import re
-from typing import Dict, List, Any, Optional, Tuple
+import uuid
+import time
+import copy
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Any, Optional, Tuple, Callable
 from datetime import datetime
-import openai
-from openai import OpenAI
+from llm_gateway import llm_gateway
+from rate_limiter import TokenBucket
+from ttl_cache import TTLCache
+from redis_manager import redis_manager
+from prompt_manager import prompt_manager
+from knowledge_deduplicator import normalize_text
+from review_policy import ReviewPolicy
+from local_quality_scorer import LocalQualityScorer
+from review_aggregates import ReviewAggregates
+from single_flight import SingleFlight
+
+# Versão do prompt de revisão embutido; altere ao modificar os prompts deste módulo
+REVIEW_PROMPT_VERSION = "1"
 
 class ReviewerAgent:
     def __init__(self):
@@ -19,6 +38,7 @@ class ReviewerAgent:
         """
         self.agent_type = "revisor"
         self.client = None
+        self.async_client = None
         self.model = "gpt-3.5-turbo"  # Modelo padrão
         
         # Configurar cliente OpenAI
@@ -53,14 +73,41 @@ class ReviewerAgent:
             }
         }
         
-        # Histórico de revisões para análise de padrões
-        self.review_history = []
+        # Histórico de revisões: buffer circular + agregados incrementais para relatórios O(1)
+        self.review_history = ReviewAggregates(ring_size=1000, max_days=90)
+        
+        # Avaliador local (milissegundos); a OpenAI só recebe os casos escalados
+        self.local_scorer = LocalQualityScorer()
+        self.local_first = os.getenv('REVIEW_LOCAL_FIRST', 'true').lower() == 'true'
+        
+        # Política de amostragem por risco (sync/async/skip)
+        self.review_policy = ReviewPolicy()
+        
+        # Cache de revisões por conteúdo (respostas templadas se repetem muito)
+        self.review_cache = TTLCache(max_size=4096, ttl_seconds=24 * 3600, namespace="review", backend=redis_manager)
+        self.review_flight = SingleFlight("review")
+        
+        # Revisões assíncronas: pool em segundo plano e resultados limitados por review_id
+        self.review_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('REVIEW_WORKERS', '4')), thread_name_prefix="reviewer"
+        )
+        self.async_reviews: OrderedDict = OrderedDict()
+        self.max_async_reviews = 1000
+        self._async_lock = threading.Lock()
+        self._review_events: Dict[str, threading.Event] = {}
+        
+        # Revisão em lote: paralelismo limitado, limite de chamadas/s e prazo por item
+        self.batch_concurrency = int(os.getenv('REVIEW_BATCH_CONCURRENCY', '8'))
+        self.batch_item_timeout = float(os.getenv('REVIEW_ITEM_TIMEOUT_SECONDS', '30'))
+        self.review_rate_limiter = TokenBucket(rate=float(os.getenv('REVIEW_REQUESTS_PER_SECOND', '5')), capacity=10)
+        self.pack_max_chars = 400  # Respostas curtas agrupadas em uma chamada
+        self.pack_size = 5
 
     def _setup_openai_client(self):
-        """Configura o cliente OpenAI"""
-        api_key = os.getenv('OPENAI_API_KEY')
-        if api_key:
-            self.client = OpenAI(api_key=api_key)
+        """Configura o cliente OpenAI (via gateway compartilhado)"""
+        self.client = llm_gateway.client_for("reviewer")
+        self.async_client = llm_gateway.async_client_for("reviewer")
+        if self.client:
             print("✅ Cliente OpenAI configurado para Revisor")
         else:
             print("⚠️  OPENAI_API_KEY não encontrada. Revisor funcionará em modo limitado.")
@@ -69,11 +116,51 @@ class ReviewerAgent:
         """Verifica se a OpenAI está disponível"""
         return self.client is not None
 
+    def _prepare_review(self,
+                        user_query: str,
+                        agent_response: str,
+                        agent_type: str,
+                        search_results: List[Dict] = None,
+                        sampling_weight: float = 1.0) -> Tuple[Dict[str, Any], Dict[str, Any], bool]:
+        """Resultado base e avaliação local (CPU); indica se a revisão deve escalar para a OpenAI"""
+        review_result = self._new_review_result(user_query, agent_response, agent_type)
+        review_result["sampling_weight"] = sampling_weight
+        
+        # Avaliação local primeiro; só escala para a OpenAI em casos incertos ou suspeitos
+        local_review = self._local_review_analysis(user_query, agent_response, agent_type, search_results)
+        escalate = local_review.pop("escalate", True) or not self.local_first
+        return review_result, local_review, escalate
+
+    def _use_cached_review(self, review_result: Dict[str, Any], cached: Dict[str, Any], record: bool = True) -> Dict[str, Any]:
+        review_result.update(copy.deepcopy(cached))
+        review_result["cache_hit"] = True
+        if record:
+            self._record_review(review_result)
+        return review_result
+
+    def _apply_openai_review(self, review_result: Dict[str, Any], cache_key: str, openai_review: Optional[Dict[str, Any]]):
+        if openai_review:
+            review_result.update(openai_review)
+            review_result["review_method"] = "openai_analysis"
+            self.review_cache.set(cache_key, openai_review)
+
+    def _finish_review(self, review_result: Dict[str, Any], local_review: Dict[str, Any], record: bool = True) -> Dict[str, Any]:
+        # Análise local (fallback e caminho principal)
+        if review_result["review_method"] == "basic_analysis":
+            review_result.update(local_review)
+        
+        if record:
+            self._record_review(review_result)
+        return review_result
+
     def review_response(self, 
                        user_query: str, 
                        agent_response: str, 
                        agent_type: str,
-                       search_results: List[Dict] = None) -> Dict[str, Any]:
+                       search_results: List[Dict] = None,
+                       sampling_weight: float = 1.0,
+                       timeout: float = None,
+                       record: bool = True) -> Dict[str, Any]:
         """
         Revisa a resposta de um agente especialista
         
@@ -82,11 +169,143 @@ class ReviewerAgent:
             agent_response: Resposta do agente especialista
             agent_type: Tipo do agente (tintas, pisos, etc.)
             search_results: Resultados da busca semântica (opcional)
+            sampling_weight: Inverso da probabilidade de a resposta ter sido amostrada
+            timeout: Prazo em segundos para a revisão via OpenAI (None = padrão do gateway)
+            record: Registrar a revisão no histórico (False: quem chama registra com _record_review)
             
         Returns:
             Análise detalhada da revisão
         """
-        review_result = {
+        review_result, local_review, escalate = self._prepare_review(
+            user_query, agent_response, agent_type, search_results, sampling_weight
+        )
+        
+        # Se OpenAI está disponível, usar análise avançada
+        if self._is_openai_available() and escalate:
+            cache_key = self._review_cache_key(user_query, agent_response, agent_type, search_results)
+            cached = self.review_cache.get(cache_key)
+            if cached:
+                return self._use_cached_review(review_result, cached, record)
+            
+            try:
+                # Revisões idênticas simultâneas compartilham a mesma chamada
+                openai_review = self.review_flight.do(
+                    cache_key,
+                    lambda: self._review_with_openai(user_query, agent_response, agent_type, search_results, timeout),
+                    timeout=timeout
+                )
+                self._apply_openai_review(review_result, cache_key, openai_review)
+            except Exception as e:
+                print(f"⚠️  Erro na revisão OpenAI: {e}. Usando análise básica.")
+        
+        return self._finish_review(review_result, local_review, record)
+
+    async def areview_response(self,
+                               user_query: str,
+                               agent_response: str,
+                               agent_type: str,
+                               search_results: List[Dict] = None,
+                               sampling_weight: float = 1.0,
+                               timeout: float = None) -> Dict[str, Any]:
+        """
+        Versão assíncrona de review_response (servidor ASGI)
+        
+        A avaliação local roda no pool de threads e a chamada à OpenAI no cliente assíncrono.
+        """
+        review_result, local_review, escalate = await asyncio.to_thread(
+            self._prepare_review, user_query, agent_response, agent_type, search_results, sampling_weight
+        )
+        
+        if self._is_openai_available() and escalate:
+            cache_key = self._review_cache_key(user_query, agent_response, agent_type, search_results)
+            cached = await asyncio.to_thread(self.review_cache.get, cache_key)
+            if cached:
+                return self._use_cached_review(review_result, cached)
+            
+            try:
+                openai_review = await self.review_flight.ado(
+                    cache_key,
+                    lambda: self._areview_with_openai(user_query, agent_response, agent_type, search_results, timeout),
+                    timeout=timeout
+                )
+                await asyncio.to_thread(self._apply_openai_review, review_result, cache_key, openai_review)
+            except Exception as e:
+                print(f"⚠️  Erro na revisão OpenAI: {e}. Usando análise básica.")
+        
+        return self._finish_review(review_result, local_review)
+
+    def _local_review_analysis(self,
+                               user_query: str,
+                               agent_response: str,
+                               agent_type: str,
+                               search_results: List[Dict] = None) -> Dict[str, Any]:
+        """
+        Avaliação local com o LocalQualityScorer (heurísticas básicas se falhar)
+        
+        Args:
+            user_query: Pergunta do usuário
+            agent_response: Resposta do agente
+            agent_type: Tipo do agente
+            search_results: Resultados da busca
+            
+        Returns:
+            Avaliação no formato do revisor, com review_method e flag escalate
+        """
+        try:
+            local_review = self.local_scorer.score(
+                user_query, agent_response, agent_type, search_results, self.quality_criteria
+            )
+            local_review["review_method"] = "local_scorer"
+            return local_review
+        except Exception as e:
+            print(f"⚠️  Erro no avaliador local: {e}. Usando análise básica.")
+            basic_review = self._basic_review_analysis(user_query, agent_response, agent_type)
+            basic_review["escalate"] = True
+            return basic_review
+
+    def _prompt_fingerprint(self) -> str:
+        """Impressão digital dos prompts do revisor (versão embutida + prompts editáveis)"""
+        prompts = prompt_manager.get_all_prompts('revisor')
+        payload = json.dumps([REVIEW_PROMPT_VERSION, prompts], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+    @staticmethod
+    def _search_fingerprint(search_results: List[Dict] = None) -> List[List[str]]:
+        """Produtos da busca que entram no prompt de revisão (os 3 primeiros)"""
+        fingerprint = []
+        for result in (search_results or [])[:3]:
+            doc = result.get('document', {})
+            fingerprint.append([str(doc.get('product_name', 'N/A')), str(doc.get('brand', 'N/A'))])
+        return fingerprint
+
+    def _review_cache_key(self, user_query: str, agent_response: str, agent_type: str,
+                          search_results: List[Dict] = None) -> str:
+        """
+        Gera a chave do cache de revisões
+        
+        Args:
+            user_query: Pergunta do usuário
+            agent_response: Resposta do agente
+            agent_type: Tipo do agente
+            search_results: Resultados da busca (os produtos usados no prompt entram na chave)
+            
+        Returns:
+            Hash de (agente, consulta normalizada, resposta, produtos da busca, modelo, versão do prompt)
+        """
+        payload = json.dumps(
+            [agent_type, normalize_text(user_query), agent_response, self._search_fingerprint(search_results),
+             self.model, self._prompt_fingerprint()],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def invalidate_review_cache(self):
+        """Descarta todas as revisões em cache (ex.: após mudança nos prompts do revisor)"""
+        self.review_cache.invalidate()
+
+    def _new_review_result(self, user_query: str, agent_response: str, agent_type: str) -> Dict[str, Any]:
+        """Cria a estrutura padrão de resultado de revisão"""
+        return {
             "user_query": user_query,
             "agent_response": agent_response,
             "agent_type": agent_type,
@@ -98,60 +317,151 @@ class ReviewerAgent:
             "approved": True,
             "improved_response": None
         }
-        
-        # Se OpenAI está disponível, usar análise avançada
-        if self._is_openai_available():
-            try:
-                openai_review = self._review_with_openai(user_query, agent_response, agent_type, search_results)
-                if openai_review:
-                    review_result.update(openai_review)
-                    review_result["review_method"] = "openai_analysis"
-            except Exception as e:
-                print(f"⚠️  Erro na revisão OpenAI: {e}. Usando análise básica.")
-        
-        # Análise básica (fallback)
-        if review_result["review_method"] == "basic_analysis":
-            basic_review = self._basic_review_analysis(user_query, agent_response, agent_type)
-            review_result.update(basic_review)
-        
-        # Salvar no histórico
-        self.review_history.append({
+
+    def _record_review(self, review_result: Dict[str, Any]):
+        """Salva a revisão no histórico e alimenta a qualidade móvel do agente"""
+        self.review_history.add({
             "timestamp": review_result["timestamp"],
-            "agent_type": agent_type,
+            "agent_type": review_result["agent_type"],
             "overall_score": review_result["overall_score"],
-            "approved": review_result["approved"]
+            "approved": review_result["approved"],
+            "weight": review_result.get("sampling_weight", 1.0),
+            "quality_scores": review_result.get("quality_scores", {})
         })
-        
-        return review_result
+        self.review_policy.record_outcome(review_result["agent_type"], review_result["overall_score"])
 
-    def _review_with_openai(self, 
-                           user_query: str, 
-                           agent_response: str, 
-                           agent_type: str,
-                           search_results: List[Dict] = None) -> Optional[Dict[str, Any]]:
+    def decide_review(self,
+                      agent_type: str,
+                      agent_response: str,
+                      routing_confidence: float = None,
+                      search_results: List[Dict] = None) -> Dict[str, Any]:
         """
-        Usa OpenAI para revisão avançada da resposta
+        Decide se a resposta deve ser revisada de forma síncrona, assíncrona ou dispensada
         
         Args:
-            user_query: Pergunta do usuário
+            agent_type: Tipo do agente
             agent_response: Resposta do agente
+            routing_confidence: Confiança do roteamento
+            search_results: Resultados da busca utilizados
+            
+        Returns:
+            Decisão da política (action, probability, sampling_weight, risk)
+        """
+        return self.review_policy.decide(agent_type, agent_response, routing_confidence, search_results)
+
+    def submit_review(self,
+                      user_query: str,
+                      agent_response: str,
+                      agent_type: str,
+                      search_results: List[Dict] = None,
+                      message_id: str = None,
+                      session_id: str = None,
+                      callback: Callable[[Dict[str, Any]], None] = None,
+                      sampling_weight: float = 1.0) -> str:
+        """
+        Agenda a revisão em segundo plano e retorna imediatamente
+        
+        Args:
+            user_query: Pergunta original do usuário
+            agent_response: Resposta já entregue ao usuário
             agent_type: Tipo do agente
-            search_results: Resultados da busca
+            search_results: Resultados da busca semântica (opcional)
+            message_id: ID da mensagem revisada
+            session_id: ID da sessão
+            callback: Função chamada com o registro da revisão ao concluir
+            sampling_weight: Inverso da probabilidade de a resposta ter sido amostrada
             
         Returns:
-            Análise detalhada ou None se falhar
+            ID da revisão para consulta posterior
         """
-        try:
-            # Contexto dos resultados de busca
-            search_context = ""
-            if search_results:
-                search_context = "\nRESULTADOS DA BUSCA UTILIZADOS:\n"
-                for i, result in enumerate(search_results[:3], 1):
-                    doc = result.get('document', {})
-                    search_context += f"{i}. {doc.get('product_name', 'N/A')} - {doc.get('brand', 'N/A')}\n"
+        review_id = str(uuid.uuid4())
+        record = {
+            "review_id": review_id,
+            "message_id": message_id,
+            "session_id": session_id,
+            "agent_type": agent_type,
+            "status": "pending",
+            "created_at": datetime.now().isoformat(),
+            "completed_at": None,
+            "review": None,
+            "error": None
+        }
+        
+        with self._async_lock:
+            self.async_reviews[review_id] = record
+            self._review_events[review_id] = threading.Event()
+            while len(self.async_reviews) > self.max_async_reviews:
+                old_id, _ = self.async_reviews.popitem(last=False)
+                self._review_events.pop(old_id, None)
+        
+        def run_review():
+            try:
+                record["review"] = self.review_response(
+                    user_query, agent_response, agent_type, search_results, sampling_weight
+                )
+                record["status"] = "completed"
+            except Exception as e:
+                record["error"] = str(e)
+                record["status"] = "failed"
+            record["completed_at"] = datetime.now().isoformat()
             
-            # Prompt para revisão
-            system_prompt = f"""Você é um revisor especialista em atendimento ao cliente para uma loja de materiais de construção.
+            event = self._review_events.get(review_id)
+            if event:
+                event.set()
+            
+            if callback:
+                try:
+                    callback(record)
+                except Exception as e:
+                    print(f"⚠️  Erro no callback da revisão {review_id}: {e}")
+        
+        self.review_executor.submit(run_review)
+        return review_id
+
+    def get_async_review(self, review_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retorna o estado de uma revisão assíncrona
+        
+        Args:
+            review_id: ID da revisão
+            
+        Returns:
+            Registro da revisão ou None se não encontrada
+        """
+        with self._async_lock:
+            record = self.async_reviews.get(review_id)
+            return dict(record) if record else None
+
+    def wait_for_review(self, review_id: str, timeout: float) -> bool:
+        """
+        Aguarda a conclusão de uma revisão assíncrona
+        
+        Args:
+            review_id: ID da revisão
+            timeout: Tempo máximo de espera em segundos
+            
+        Returns:
+            True se concluída dentro do prazo
+        """
+        event = self._review_events.get(review_id)
+        return event.wait(timeout) if event else False
+
+    def _review_messages(self,
+                         user_query: str,
+                         agent_response: str,
+                         agent_type: str,
+                         search_results: List[Dict] = None) -> List[Dict[str, str]]:
+        """Monta as mensagens do prompt de revisão"""
+        # Contexto dos resultados de busca
+        search_context = ""
+        if search_results:
+            search_context = "\nRESULTADOS DA BUSCA UTILIZADOS:\n"
+            for i, result in enumerate(search_results[:3], 1):
+                doc = result.get('document', {})
+                search_context += f"{i}. {doc.get('product_name', 'N/A')} - {doc.get('brand', 'N/A')}\n"
+        
+        # Prompt para revisão
+        system_prompt = f"""Você é um revisor especialista em atendimento ao cliente para uma loja de materiais de construção.
 Sua função é revisar respostas de agentes especialistas e garantir qualidade, precisão e utilidade.
 
 CRITÉRIOS DE AVALIAÇÃO (0.0 a 1.0):
@@ -186,37 +496,83 @@ FORMATO DE RESPOSTA (JSON):
     "improved_response": "versão melhorada (se necessário)"
 }}"""
 
-            user_prompt = f"""PERGUNTA DO CLIENTE: "{user_query}"
+        user_prompt = f"""PERGUNTA DO CLIENTE: "{user_query}"
 
 RESPOSTA DO AGENTE {agent_type.upper()}:
 {agent_response}
 {search_context}
 
 Revise esta resposta segundo os critérios estabelecidos."""
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def _parse_review_content(self, content: str) -> Optional[Dict[str, Any]]:
+        """Extrai a revisão JSON da resposta da OpenAI"""
+        try:
+            json_match = re.search(r'\{.*\}', content.strip(), re.DOTALL)
+            if json_match:
+                return json.loads(json_match.group())
+        except json.JSONDecodeError:
+            print("⚠️  Erro ao parsear resposta JSON da OpenAI (Revisor)")
+        
+        return None
 
+    def _review_with_openai(self, 
+                           user_query: str, 
+                           agent_response: str, 
+                           agent_type: str,
+                           search_results: List[Dict] = None,
+                           timeout: float = None) -> Optional[Dict[str, Any]]:
+        """
+        Usa OpenAI para revisão avançada da resposta
+        
+        Args:
+            user_query: Pergunta do usuário
+            agent_response: Resposta do agente
+            agent_type: Tipo do agente
+            search_results: Resultados da busca
+            timeout: Prazo da chamada em segundos (padrão do gateway se None)
+            
+        Returns:
+            Análise detalhada ou None se falhar
+        """
+        try:
+            if not self.review_rate_limiter.acquire(timeout=timeout):
+                return None
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=self._review_messages(user_query, agent_response, agent_type, search_results),
                 temperature=0.2,
-                max_tokens=1000
+                max_tokens=1000,
+                **({"timeout": timeout} if timeout is not None else {})
             )
+            return self._parse_review_content(response.choices[0].message.content)
             
-            # Extrair resposta
-            content = response.choices[0].message.content.strip()
-            
-            # Tentar parsear JSON
-            try:
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    review_data = json.loads(json_match.group())
-                    return review_data
-            except json.JSONDecodeError:
-                print("⚠️  Erro ao parsear resposta JSON da OpenAI (Revisor)")
-            
+        except Exception as e:
+            print(f"⚠️  Erro na revisão OpenAI: {e}")
             return None
+
+    async def _areview_with_openai(self,
+                                   user_query: str,
+                                   agent_response: str,
+                                   agent_type: str,
+                                   search_results: List[Dict] = None,
+                                   timeout: float = None) -> Optional[Dict[str, Any]]:
+        """Versão assíncrona de _review_with_openai"""
+        try:
+            if not await self.review_rate_limiter.acquire_async(timeout=timeout):
+                return None
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=self._review_messages(user_query, agent_response, agent_type, search_results),
+                temperature=0.2,
+                max_tokens=1000,
+                **({"timeout": timeout} if timeout is not None else {})
+            )
+            return self._parse_review_content(response.choices[0].message.content)
             
         except Exception as e:
             print(f"⚠️  Erro na revisão OpenAI: {e}")
@@ -270,45 +626,280 @@ Revise esta resposta segundo os critérios estabelecidos."""
             "improved_response": None
         }
 
-    def batch_review(self, responses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def batch_review(self, responses: List[Dict[str, Any]], concurrency: int = None) -> Dict[str, Any]:
         """
         Revisa múltiplas respostas em lote
         
         Args:
             responses: Lista de dicionários com user_query, agent_response, agent_type
+            concurrency: Número máximo de revisões simultâneas
             
         Returns:
             Análise consolidada do lote
         """
-        batch_results = []
-        total_score = 0
-        approved_count = 0
+        reviews_by_index = {}
+        errors = []
         
-        for response_data in responses:
-            review = self.review_response(
-                response_data.get("user_query", ""),
-                response_data.get("agent_response", ""),
-                response_data.get("agent_type", "unknown"),
-                response_data.get("search_results", [])
-            )
-            
-            batch_results.append(review)
-            total_score += review["overall_score"]
-            if review["approved"]:
-                approved_count += 1
+        for item in self.iter_batch_review(responses, concurrency):
+            if "review" in item:
+                reviews_by_index[item["index"]] = item["review"]
+            else:
+                errors.append(item)
+        
+        batch_results = [reviews_by_index[i] for i in sorted(reviews_by_index)]
+        summary = self.summarize_reviews(batch_results)
+        summary["failed_count"] = len(errors)
         
         return {
             "batch_size": len(responses),
             "reviews": batch_results,
-            "summary": {
-                "average_score": round(total_score / len(responses), 2) if responses else 0,
-                "approval_rate": round(approved_count / len(responses), 2) if responses else 0,
-                "approved_count": approved_count,
-                "rejected_count": len(responses) - approved_count
-            },
+            "errors": errors,
+            "summary": summary,
             "timestamp": datetime.now().isoformat()
         }
 
+    def summarize_reviews(self, reviews: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Consolida score médio e aprovação de um conjunto de revisões
+        
+        Args:
+            reviews: Revisões concluídas
+            
+        Returns:
+            Resumo do lote
+        """
+        total_score = sum(review["overall_score"] for review in reviews)
+        approved_count = sum(1 for review in reviews if review["approved"])
+        
+        return {
+            "average_score": round(total_score / len(reviews), 2) if reviews else 0,
+            "approval_rate": round(approved_count / len(reviews), 2) if reviews else 0,
+            "approved_count": approved_count,
+            "rejected_count": len(reviews) - approved_count
+        }
+
+    def iter_batch_review(self, responses: List[Dict[str, Any]], concurrency: int = None):
+        """
+        Revisa um lote com paralelismo limitado, produzindo resultados à medida que concluem
+        
+        Respostas curtas são agrupadas em uma única chamada à OpenAI; as demais são
+        revisadas individualmente. Itens que excedem o prazo são reportados como erro
+        e não entram no histórico; a chamada à OpenAI recebe o mesmo prazo.
+        
+        Args:
+            responses: Lista de dicionários com user_query, agent_response, agent_type
+            concurrency: Número máximo de revisões simultâneas
+            
+        Yields:
+            {"index": i, "review": {...}} ou {"index": i, "error": "..."}
+        """
+        concurrency = max(1, min(concurrency or self.batch_concurrency, 32))
+        
+        # Montar tarefas: grupos de respostas curtas e itens individuais
+        tasks = []
+        pack = []
+        for index, item in enumerate(responses):
+            is_short = len(item.get("agent_response", "")) <= self.pack_max_chars
+            if self._is_openai_available() and is_short:
+                pack.append(index)
+                if len(pack) == self.pack_size:
+                    tasks.append(pack)
+                    pack = []
+            else:
+                tasks.append([index])
+        if pack:
+            tasks.append(pack)
+        
+        started_at: Dict[Any, float] = {}
+        
+        # Cada tarefa termina uma única vez: registrada pelo worker ou reportada como timeout
+        settled = set()
+        settled_lock = threading.Lock()
+        
+        def settle(key) -> bool:
+            with settled_lock:
+                if key in settled:
+                    return False
+                settled.add(key)
+                return True
+        
+        def run_task(indexes: List[int]) -> List[Tuple[int, Dict[str, Any]]]:
+            key = tuple(indexes)
+            started_at[key] = time.time()
+            if len(indexes) > 1:
+                results = self._review_pack(indexes, [responses[i] for i in indexes],
+                                            timeout=self.batch_item_timeout, record=False)
+            else:
+                item = responses[indexes[0]]
+                results = [(indexes[0], self.review_response(
+                    item.get("user_query", ""),
+                    item.get("agent_response", ""),
+                    item.get("agent_type", "unknown"),
+                    item.get("search_results", []),
+                    timeout=self.batch_item_timeout,
+                    record=False
+                ))]
+            
+            # Já reportada como timeout: descartar sem registrar
+            if not settle(key):
+                return []
+            for _, review in results:
+                self._record_review(review)
+            return results
+        
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-review")
+        try:
+            pending = {executor.submit(run_task, indexes): indexes for indexes in tasks}
+            
+            while pending:
+                done, _ = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    indexes = pending.pop(future)
+                    try:
+                        for index, review in future.result():
+                            yield {"index": index, "review": review}
+                    except Exception as e:
+                        for index in indexes:
+                            yield {"index": index, "error": str(e)}
+                
+                # Prazo contado a partir do início de cada tarefa (não da fila)
+                now = time.time()
+                for future, indexes in list(pending.items()):
+                    started = started_at.get(tuple(indexes))
+                    if started and now - started > self.batch_item_timeout and settle(tuple(indexes)):
+                        del pending[future]
+                        for index in indexes:
+                            yield {"index": index, "error": "timeout"}
+        finally:
+            # Cliente desconectado ou gerador fechado: não iniciar as tarefas da fila
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _review_pack(self, indexes: List[int], items: List[Dict[str, Any]],
+                     timeout: float = None, record: bool = True) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Revisa várias respostas curtas em uma única chamada à OpenAI
+        
+        Args:
+            indexes: Posições dos itens no lote
+            items: Itens com user_query, agent_response, agent_type
+            timeout: Prazo em segundos para o grupo (padrão: batch_item_timeout)
+            record: Registrar as revisões no histórico
+            
+        Returns:
+            Lista de (posição, revisão); itens sem avaliação usam análise básica
+        """
+        deadline = time.time() + (timeout if timeout is not None else self.batch_item_timeout)
+        local_reviews = [
+            self._local_review_analysis(
+                item.get("user_query", ""), item.get("agent_response", ""),
+                item.get("agent_type", "unknown"), item.get("search_results", [])
+            )
+            for item in items
+        ]
+        
+        # Apenas os itens escalados vão para a chamada agrupada
+        escalated = [
+            position for position, review in enumerate(local_reviews)
+            if review.pop("escalate", True) or not self.local_first
+        ]
+        pack_reviews = self._review_pack_with_openai(
+            [items[p] for p in escalated], timeout=max(0.0, deadline - time.time())
+        ) if escalated else None
+        pack_reviews = pack_reviews or {}
+        
+        results = []
+        for position, (index, item) in enumerate(zip(indexes, items)):
+            review_result = self._new_review_result(
+                item.get("user_query", ""), item.get("agent_response", ""), item.get("agent_type", "unknown")
+            )
+            pack_position = escalated.index(position) + 1 if position in escalated else None
+            if pack_position and pack_reviews.get(pack_position):
+                review_result.update(pack_reviews[pack_position])
+                review_result["review_method"] = "openai_batch_analysis"
+            else:
+                review_result.update(local_reviews[position])
+            if record:
+                self._record_review(review_result)
+            results.append((index, review_result))
+        
+        return results
+
+    def _review_pack_with_openai(self, items: List[Dict[str, Any]], timeout: float = None) -> Optional[Dict[int, Dict[str, Any]]]:
+        """
+        Envia um grupo de respostas curtas em um único prompt
+        
+        Args:
+            items: Itens com user_query, agent_response, agent_type
+            timeout: Prazo da chamada em segundos (padrão: batch_item_timeout)
+            
+        Returns:
+            Dicionário posição (1..n) -> avaliação, ou None se falhar
+        """
+        try:
+            criteria = "\n".join(
+                f"- {criterion} ({int(info['weight'] * 100)}%): {info['description']}"
+                for criterion, info in self.quality_criteria.items()
+            )
+            system_prompt = f"""Você é um revisor especialista em atendimento ao cliente para uma loja de materiais de construção.
+Revise CADA resposta numerada de forma independente.
+
+CRITÉRIOS DE AVALIAÇÃO (0.0 a 1.0):
+{criteria}
+
+Aprove respostas com score geral >= 0.7 e forneça versão melhorada apenas se necessário.
+
+FORMATO DE RESPOSTA (JSON):
+{{
+    "reviews": [
+        {{
+            "item": 1,
+            "quality_scores": {{"accuracy": 0.0-1.0, "completeness": 0.0-1.0, "clarity": 0.0-1.0, "helpfulness": 0.0-1.0, "professionalism": 0.0-1.0}},
+            "overall_score": 0.0-1.0,
+            "approved": true/false,
+            "suggestions": ["sugestão"],
+            "improved_response": "versão melhorada ou null"
+        }}
+    ]
+}}"""
+
+            user_prompt = "\n\n".join(
+                f"ITEM {i} (AGENTE {item.get('agent_type', 'unknown').upper()})\n"
+                f"PERGUNTA: \"{item.get('user_query', '')}\"\n"
+                f"RESPOSTA: {item.get('agent_response', '')}"
+                for i, item in enumerate(items, 1)
+            )
+
+            timeout = self.batch_item_timeout if timeout is None else timeout
+            if not self.review_rate_limiter.acquire(timeout=timeout):
+                return None
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=0.2,
+                max_tokens=400 * len(items),
+                timeout=timeout
+            )
+            
+            content = response.choices[0].message.content.strip()
+            json_match = re.search(r'\{.*\}', content, re.DOTALL)
+            if not json_match:
+                return None
+            
+            reviews = json.loads(json_match.group()).get("reviews", [])
+            return {
+                int(review.pop("item")): review
+                for review in reviews
+                if isinstance(review, dict) and str(review.get("item", "")).isdigit()
+            }
+            
+        except Exception as e:
+            print(f"⚠️  Erro na revisão em lote OpenAI: {e}")
+            return None
+
     def get_improvement_suggestions(self, agent_type: str, time_period_days: int = 30) -> Dict[str, Any]:
         """
         Analisa histórico e fornece sugestões de melhoria para um agente
@@ -320,16 +911,10 @@ Revise esta resposta segundo os critérios estabelecidos."""
         Returns:
             Sugestões de melhoria baseadas no histórico
         """
-        # Filtrar histórico por agente e período
-        cutoff_date = datetime.now().timestamp() - (time_period_days * 24 * 60 * 60)
-        
-        relevant_reviews = [
-            review for review in self.review_history
-            if (review.get("agent_type") == agent_type and 
-                datetime.fromisoformat(review["timestamp"]).timestamp() > cutoff_date)
-        ]
+        # Combinar os buckets diários do período (médias ponderadas pelo peso amostral 1/p)
+        period = self.review_history.period_summary(agent_type, time_period_days)
         
-        if not relevant_reviews:
+        if period.count == 0:
             return {
                 "agent_type": agent_type,
                 "period_days": time_period_days,
@@ -337,10 +922,9 @@ Revise esta resposta segundo os critérios estabelecidos."""
                 "suggestions": ["Não há dados suficientes para análise"]
             }
         
-        # Calcular estatísticas
-        total_reviews = len(relevant_reviews)
-        average_score = sum(r["overall_score"] for r in relevant_reviews) / total_reviews
-        approval_rate = sum(1 for r in relevant_reviews if r["approved"]) / total_reviews
+        total_reviews = period.count
+        average_score = period.mean
+        approval_rate = period.approval_rate
         
         # Gerar sugestões baseadas nas estatísticas
         suggestions = []
@@ -358,6 +942,8 @@ Revise esta resposta segundo os critérios estabelecidos."""
             "total_reviews": total_reviews,
             "average_score": round(average_score, 2),
             "approval_rate": round(approval_rate, 2),
+            "score_variance": round(period.variance, 4),
+            "daily_series": self.review_history.daily_series(agent_type)[-time_period_days:],
             "suggestions": suggestions,
             "timestamp": datetime.now().isoformat()
         }
@@ -369,39 +955,36 @@ Revise esta resposta segundo os critérios estabelecidos."""
         Returns:
             Relatório consolidado de qualidade
         """
-        if not self.review_history:
+        if not len(self.review_history):
             return {
                 "total_reviews": 0,
                 "message": "Nenhuma revisão realizada ainda"
             }
         
-        # Estatísticas gerais
-        total_reviews = len(self.review_history)
-        average_score = sum(r["overall_score"] for r in self.review_history) / total_reviews
-        approval_rate = sum(1 for r in self.review_history if r["approved"]) / total_reviews
-        
-        # Estatísticas por agente
-        agent_stats = {}
-        for review in self.review_history:
-            agent = review["agent_type"]
-            if agent not in agent_stats:
-                agent_stats[agent] = {"count": 0, "total_score": 0, "approved": 0}
-            
-            agent_stats[agent]["count"] += 1
-            agent_stats[agent]["total_score"] += review["overall_score"]
-            if review["approved"]:
-                agent_stats[agent]["approved"] += 1
+        # Estatísticas mantidas incrementalmente, ponderadas pelo peso amostral (1/p)
+        aggregates = self.review_history.report()
+        overall = aggregates["overall"]
         
-        # Calcular médias por agente
-        for agent, stats in agent_stats.items():
-            stats["average_score"] = round(stats["total_score"] / stats["count"], 2)
-            stats["approval_rate"] = round(stats["approved"] / stats["count"], 2)
+        agent_stats = {
+            agent: {
+                "count": stats["overall"]["count"],
+                "estimated_responses": stats["overall"]["estimated_responses"],
+                "average_score": round(stats["overall"]["mean"], 2),
+                "score_variance": stats["overall"]["variance"],
+                "approval_rate": round(stats["overall"]["approval_rate"], 2),
+                "criteria": stats["criteria"]
+            }
+            for agent, stats in aggregates["agents"].items()
+        }
         
         return {
-            "total_reviews": total_reviews,
-            "overall_average_score": round(average_score, 2),
-            "overall_approval_rate": round(approval_rate, 2),
+            "total_reviews": overall["count"],
+            "estimated_responses": overall["estimated_responses"],
+            "overall_average_score": round(overall["mean"], 2),
+            "overall_score_variance": overall["variance"],
+            "overall_approval_rate": round(overall["approval_rate"], 2),
             "agent_statistics": agent_stats,
+            "sampling_policy": self.review_policy.get_statistics(),
             "quality_criteria": self.quality_criteria,
             "timestamp": datetime.now().isoformat()
         }
@@ -425,6 +1008,9 @@ Revise esta resposta segundo os critérios estabelecidos."""
             "model": self.model if self._is_openai_available() else None,
             "quality_criteria": self.quality_criteria,
             "total_reviews_performed": len(self.review_history),
+            "review_cache": self.review_cache.get_statistics(),
+            "review_flight": self.review_flight.get_statistics(),
+            "pending_async_reviews": sum(1 for r in self.async_reviews.values() if r["status"] == "pending"),
             "capabilities": [
                 "Revisão de qualidade",
                 "Análise de precisão técnica",
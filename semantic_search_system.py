@@ -1,9 +1,15 @@
 import json
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import pickle
 import os
+import threading
+from knn_graph import KNNGraph, get_item_id, normalize_rows
+from knowledge_deduplicator import knowledge_deduplicator
+from facet_counter import FacetCounter
+from single_flight import SingleFlight
+from lazy_subsystems import subsystems
+
+TINTAS_KNOWLEDGE_BASE_PATH = '/home/ubuntu/structured_knowledge_refined.json'
 
 class SemanticSearchSystem:
     def __init__(self, knowledge_base_path, model_name='all-MiniLM-L6-v2'):
@@ -14,11 +20,24 @@ class SemanticSearchSystem:
             knowledge_base_path: Caminho para o arquivo JSON da base de conhecimento
             model_name: Nome do modelo de embeddings a ser usado
         """
+        from sentence_transformers import SentenceTransformer  # Importa o torch: só ao criar o sistema
+        
         self.model = SentenceTransformer(model_name)
+        self.encode_flight = SingleFlight("encode_tintas")  # Consultas idênticas simultâneas
         self.knowledge_base = self.load_knowledge_base(knowledge_base_path)
         self.embeddings = None
+        self._unit_cache = (None, None)  # (embeddings de origem, versão normalizada)
+        self._index_lock = threading.RLock()  # Protege o índice entre buscas e atualizações incrementais
+        
+        # Remover duplicatas antes de indexar
+        self.knowledge_base, self.dedup_report = knowledge_deduplicator.deduplicate(
+            self.knowledge_base, encode_fn=self.model.encode, source=knowledge_base_path
+        )
         self.documents = []
         self.embeddings_file = 'knowledge_embeddings.pkl'
+        self.knn_graph_file = 'knowledge_knn_graph.pkl'
+        self.knn_graph = KNNGraph(k=10)
+        self.facets = FacetCounter({"brand": "brand", "type": "type"})
         
         # Preparar documentos para busca
         self.prepare_documents()
@@ -26,8 +45,14 @@ class SemanticSearchSystem:
         # Carregar ou criar embeddings
         if os.path.exists(self.embeddings_file):
             self.load_embeddings()
+            if len(self.embeddings) != len(self.documents):
+                print("Embeddings salvos desatualizados, recriando...")
+                self.create_embeddings()
         else:
             self.create_embeddings()
+        
+        # Carregar ou construir grafo de produtos parecidos
+        self.load_or_build_knn_graph()
     
     def load_knowledge_base(self, path):
         """Carrega a base de conhecimento do arquivo JSON"""
@@ -37,9 +62,31 @@ class SemanticSearchSystem:
     def prepare_documents(self):
         """Prepara os documentos para busca semântica"""
         self.documents = []
+        self._index_by_id = {}
         for item in self.knowledge_base:
-            # Criar um documento combinando todas as informações relevantes
-            doc_text = f"""
+            doc = self._build_document(item)
+            
+            # Garantir IDs únicos para o grafo de produtos parecidos
+            doc['id'] = self._unique_id(doc['id'])
+            
+            self._index_by_id[doc['id']] = len(self.documents)
+            self.documents.append(doc)
+        
+        self.facets.rebuild(self.knowledge_base)
+    
+    def _unique_id(self, item_id):
+        """ID ainda não indexado: IDs repetidos recebem o sufixo da posição ("id_12")"""
+        if item_id not in self._index_by_id:
+            return item_id
+        
+        position = len(self.documents)
+        while f"{item_id}_{position}" in self._index_by_id:
+            position += 1
+        return f"{item_id}_{position}"
+    
+    def _build_document(self, item):
+        """Cria um documento combinando todas as informações relevantes do item"""
+        doc_text = f"""
             Marca: {item.get('brand', '')}
             Produto: {item.get('product_name', '')}
             Tipo: {item.get('type', '')}
@@ -51,11 +98,12 @@ class SemanticSearchSystem:
             Características: {' '.join(item.get('features', []))}
             Descrição: {item.get('description', '')}
             """.strip()
-            
-            self.documents.append({
-                'text': doc_text,
-                'metadata': item
-            })
+        
+        return {
+            'id': get_item_id(item),
+            'text': doc_text,
+            'metadata': item
+        }
     
     def create_embeddings(self):
         """Cria embeddings para todos os documentos"""
@@ -67,6 +115,10 @@ class SemanticSearchSystem:
         with open(self.embeddings_file, 'wb') as f:
             pickle.dump(self.embeddings, f)
         print(f"Embeddings salvos em {self.embeddings_file}")
+        
+        # Embeddings novos invalidam o grafo salvo
+        if os.path.exists(self.knn_graph_file):
+            os.remove(self.knn_graph_file)
     
     def load_embeddings(self):
         """Carrega embeddings salvos"""
@@ -74,40 +126,182 @@ class SemanticSearchSystem:
         with open(self.embeddings_file, 'rb') as f:
             self.embeddings = pickle.load(f)
     
-    def search(self, query, top_k=5, similarity_threshold=0.3):
+    def load_or_build_knn_graph(self):
+        """Carrega o grafo kNN salvo ou o reconstrói se estiver desatualizado"""
+        if os.path.exists(self.knn_graph_file):
+            with open(self.knn_graph_file, 'rb') as f:
+                graph = pickle.load(f)
+            if len(graph) == len(self.documents) and all(doc['id'] in graph for doc in self.documents):
+                self.knn_graph = graph
+                return
+        
+        print("Construindo grafo de produtos parecidos...")
+        self.knn_graph.build([doc['id'] for doc in self.documents], self.embeddings)
+        with open(self.knn_graph_file, 'wb') as f:
+            pickle.dump(self.knn_graph, f)
+    
+    def add_knowledge_item(self, item):
         """
-        Realiza busca semântica na base de conhecimento
+        Adiciona novo item à base de conhecimento de forma incremental
+        
+        IDs já indexados recebem sufixo, como no carregamento; para substituir
+        um item, remova-o antes.
         
         Args:
-            query: Consulta do usuário
-            top_k: Número máximo de resultados a retornar
-            similarity_threshold: Limiar mínimo de similaridade
+            item: Dicionário com informações do produto
             
         Returns:
-            Lista de resultados ordenados por relevância
+            ID com que o item foi indexado
         """
-        # Criar embedding da consulta
-        query_embedding = self.model.encode([query])
+        doc = self._build_document(item)
+        embedding = self.model.encode([doc['text']])  # Fora do lock: é a parte lenta
+        
+        with self._index_lock:
+            doc['id'] = self._unique_id(doc['id'])
+            
+            self.knowledge_base.append(item)
+            self.facets.add(item)
+            self.documents.append(doc)
+            self._index_by_id[doc['id']] = len(self.documents) - 1
+            self.embeddings = np.vstack([self.embeddings, embedding]) if len(self.embeddings) else embedding
+            
+            self.knn_graph.add(doc['id'], embedding[0])
+        return doc['id']
+    
+    def update_knowledge_item(self, item, updated):
+        """
+        Substitui um item já indexado (ex.: após mesclar uma duplicata)
+        
+        Embedding, grafo, facetas são atualizados junto.
         
-        # Calcular similaridades
-        similarities = cosine_similarity(query_embedding, self.embeddings)[0]
+        Args:
+            item: Item indexado (o próprio objeto da base de conhecimento)
+            updated: Nova versão do item
+            
+        Returns:
+            ID com que o item foi reindexado ou None se não estiver indexado
+        """
+        with self._index_lock:
+            idx = next((i for i, indexed in enumerate(self.knowledge_base) if indexed is item), None)
+            if idx is None:
+                return None
+            
+            self.remove_knowledge_item(self.documents[idx]['id'])
+            return self.add_knowledge_item(updated)
+
+    def remove_knowledge_item(self, item_id):
+        """
+        Remove um item da base de conhecimento
         
-        # Obter índices dos documentos mais similares
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        Args:
+            item_id: ID do item
+            
+        Returns:
+            True se removido, False se não encontrado
+        """
+        with self._index_lock:
+            idx = self._index_by_id.get(item_id)
+            if idx is None:
+                return False
+            
+            self.facets.remove(self.knowledge_base[idx])
+            del self.knowledge_base[idx]
+            del self.documents[idx]
+            self.embeddings = np.delete(self.embeddings, idx, axis=0)
+            self._index_by_id = {doc['id']: i for i, doc in enumerate(self.documents)}
+            
+            self.knn_graph.remove(item_id)
+            return True
+    
+    def get_similar_products(self, item_id, top_k=5):
+        """
+        Retorna produtos parecidos a partir do grafo kNN pré-calculado (O(k))
         
-        # Filtrar por limiar de similaridade
-        results = []
-        for idx in top_indices:
-            similarity_score = similarities[idx]
-            if similarity_score >= similarity_threshold:
+        Args:
+            item_id: ID do produto de referência
+            top_k: Número máximo de produtos parecidos
+            
+        Returns:
+            Lista de produtos parecidos ou None se o produto não existir
+        """
+        with self._index_lock:
+            if item_id not in self._index_by_id:
+                return None
+            
+            results = []
+            for neighbor in self.knn_graph.neighbors(item_id, top_k):
+                idx = self._index_by_id.get(neighbor['id'])
+                if idx is None:
+                    continue
                 results.append({
                     'document': self.documents[idx]['metadata'],
-                    'similarity_score': float(similarity_score),
+                    'similarity_score': neighbor['similarity_score'],
                     'text_snippet': self.documents[idx]['text'][:200] + "..."
                 })
+            
+            return results
+    
+    def encode_query(self, query):
+        """Cria o embedding de uma consulta (consultas idênticas simultâneas compartilham o cálculo)"""
+        return self.encode_flight.do(query, lambda: self.model.encode([query])[0])
+    
+    def _unit_embeddings(self) -> np.ndarray:
+        """Embeddings normalizados; recalculados só quando self.embeddings é substituído"""
+        source, unit = self._unit_cache
+        if source is not self.embeddings:
+            unit = normalize_rows(self.embeddings)
+            self._unit_cache = (self.embeddings, unit)
+        return unit
+    
+    def search(self, query, top_k=5, similarity_threshold=0.3, query_embedding=None):
+        """
+        Realiza busca semântica na base de conhecimento
+        
+        Args:
+            query: Consulta do usuário
+            top_k: Número máximo de resultados a retornar
+            similarity_threshold: Limiar mínimo de similaridade
+            query_embedding: Embedding já calculado (ex.: misturado com o contexto da sessão)
+            
+        Returns:
+            Lista de resultados ordenados por relevância
+        """
+        # Criar embedding da consulta
+        if query_embedding is None:
+            query_embedding = self.model.encode([query])
+        else:
+            query_embedding = np.asarray(query_embedding).reshape(1, -1)
+        
+        # Embeddings e documentos lidos sob o lock: sempre da mesma versão do índice
+        with self._index_lock:
+            # Similaridade de cosseno: produto interno entre vetores normalizados
+            similarities = self._unit_embeddings() @ normalize_rows(query_embedding)[0]
+            
+            # Obter índices dos documentos mais similares
+            top_indices = np.argsort(similarities)[::-1][:top_k]
+            
+            # Filtrar por limiar de similaridade
+            results = []
+            for idx in top_indices:
+                similarity_score = similarities[idx]
+                if similarity_score >= similarity_threshold:
+                    results.append({
+                        'document': self.documents[idx]['metadata'],
+                        'similarity_score': float(similarity_score),
+                        'text_snippet': self.documents[idx]['text'][:200] + "..."
+                    })
         
         return results
     
+    def facets_for_results(self, results):
+        """
+        Conta marcas e tipos dentro do conjunto de resultados
+        
+        Args:
+            results: Resultados da busca
+        """
+        return self.facets.count_results(results)
+    
     def search_by_category(self, query, category_filter=None, top_k=5):
         """
         Busca com filtro por categoria
@@ -174,12 +368,16 @@ class SemanticSearchSystem:
         
         return explanation
 
+# Instância global do sistema de busca de tintas, compartilhada pela API e pelo WhatsApp
+# (carrega o modelo no primeiro uso ou no aquecimento)
+search_system = subsystems.register("tintas_search", lambda: SemanticSearchSystem(TINTAS_KNOWLEDGE_BASE_PATH))
+
 def test_semantic_search():
     """Função de teste do sistema de busca semântica"""
     print("Inicializando sistema de busca semântica...")
     
     # Inicializar o sistema
-    search_system = SemanticSearchSystem('/home/ubuntu/structured_knowledge_refined.json')
+    search_system = SemanticSearchSystem(TINTAS_KNOWLEDGE_BASE_PATH)
     
     # Testes de busca
     test_queries = [
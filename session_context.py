@@ -0,0 +1,215 @@
+"""
+Contexto de Sessão para Busca Semântica
+Mantém, por sessão, um embedding acumulado das consultas recentes (média com
+decaimento exponencial) para que mensagens de continuação ("e para área externa?")
+não percam o contexto da conversa.
+"""
+
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+import numpy as np
+
+from single_flight import SingleFlight
+
+
+class SessionContextStore:
+    def __init__(self,
+                 decay: float = 0.6,
+                 blend_weight: float = 0.3,
+                 max_sessions: int = 10000,
+                 ttl_seconds: int = 1800):
+        """
+        Inicializa o armazenamento de contexto de sessões
+
+        Args:
+            decay: Fator de decaimento aplicado ao contexto a cada nova consulta
+            blend_weight: Peso do contexto na mistura com a consulta atual
+            max_sessions: Número máximo de sessões em memória (LRU)
+            ttl_seconds: Sessões sem atividade por mais tempo que isso são descartadas
+        """
+        self.decay = decay
+        self.blend_weight = blend_weight
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+
+        # {(namespace, session_id): {"sum": vetor, "weight": float, "turns": int, "last_seen": float}}
+        self._sessions: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted_sessions = 0
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        """Normaliza um vetor para norma unitária"""
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _evict(self, now: float):
+        """Remove sessões expiradas e excedentes (as menos recentes primeiro)"""
+        while self._sessions:
+            key, state = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions or now - state["last_seen"] > self.ttl_seconds:
+                del self._sessions[key]
+                self.evicted_sessions += 1
+            else:
+                break
+
+    def get_context(self, namespace: str, session_id: str) -> Optional[np.ndarray]:
+        """
+        Retorna o vetor de contexto da sessão
+
+        Args:
+            namespace: Espaço de embeddings (ex.: "tintas", "pisos")
+            session_id: ID da sessão
+
+        Returns:
+            Média com decaimento das consultas anteriores ou None
+        """
+        if not session_id:
+            return None
+
+        with self._lock:
+            now = time.time()
+            self._evict(now)
+            state = self._sessions.get((namespace, session_id))
+            if not state:
+                return None
+            return state["sum"] / state["weight"]
+
+    def update(self, namespace: str, session_id: str, query_vector: np.ndarray):
+        """
+        Incorpora uma nova consulta ao contexto da sessão em O(d)
+
+        Args:
+            namespace: Espaço de embeddings
+            session_id: ID da sessão
+            query_vector: Embedding da consulta
+        """
+        if not session_id:
+            return
+
+        vector = self._normalize(query_vector)
+        key = (namespace, session_id)
+
+        with self._lock:
+            now = time.time()
+            state = self._sessions.get(key)
+            if state is None or state["sum"].shape != vector.shape:
+                state = {"sum": np.zeros_like(vector), "weight": 0.0, "turns": 0}
+                self._sessions[key] = state
+
+            state["sum"] = self.decay * state["sum"] + vector
+            state["weight"] = self.decay * state["weight"] + 1.0
+            state["turns"] += 1
+            state["last_seen"] = now
+            self._sessions.move_to_end(key)
+
+            self._evict(now)
+
+    def blend(self, namespace: str, session_id: str, query_vector: np.ndarray) -> np.ndarray:
+        """
+        Mistura a consulta atual com o contexto da sessão
+
+        Args:
+            namespace: Espaço de embeddings
+            session_id: ID da sessão
+            query_vector: Embedding da consulta atual
+
+        Returns:
+            Vetor para a busca (a própria consulta se não houver contexto)
+        """
+        vector = self._normalize(query_vector)
+        context = self.get_context(namespace, session_id)
+        if context is None or context.shape != vector.shape:
+            return vector
+
+        return (1 - self.blend_weight) * vector + self.blend_weight * self._normalize(context)
+
+    def clear(self, session_id: str = None):
+        """
+        Remove o contexto de uma sessão (em todos os espaços) ou de todas
+
+        Args:
+            session_id: ID da sessão ou None para limpar tudo
+        """
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+                return
+            for key in [key for key in self._sessions if key[1] == session_id]:
+                del self._sessions[key]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Retorna estatísticas do armazenamento
+
+        Returns:
+            Dicionário com estatísticas
+        """
+        with self._lock:
+            return {
+                "active_sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "evicted_sessions": self.evicted_sessions,
+                "decay": self.decay,
+                "blend_weight": self.blend_weight
+            }
+
+
+def coalesced_search(search_system, namespace: str, query: str, search_vector: np.ndarray, **search_kwargs):
+    """
+    Busca com coalescência: buscas idênticas simultâneas (mesma consulta, vetor e
+    parâmetros) compartilham uma única execução
+
+    Args:
+        search_system: Sistema de busca
+        namespace: Espaço de embeddings do sistema
+        query: Consulta do usuário
+        search_vector: Vetor da busca (já misturado com o contexto)
+        **search_kwargs: Parâmetros repassados para search()
+
+    Returns:
+        Resultados da busca
+    """
+    key = (
+        namespace,
+        query,
+        hashlib.sha1(np.ascontiguousarray(search_vector, dtype=np.float32).tobytes()).hexdigest(),
+        json.dumps(search_kwargs, sort_keys=True, default=str)
+    )
+    return search_flight.do(
+        key, lambda: search_system.search(query, query_embedding=search_vector, **search_kwargs)
+    )
+
+def contextual_search(search_system, namespace: str, query: str, session_id: str = None, **search_kwargs):
+    """
+    Busca semântica usando o contexto acumulado da sessão
+
+    Args:
+        search_system: Sistema de busca (SemanticSearchSystem ou PisosSemanticSearch)
+        namespace: Espaço de embeddings do sistema
+        query: Consulta do usuário
+        session_id: ID da sessão
+        **search_kwargs: Parâmetros repassados para search()
+
+    Returns:
+        Resultados da busca
+    """
+    query_vector = search_system.encode_query(query)
+    search_vector = session_context_store.blend(namespace, session_id, query_vector)
+
+    results = coalesced_search(search_system, namespace, query, search_vector, **search_kwargs)
+
+    session_context_store.update(namespace, session_id, query_vector)
+    return results
+
+# Instância global do contexto de sessões
+session_context_store = SessionContextStore()
+
+# Coalescência das buscas semânticas idênticas simultâneas
+search_flight = SingleFlight("search")
@@ -0,0 +1,128 @@
+"""
+Coalescência de Requisições (Single-Flight)
+Quando várias requisições idênticas chegam ao mesmo tempo (ex.: campanha no
+WhatsApp), apenas a primeira executa o estágio caro; as demais aguardam e
+recebem uma cópia do mesmo resultado (ou a mesma exceção).
+"""
+
+import copy
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Hashable, Awaitable
+
+
+class SingleFlight:
+    def __init__(self, namespace: str = "flight", copy_results: bool = True):
+        """
+        Inicializa o grupo de coalescência
+
+        Args:
+            namespace: Nome do estágio (para estatísticas)
+            copy_results: Entregar cópias profundas a cada chamador (resultados mutáveis)
+        """
+        self.namespace = namespace
+        self.copy_results = copy_results
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    def _join(self, key: Hashable):
+        """Retorna (future, é_líder) para a chave"""
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is None:
+                future = Future()
+                self._in_flight[key] = future
+                self.leaders += 1
+                return future, True
+            self.shared += 1
+            return future, False
+
+    def _land(self, key: Hashable):
+        # Chamadas posteriores recomputam (não é um cache)
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: float = None) -> Any:
+        """
+        Executa fn uma única vez por chave entre chamadas concorrentes
+
+        Args:
+            key: Chave da computação (entradas do estágio)
+            fn: Função sem argumentos que produz o resultado
+            timeout: Espera máxima dos seguidores em segundos (None = sem limite)
+
+        Returns:
+            Resultado de fn (cópia quando copy_results)
+
+        Raises:
+            concurrent.futures.TimeoutError: Seguidor excedeu o timeout
+        """
+        future, leader = self._join(key)
+
+        if not leader:
+            result = future.result(timeout=timeout)
+            return copy.deepcopy(result) if self.copy_results else result
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            # O original fica com os seguidores; o líder também recebe uma cópia
+            future.set_result(result)
+            return copy.deepcopy(result) if self.copy_results else result
+        finally:
+            self._land(key)
+
+    async def ado(self, key: Hashable, coro_fn: Callable[[], Awaitable[Any]], timeout: float = None) -> Any:
+        """
+        Versão assíncrona de do(); compartilha as chaves com as chamadas síncronas
+
+        Args:
+            key: Chave da computação
+            coro_fn: Função sem argumentos que retorna a corrotina do estágio
+            timeout: Espera máxima dos seguidores em segundos (None = sem limite)
+
+        Returns:
+            Resultado da corrotina (cópia quando copy_results)
+
+        Raises:
+            TimeoutError: Seguidor excedeu o timeout
+        """
+        future, leader = self._join(key)
+
+        if not leader:
+            # shield: o timeout do seguidor não cancela a computação do líder
+            result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+            return copy.deepcopy(result) if self.copy_results else result
+
+        try:
+            result = await coro_fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return copy.deepcopy(result) if self.copy_results else result
+        finally:
+            self._land(key)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Retorna estatísticas de coalescência
+
+        Returns:
+            Dicionário com estatísticas
+        """
+        total = self.leaders + self.shared
+        return {
+            "namespace": self.namespace,
+            "executions": self.leaders,
+            "shared": self.shared,
+            "shared_rate": self.shared / total if total > 0 else 0,
+            "in_flight": len(self._in_flight)
+        }
@@ -0,0 +1,200 @@
+"""
+Recuperação Especulativa
+Dispara as buscas de todos os agentes em paralelo enquanto o roteamento ainda está
+em andamento e entrega apenas o resultado do agente escolhido, tirando a busca do
+caminho crítico. Sob carga alta de CPU a especulação é desativada automaticamente.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FuturesTimeoutError
+from typing import Dict, List, Any, Optional
+
+from session_context import session_context_store, coalesced_search
+
+
+class SpeculativeSearch:
+    """Buscas especulativas de uma consulta, uma por agente"""
+
+    def __init__(self, retriever: "SpeculativeRetriever", session_id: Optional[str], futures: Dict[str, Future]):
+        self._retriever = retriever
+        self._session_id = session_id
+        self._futures = futures
+        self._used = set()
+
+    def result_for(self, agent_id: str, timeout: float = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Resultados da busca especulativa de um agente
+
+        Atualiza o contexto da sessão apenas para os agentes efetivamente usados.
+
+        Args:
+            agent_id: Agente escolhido pelo roteamento
+            timeout: Espera máxima em segundos
+
+        Returns:
+            Resultados da busca ou None (agente não especulado, falha ou prazo esgotado)
+        """
+        future = self._futures.get(agent_id)
+        if future is None:
+            return None
+
+        try:
+            results, query_vector = future.result(timeout=timeout)
+        except FuturesTimeoutError:
+            return None
+        except Exception as e:
+            print(f"⚠️  Erro na busca especulativa ({agent_id}): {e}")
+            return None
+
+        namespace = self._retriever.sources[agent_id]["namespace"]
+        session_context_store.update(namespace, self._session_id, query_vector)
+        self._used.add(agent_id)
+        return results
+
+    def discard_unused(self):
+        """Descarta as buscas dos agentes não escolhidos (cancela as que não começaram)"""
+        for agent_id, future in self._futures.items():
+            if agent_id not in self._used:
+                future.cancel()
+                self._retriever._record("wasted")
+            else:
+                self._retriever._record("hits")
+
+
+class SpeculativeRetriever:
+    def __init__(self,
+                 max_workers: int = 4,
+                 max_load_per_cpu: float = None,
+                 max_in_flight: int = None):
+        """
+        Inicializa o recuperador especulativo
+
+        Args:
+            max_workers: Threads dedicadas às buscas especulativas
+            max_load_per_cpu: Load average (1 min) por CPU acima do qual não especula
+            max_in_flight: Máximo de consultas em especulação simultânea
+        """
+        cpu_count = os.cpu_count() or 1
+        self.cpu_count = cpu_count
+        self.max_load_per_cpu = max_load_per_cpu if max_load_per_cpu is not None else float(os.getenv('SPECULATION_MAX_LOAD_PER_CPU', '0.75'))
+        self.max_in_flight = max_in_flight if max_in_flight is not None else int(os.getenv('SPECULATION_MAX_IN_FLIGHT', str(cpu_count)))
+
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative-search")
+
+        self.in_flight = 0
+        self.stats = {"speculations": 0, "skipped_load": 0, "skipped_in_flight": 0, "hits": 0, "wasted": 0}
+        self._lock = threading.Lock()
+
+    def register(self, agent_id: str, search_system, namespace: str, **search_kwargs):
+        """
+        Registra o sistema de busca de um agente
+
+        Args:
+            agent_id: Identificador do agente
+            search_system: Sistema de busca (com encode_query e search)
+            namespace: Espaço de embeddings para o contexto de sessão
+            **search_kwargs: Parâmetros de search() (iguais aos do handler do agente)
+        """
+        self.sources[agent_id] = {
+            "search_system": search_system,
+            "namespace": namespace,
+            "search_kwargs": search_kwargs
+        }
+
+    def _record(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _load_per_cpu(self) -> float:
+        try:
+            return os.getloadavg()[0] / self.cpu_count
+        except (AttributeError, OSError):
+            return 0.0  # Plataforma sem load average
+
+    def should_speculate(self) -> bool:
+        """Verifica o orçamento de CPU antes de especular"""
+        if self.in_flight >= self.max_in_flight:
+            self._record("skipped_in_flight")
+            return False
+        if self._load_per_cpu() > self.max_load_per_cpu:
+            self._record("skipped_load")
+            return False
+        return True
+
+    def _search(self, agent_id: str, query: str, session_id: Optional[str]):
+        """Busca contextual sem atualizar a sessão (a atualização é feita só para o vencedor)"""
+        source = self.sources[agent_id]
+        search_system = source["search_system"]
+
+        query_vector = search_system.encode_query(query)
+        search_vector = session_context_store.blend(source["namespace"], session_id, query_vector)
+        results = coalesced_search(search_system, source["namespace"], query, search_vector, **source["search_kwargs"])
+        return results, query_vector
+
+    def _finish(self, _future):
+        with self._lock:
+            self.in_flight -= 1
+
+    def start(self, query: str, session_id: str = None) -> Optional[SpeculativeSearch]:
+        """
+        Inicia as buscas de todos os agentes registrados
+
+        Args:
+            query: Consulta do usuário
+            session_id: ID da sessão
+
+        Returns:
+            SpeculativeSearch ou None se a especulação foi desativada pela carga
+        """
+        if not self.sources or not self.should_speculate():
+            return None
+
+        with self._lock:
+            self.in_flight += 1
+            self.stats["speculations"] += 1
+
+        futures = {
+            agent_id: self.executor.submit(self._search, agent_id, query, session_id)
+            for agent_id in self.sources
+        }
+
+        # A consulta sai de "em voo" quando todas as suas buscas terminam
+        pending = [len(futures)]
+        pending_lock = threading.Lock()
+
+        def on_done(future):
+            with pending_lock:
+                pending[0] -= 1
+                finished = pending[0] == 0
+            if finished:
+                self._finish(future)
+
+        for future in futures.values():
+            future.add_done_callback(on_done)
+
+        return SpeculativeSearch(self, session_id, futures)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Retorna estatísticas da especulação
+
+        Returns:
+            Dicionário com estatísticas
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        total = stats["hits"] + stats["wasted"]
+        return {
+            **stats,
+            "in_flight": self.in_flight,
+            "wasted_rate": stats["wasted"] / total if total > 0 else 0,
+            "load_per_cpu": round(self._load_per_cpu(), 3),
+            "max_load_per_cpu": self.max_load_per_cpu,
+            "max_in_flight": self.max_in_flight,
+            "agents": list(self.sources)
+        }
+
+# Instância global do recuperador especulativo
+speculative_retriever = SpeculativeRetriever()
@@ -1,8 +1,11 @@
 import os
+import time
+import asyncio
 from supabase import create_client, Client
 from typing import Optional, Dict, List, Any
 import json
 from datetime import datetime
+from lazy_subsystems import subsystems
 
 class SupabaseManager:
     def __init__(self):
@@ -132,6 +135,21 @@ class SupabaseManager:
             print(f"Erro ao salvar mensagem: {e}")
             return None
     
+    def update_message_metadata(self, message_id: str, metadata: Dict) -> bool:
+        """Atualiza (mescla) os metadados de uma mensagem"""
+        if not self.client:
+            return False
+        
+        try:
+            current = self.client.table('messages').select('metadata').eq('id', message_id).execute()
+            merged = (current.data[0].get('metadata') or {}) if current.data else {}
+            merged.update(metadata)
+            response = self.client.table('messages').update({'metadata': merged}).eq('id', message_id).execute()
+            return len(response.data) > 0
+        except Exception as e:
+            print(f"Erro ao atualizar metadados da mensagem: {e}")
+            return False
+    
     def get_conversation_messages(self, conversation_id: str, limit: int = 50) -> List[Dict]:
         """Busca mensagens de uma conversa"""
         if not self.client:
@@ -468,5 +486,127 @@ class SupabaseManager:
             print(f"Erro ao remover prompt {agent_type}/{prompt_type}: {e}")
             return False
 
-# Instância global do gerenciador Supabase
-supabase_manager = SupabaseManager()
+class AsyncSupabaseManager:
+    """
+    Cliente assíncrono do Supabase para o servidor ASGI
+    
+    Cobre apenas as operações do caminho das mensagens (conversas, mensagens e log);
+    o restante continua no SupabaseManager síncrono.
+    """
+    
+    def __init__(self):
+        self.supabase_url = os.getenv('SUPABASE_URL', '')
+        self.supabase_key = os.getenv('SUPABASE_ANON_KEY', '')
+        self.client = None
+        
+        # Uma única conexão entre requisições simultâneas; após falha, nova tentativa só depois do intervalo
+        self._connect_lock = asyncio.Lock()
+        self.reconnect_interval = float(os.getenv('SUPABASE_RECONNECT_SECONDS', '30'))
+        self._failed_at = None
+    
+    def is_configured(self) -> bool:
+        """Verifica se há configuração do Supabase"""
+        return bool(self.supabase_url and self.supabase_key)
+    
+    def _in_backoff(self) -> bool:
+        return self._failed_at is not None and time.monotonic() - self._failed_at < self.reconnect_interval
+    
+    async def _get_client(self):
+        """Cria o cliente assíncrono na primeira chamada (precisa de um event loop)"""
+        if self.client is not None or not self.is_configured() or self._in_backoff():
+            return self.client
+        
+        async with self._connect_lock:
+            # Outra requisição pode ter conectado (ou falhado) enquanto esta aguardava
+            if self.client is None and not self._in_backoff():
+                try:
+                    from supabase import acreate_client
+                    self.client = await acreate_client(self.supabase_url, self.supabase_key)
+                    self._failed_at = None
+                except Exception as e:
+                    print(f"❌ Erro ao conectar com Supabase (async): {e}. "
+                          f"Nova tentativa em {self.reconnect_interval:.0f}s.")
+                    self._failed_at = time.monotonic()
+        return self.client
+    
+    # CONVERSAS
+    async def create_conversation(self, session_id: str, platform: str, phone_number: str = None, user_id: str = None) -> Optional[str]:
+        """Cria nova conversa"""
+        client = await self._get_client()
+        if not client:
+            return None
+        
+        try:
+            conversation_data = {
+                'session_id': session_id,
+                'platform': platform,
+                'phone_number': phone_number,
+                'user_id': user_id
+            }
+            response = await client.table('conversations').insert(conversation_data).execute()
+            return response.data[0]['id'] if response.data else None
+        except Exception as e:
+            print(f"Erro ao criar conversa: {e}")
+            return None
+    
+    async def get_conversation_by_session(self, session_id: str) -> Optional[Dict]:
+        """Busca conversa por session_id"""
+        client = await self._get_client()
+        if not client:
+            return None
+        
+        try:
+            response = await client.table('conversations').select('*').eq('session_id', session_id).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Erro ao buscar conversa {session_id}: {e}")
+            return None
+    
+    # MENSAGENS
+    async def save_message(self, conversation_id: str, message_type: str, content: str, metadata: Dict = None) -> Optional[str]:
+        """Salva mensagem na conversa"""
+        client = await self._get_client()
+        if not client:
+            return None
+        
+        try:
+            message_data = {
+                'conversation_id': conversation_id,
+                'message_type': message_type,
+                'content': content,
+                'metadata': metadata or {}
+            }
+            response = await client.table('messages').insert(message_data).execute()
+            return response.data[0]['id'] if response.data else None
+        except Exception as e:
+            print(f"Erro ao salvar mensagem: {e}")
+            return None
+    
+    # LOGS
+    async def log_activity(self, action: str, entity_type: str = None, entity_id: str = None, 
+                           details: Dict = None, user_id: str = None, ip_address: str = None) -> Optional[str]:
+        """Registra atividade no log"""
+        client = await self._get_client()
+        if not client:
+            return None
+        
+        try:
+            log_data = {
+                'action': action,
+                'entity_type': entity_type,
+                'entity_id': entity_id,
+                'details': details or {},
+                'user_id': user_id,
+                'ip_address': ip_address
+            }
+            response = await client.table('activity_logs').insert(log_data).execute()
+            return response.data[0]['id'] if response.data else None
+        except Exception as e:
+            print(f"Erro ao registrar log: {e}")
+            return None
+
+# Instância global do gerenciador Supabase (conecta no primeiro uso ou no aquecimento)
+supabase_manager = subsystems.register("supabase", SupabaseManager)
+
+# Instância global do gerenciador Supabase assíncrono (servidor ASGI)
+async_supabase_manager = AsyncSupabaseManager()
@@ -0,0 +1,143 @@
+"""
+Cache com Expiração (TTL) e Descarte LRU
+Cache em memória, seguro para threads, opcionalmente replicado no Redis para que
+vários workers compartilhem os mesmos resultados.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class TTLCache:
+    def __init__(self,
+                 max_size: int = 1024,
+                 ttl_seconds: int = 600,
+                 namespace: str = "cache",
+                 backend=None):
+        """
+        Inicializa o cache
+
+        Args:
+            max_size: Número máximo de entradas em memória
+            ttl_seconds: Tempo de vida de cada entrada
+            namespace: Prefixo das chaves no backend compartilhado
+            backend: Gerenciador Redis opcional (precisa de get_json/set_json/is_connected)
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self.backend = backend
+
+        # {chave: (expira_em, valor)} em ordem de uso
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self.evictions = 0
+
+    def _backend_available(self) -> bool:
+        return self.backend is not None and self.backend.is_connected()
+
+    def _backend_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _store_local(self, key: str, value: Any, now: float):
+        self._entries[key] = (now + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Busca um valor no cache (memória local e, se configurado, Redis)
+
+        Args:
+            key: Chave da entrada
+
+        Returns:
+            Valor armazenado ou None se ausente/expirado
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        if self._backend_available():
+            value = self.backend.get_json(self._backend_key(key))
+            if value is not None:
+                with self._lock:
+                    self._store_local(key, value, now)
+                    self.hits += 1
+                    self.shared_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any):
+        """
+        Armazena um valor no cache
+
+        Args:
+            key: Chave da entrada
+            value: Valor (precisa ser serializável em JSON se houver Redis)
+        """
+        with self._lock:
+            self._store_local(key, value, time.time())
+
+        if self._backend_available():
+            self.backend.set_json(self._backend_key(key), value, self.ttl_seconds)
+
+    def invalidate(self, key: str = None):
+        """
+        Remove uma entrada ou todo o cache
+
+        Args:
+            key: Chave específica ou None para limpar tudo
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+        if self._backend_available():
+            if key is None:
+                self.backend.delete_prefix(f"{self.namespace}:")
+            else:
+                self.backend.delete(self._backend_key(key))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Retorna estatísticas do cache
+
+        Returns:
+            Dicionário com estatísticas
+        """
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total > 0 else 0,
+            "shared_hits": self.shared_hits,
+            "evictions": self.evictions,
+            "shared_backend": self._backend_available()
+        }
@@ -1,3 +1,4 @@
+import os
 import json
 import uuid
 from typing import Dict, List, Optional
@@ -5,18 +6,33 @@ from datetime import datetime
 
 from evolution_api_client import evolution_client
 from supabase_client import supabase_manager
-from semantic_search_system import SemanticSearchSystem
+from semantic_search_system import search_system
+from session_context import contextual_search
+from keyword_matcher import KeywordMatcher
+from reviewer_agent import reviewer_agent
+from lazy_subsystems import subsystems
+
+# Intenções detectadas por palavras-chave (compiladas uma vez)
+INTENT_KEYWORDS = {
+    'greeting': ['oi', 'olá', 'ola', 'bom dia', 'boa tarde', 'boa noite', 'hey', 'e aí'],
+    'quote': ['orçamento', 'orcamento', 'preço', 'preco', 'quanto custa', 'valor'],
+    'calculation': ['calcular', 'quantidade', 'litros', 'metros', 'área', 'area']
+}
+intent_matcher = KeywordMatcher(INTENT_KEYWORDS)
 
 class WhatsAppService:
     def __init__(self):
         self.evolution_client = evolution_client
         self.supabase = supabase_manager
-        self.semantic_search = SemanticSearchSystem('/home/ubuntu/structured_knowledge_refined.json')
+        self.semantic_search = search_system  # Mesmo índice da API (sem carregar o modelo de novo)
         
         # Configurações do agente
         self.agent_name = "Especialista em Tintas"
         self.greeting_message = "Olá! 👋 Sou seu especialista em tintas. Como posso ajudá-lo hoje?"
         
+        # Revisão em segundo plano com envio da resposta melhorada como nova mensagem
+        self.review_follow_up = os.getenv('WHATSAPP_REVIEW_FOLLOW_UP', 'false').lower() == 'true'
+        
         # Estados de conversa
         self.conversation_states = {}
         
@@ -78,7 +94,7 @@ class WhatsAppService:
                 send_result = self.send_message(phone_number, response['message'])
                 
                 # Salvar resposta do agente
-                self.supabase.save_message(
+                message_id = self.supabase.save_message(
                     conversation['id'],
                     'agent',
                     response['message'],
@@ -89,6 +105,9 @@ class WhatsAppService:
                     }
                 )
                 
+                if self.review_follow_up and response.get('search_results'):
+                    self._schedule_review(message_content, response, phone_number, message_id, conversation['id'])
+                
                 return {
                     'status': 'processed',
                     'conversation_id': conversation['id'],
@@ -105,6 +124,30 @@ class WhatsAppService:
         except Exception as e:
             return {'error': f'Erro ao processar mensagem recebida: {str(e)}'}
     
+    def _schedule_review(self, user_message: str, response: Dict, phone_number: str,
+                         message_id: Optional[str], conversation_id: str):
+        """Revisa a resposta em segundo plano e envia a versão melhorada como acompanhamento"""
+        def on_review_done(record: Dict):
+            review = record.get('review') or {}
+            if message_id:
+                self.supabase.update_message_metadata(message_id, {'review': review})
+            
+            improved = review.get('improved_response')
+            if improved and not review.get('approved', True):
+                self.send_message(phone_number, f"📝 Complementando minha resposta anterior:\n\n{improved}")
+                self.supabase.save_message(conversation_id, 'agent', improved, {'review_follow_up': record['review_id']})
+        
+        # Política de risco: respostas de baixo risco são apenas amostradas
+        decision = reviewer_agent.decide_review('tintas', response['message'], None, response.get('search_results', []))
+        if decision['action'] == 'skip':
+            return
+        
+        reviewer_agent.submit_review(
+            user_message, response['message'], 'tintas', response.get('search_results', []),
+            message_id=message_id, session_id=f"whatsapp_{phone_number}", callback=on_review_done,
+            sampling_weight=decision['sampling_weight']
+        )
+    
     def _handle_connection_update(self, connection_data: Dict) -> Dict:
         """Processa atualização de status de conexão"""
         state = connection_data.get('connection_state')
@@ -173,9 +216,10 @@ class WhatsAppService:
     def _generate_agent_response(self, user_message: str, conversation_id: str, phone_number: str) -> Dict:
         """Gera resposta do agente baseada na mensagem do usuário"""
         try:
+            intents = intent_matcher.labels(user_message)
+            
             # Verificar se é uma saudação
-            greetings = ['oi', 'olá', 'ola', 'bom dia', 'boa tarde', 'boa noite', 'hey', 'e aí']
-            if any(greeting in user_message.lower() for greeting in greetings):
+            if 'greeting' in intents:
                 return {
                     'message': f"Olá! 👋 Sou seu {self.agent_name}. Posso ajudá-lo com:\n\n🎨 Recomendações de tintas\n📏 Cálculo de quantidade\n💰 Orçamentos\n🔧 Dicas técnicas\n\nO que você precisa hoje?",
                     'search_results': [],
@@ -183,15 +227,18 @@ class WhatsAppService:
                 }
             
             # Verificar se é uma solicitação de orçamento
-            if any(word in user_message.lower() for word in ['orçamento', 'orcamento', 'preço', 'preco', 'quanto custa', 'valor']):
+            if 'quote' in intents:
                 return self._handle_quote_request(user_message, conversation_id, phone_number)
             
             # Verificar se é uma pergunta sobre cálculo
-            if any(word in user_message.lower() for word in ['calcular', 'quantidade', 'litros', 'metros', 'área', 'area']):
+            if 'calculation' in intents:
                 return self._handle_calculation_request(user_message)
             
             # Busca semântica na base de conhecimento
-            search_results = self.semantic_search.search(user_message, top_k=3)
+            # Busca considerando o contexto acumulado da conversa
+            search_results = contextual_search(
+                self.semantic_search, "tintas", user_message, f"whatsapp_{phone_number}", top_k=3
+            )
             
             if search_results:
                 # Encontrou produtos/informações relevantes
@@ -383,5 +430,5 @@ class WhatsAppService:
         except Exception as e:
             return {'error': f'Erro ao buscar estatísticas: {str(e)}'}
 
-# Instância global do serviço WhatsApp
-whatsapp_service = WhatsAppService()
+# Instância global do serviço WhatsApp (criada no primeiro uso ou no aquecimento)
+whatsapp_service = subsystems.register("whatsapp_service", WhatsAppService)